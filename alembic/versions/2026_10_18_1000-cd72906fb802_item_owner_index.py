@@ -0,0 +1,28 @@
+"""Index item by owner, drop description index
+
+Revision ID: cd72906fb802
+Revises: c62a40b37efb
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cd72906fb802'
+down_revision = 'c62a40b37efb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_item_owner_id_id', 'item', ['owner_id', 'id'], unique=False)
+    # A btree over free-text descriptions is never used by equality or range
+    # lookups, but is paid for on every insert and update
+    op.drop_index(op.f('ix_item_description'), table_name='item')
+
+
+def downgrade() -> None:
+    op.create_index(op.f('ix_item_description'), 'item', ['description'], unique=False)
+    op.drop_index('ix_item_owner_id_id', table_name='item')
@@ -0,0 +1,49 @@
+"""Full-text and trigram search on items and users
+
+Revision ID: 3e687712ad33
+Revises: cd72906fb802
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '3e687712ad33'
+down_revision = 'cd72906fb802'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    # Adding a stored generated column rewrites the table
+    op.add_column('item', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, ''))", persisted=True),
+        nullable=True,
+    ))
+    op.create_index('ix_item_search_vector', 'item', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('ix_item_title_trgm', 'item', ['title'], unique=False, postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+    op.add_column('user', sa.Column(
+        'search_vector',
+        postgresql.TSVECTOR(),
+        sa.Computed("to_tsvector('simple', coalesce(full_name, '') || ' ' || email)", persisted=True),
+        nullable=True,
+    ))
+    op.create_index('ix_user_search_vector', 'user', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('ix_user_full_name_trgm', 'user', ['full_name'], unique=False, postgresql_using='gin', postgresql_ops={'full_name': 'gin_trgm_ops'})
+    op.create_index('ix_user_email_trgm', 'user', ['email'], unique=False, postgresql_using='gin', postgresql_ops={'email': 'gin_trgm_ops'})
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_email_trgm', table_name='user')
+    op.drop_index('ix_user_full_name_trgm', table_name='user')
+    op.drop_index('ix_user_search_vector', table_name='user')
+    op.drop_column('user', 'search_vector')
+    op.drop_index('ix_item_title_trgm', table_name='item')
+    op.drop_index('ix_item_search_vector', table_name='item')
+    op.drop_column('item', 'search_vector')
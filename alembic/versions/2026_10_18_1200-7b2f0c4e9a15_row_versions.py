@@ -0,0 +1,26 @@
+"""Add row version columns to user and item
+
+Revision ID: 7b2f0c4e9a15
+Revises: 3e687712ad33
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b2f0c4e9a15'
+down_revision = '3e687712ad33'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('user', sa.Column('version_id', sa.Integer(), server_default='1', nullable=False))
+    op.add_column('item', sa.Column('version_id', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('item', 'version_id')
+    op.drop_column('user', 'version_id')
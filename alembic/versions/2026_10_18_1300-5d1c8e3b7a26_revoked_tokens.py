@@ -0,0 +1,40 @@
+"""Add revoked token table
+
+Revision ID: 5d1c8e3b7a26
+Revises: 7b2f0c4e9a15
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d1c8e3b7a26'
+down_revision = '7b2f0c4e9a15'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'revokedtoken',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('jti', sa.String(length=32), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('revoked_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['user.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('jti'),
+    )
+    op.create_index(op.f('ix_revokedtoken_user_id'), 'revokedtoken', ['user_id'], unique=False)
+    op.create_index(op.f('ix_revokedtoken_revoked_at'), 'revokedtoken', ['revoked_at'], unique=False)
+    op.create_index(op.f('ix_revokedtoken_expires_at'), 'revokedtoken', ['expires_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_revokedtoken_expires_at'), table_name='revokedtoken')
+    op.drop_index(op.f('ix_revokedtoken_revoked_at'), table_name='revokedtoken')
+    op.drop_index(op.f('ix_revokedtoken_user_id'), table_name='revokedtoken')
+    op.drop_table('revokedtoken')
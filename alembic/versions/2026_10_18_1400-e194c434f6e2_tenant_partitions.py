@@ -0,0 +1,106 @@
+"""Add tenants and partition item by tenant
+
+Revision ID: e194c434f6e2
+Revises: 5d1c8e3b7a26
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'e194c434f6e2'
+down_revision = '5d1c8e3b7a26'
+branch_labels = None
+depends_on = None
+
+# Hash partitions of item; changing this later means repartitioning the table
+ITEM_PARTITIONS = 16
+
+ITEM_SEARCH_VECTOR = "to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, ''))"
+
+
+def _item_columns() -> list:
+    return [
+        sa.Column('id', sa.Integer(), server_default=sa.text("nextval('item_id_seq'::regclass)"), nullable=False),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('description', sa.String(), nullable=True),
+        sa.Column('owner_id', sa.Integer(), nullable=True),
+        sa.Column('search_vector', postgresql.TSVECTOR(), sa.Computed(ITEM_SEARCH_VECTOR, persisted=True), nullable=True),
+        sa.Column('version_id', sa.Integer(), server_default='1', nullable=False),
+    ]
+
+
+def _replace_item(new_table: str, new_pkey: str) -> None:
+    # Keep the id sequence, which the old table owns, when it is dropped
+    op.execute('ALTER SEQUENCE item_id_seq OWNED BY NONE')
+    op.drop_table('item')
+    op.rename_table(new_table, 'item')
+    op.execute(f'ALTER TABLE item RENAME CONSTRAINT {new_pkey} TO item_pkey')
+    op.execute('ALTER SEQUENCE item_id_seq OWNED BY item.id')
+    op.create_foreign_key('item_owner_id_fkey', 'item', 'user', ['owner_id'], ['id'])
+    op.create_index(op.f('ix_item_id'), 'item', ['id'], unique=False)
+    op.create_index(op.f('ix_item_title'), 'item', ['title'], unique=False)
+    op.create_index('ix_item_owner_id_id', 'item', ['owner_id', 'id'], unique=False)
+    op.create_index('ix_item_search_vector', 'item', ['search_vector'], unique=False, postgresql_using='gin')
+    op.create_index('ix_item_title_trgm', 'item', ['title'], unique=False, postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'})
+
+
+def upgrade() -> None:
+    op.create_table(
+        'tenant',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name'),
+    )
+    # Existing users and items, and rows created outside a tenant, belong to it
+    op.execute("INSERT INTO tenant (id, name) VALUES (1, 'default')")
+    op.execute("SELECT setval('tenant_id_seq', 1)")
+    op.add_column('user', sa.Column('tenant_id', sa.Integer(), server_default='1', nullable=False))
+    op.create_foreign_key('user_tenant_id_fkey', 'user', 'tenant', ['tenant_id'], ['id'])
+    op.create_index('ix_user_tenant_id', 'user', ['tenant_id'], unique=False)
+
+    # A table can't be partitioned in place: build the partitioned table and
+    # copy the rows over, which locks and rewrites item
+    op.create_table(
+        'item_partitioned',
+        *_item_columns(),
+        sa.Column('tenant_id', sa.Integer(), server_default='1', nullable=False),
+        # Unique constraints on a partitioned table must include its partition key
+        sa.PrimaryKeyConstraint('tenant_id', 'id', name='item_partitioned_pkey'),
+        postgresql_partition_by='HASH (tenant_id)',
+    )
+    for remainder in range(ITEM_PARTITIONS):
+        op.execute(
+            f'CREATE TABLE item_p{remainder} PARTITION OF item_partitioned '
+            f'FOR VALUES WITH (MODULUS {ITEM_PARTITIONS}, REMAINDER {remainder})'
+        )
+    # Every user is in the default tenant so far, so every item is too
+    op.execute(
+        'INSERT INTO item_partitioned (id, title, description, owner_id, version_id) '
+        'SELECT id, title, description, owner_id, version_id FROM item'
+    )
+    _replace_item('item_partitioned', 'item_partitioned_pkey')
+    op.create_foreign_key('item_tenant_id_fkey', 'item', 'tenant', ['tenant_id'], ['id'])
+
+
+def downgrade() -> None:
+    op.create_table(
+        'item_unpartitioned',
+        *_item_columns(),
+        sa.PrimaryKeyConstraint('id', name='item_unpartitioned_pkey'),
+    )
+    op.execute(
+        'INSERT INTO item_unpartitioned (id, title, description, owner_id, version_id) '
+        'SELECT id, title, description, owner_id, version_id FROM item'
+    )
+    # Dropping the partitioned item drops its partitions too
+    _replace_item('item_unpartitioned', 'item_unpartitioned_pkey')
+
+    op.drop_index('ix_user_tenant_id', table_name='user')
+    op.drop_constraint('user_tenant_id_fkey', 'user', type_='foreignkey')
+    op.drop_column('user', 'tenant_id')
+    op.drop_table('tenant')
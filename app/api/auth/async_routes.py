@@ -0,0 +1,155 @@
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from fastapi import APIRouter, Body, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud, models, schemas
+from app.api import deps
+from app.api.rate_limit import login_rate_limit, recovery_rate_limit
+from app.core import security
+from app.core.config import settings
+from app.core.revocation import revocations
+from app.utils import (
+    generate_password_reset_token,
+    send_reset_password_email,
+    verify_password_reset_token,
+)
+
+router = APIRouter()
+
+INVALID_REFRESH_TOKEN = "Invalid or expired refresh token"
+
+
+@router.post(
+    "/login/access-token",
+    response_model=schemas.Token,
+    dependencies=[Depends(login_rate_limit)],
+)
+async def login_access_token(
+    db: AsyncSession = Depends(deps.get_async_db),
+    user_data: schemas.UserLogin = Body(...),
+) -> Any:
+    """
+    OAuth2 compatible token login, get a short-lived access token for future
+    requests and a refresh token to renew it
+    """
+    user = await crud.async_user.authenticate(
+        db, email=user_data.username, password=user_data.password
+    )
+    if not user:
+        raise HTTPException(status_code=400, detail="Incorrect email or password")
+    elif not crud.async_user.is_active(user):
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return security.create_token_pair(user.id, user.email)
+
+
+@router.post("/login/refresh-token", response_model=schemas.Token)
+async def refresh_access_token(
+    db: AsyncSession = Depends(deps.get_async_db),
+    token_in: schemas.TokenRefresh = Body(...),
+) -> Any:
+    """
+    Trade a refresh token for a new access token and refresh token. Each
+    refresh token works once, so a stolen one stops working as soon as
+    either party uses it.
+    """
+    claims = security.decode_refresh_token(token_in.refresh_token)
+    if not claims or revocations.is_revoked(claims):
+        raise HTTPException(status_code=403, detail=INVALID_REFRESH_TOKEN)
+    if await crud.async_revoked_token.is_revoked(db, claims=claims):
+        raise HTTPException(status_code=403, detail=INVALID_REFRESH_TOKEN)
+    user = await crud.async_user.get(db, id=int(claims["sub"]))
+    if not user or not crud.async_user.is_active(user):
+        raise HTTPException(status_code=403, detail=INVALID_REFRESH_TOKEN)
+    expires_at = datetime.fromtimestamp(claims["exp"], timezone.utc)
+    if not await crud.async_revoked_token.revoke(
+        db, jti=claims["jti"], user_id=user.id, expires_at=expires_at
+    ):
+        # Another request used it first
+        raise HTTPException(status_code=403, detail=INVALID_REFRESH_TOKEN)
+    return security.create_token_pair(user.id, user.email)
+
+
+@router.post("/logout", response_model=schemas.Msg)
+async def logout(
+    db: AsyncSession = Depends(deps.get_async_db),
+    token: str = Depends(deps.jwt_bearer),
+) -> Any:
+    """
+    Revoke the access token and the refresh token it was issued with
+    """
+    claims = deps.get_token_claims(token)
+    user_id = int(claims["sub"])
+    if "jti" in claims:
+        expires_at = datetime.fromtimestamp(claims["exp"], timezone.utc)
+        await crud.async_revoked_token.revoke(
+            db, jti=claims["jti"], user_id=user_id, expires_at=expires_at
+        )
+    if "sid" in claims:
+        expires_at = datetime.now(timezone.utc) + timedelta(
+            minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES
+        )
+        await crud.async_revoked_token.revoke(
+            db, jti=claims["sid"], user_id=user_id, expires_at=expires_at
+        )
+    return {"msg": "Logged out"}
+
+
+@router.post("/login/test-token", response_model=schemas.User)
+async def test_token(
+    current_user: models.User = Depends(deps.get_current_user_async),
+) -> Any:
+    """
+    Test access token
+    """
+    return current_user
+
+
+@router.post(
+    "/password-recovery/{email}",
+    response_model=schemas.Msg,
+    dependencies=[Depends(recovery_rate_limit)],
+)
+async def recover_password(
+    email: str, db: AsyncSession = Depends(deps.get_async_db)
+) -> Any:
+    """
+    Password Recovery
+    """
+    user = await crud.async_user.get_by_email(db, email=email)
+
+    if not user:
+        raise HTTPException(
+            status_code=404,
+            detail="The user with this username does not exist in the system.",
+        )
+    password_reset_token = generate_password_reset_token(email=email)
+    send_reset_password_email(
+        email_to=user.email, email=email, token=password_reset_token
+    )
+    return {"msg": "Password recovery email sent"}
+
+
+@router.post("/reset-password/", response_model=schemas.Msg)
+async def reset_password(
+    token: str = Body(...),
+    new_password: str = Body(...),
+    db: AsyncSession = Depends(deps.get_async_db),
+) -> Any:
+    """
+    Reset password
+    """
+    email = verify_password_reset_token(token)
+    if not email:
+        raise HTTPException(status_code=400, detail="Invalid token")
+    user = await crud.async_user.get_by_email(db, email=email)
+    if not user:
+        raise HTTPException(
+            status_code=404,
+            detail="The user with this username does not exist in the system.",
+        )
+    elif not crud.async_user.is_active(user):
+        raise HTTPException(status_code=400, detail="Inactive user")
+    await crud.async_user.update(db, db_obj=user, obj_in={"password": new_password})
+    return {"msg": "Password updated successfully"}
@@ -1,4 +1,4 @@
-from datetime import timedelta
+from datetime import datetime, timedelta, timezone
 from typing import Any
 
 from fastapi import APIRouter, Body, Depends, HTTPException, Form
@@ -6,9 +6,10 @@ from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
 from app.api import deps
+from app.api.rate_limit import login_rate_limit, recovery_rate_limit
 from app.core import security
 from app.core.config import settings
-from app.core.security import get_password_hash
+from app.core.revocation import revocations
 from app.utils import (
     generate_password_reset_token,
     send_reset_password_email,
@@ -17,13 +18,20 @@ from app.utils import (
 
 router = APIRouter()
 
+INVALID_REFRESH_TOKEN = "Invalid or expired refresh token"
 
-@router.post("/login/access-token", response_model=schemas.Token)
+
+@router.post(
+    "/login/access-token",
+    response_model=schemas.Token,
+    dependencies=[Depends(login_rate_limit)],
+)
 def login_access_token(
     db: Session = Depends(deps.get_db), user_data: schemas.UserLogin = Body(...)
 ) -> Any:
     """
-    OAuth2 compatible token login, get an access token for future requests
+    OAuth2 compatible token login, get a short-lived access token for future
+    requests and a refresh token to renew it
     """
     user = crud.user.authenticate(
         db, email=user_data.username, password=user_data.password
@@ -32,13 +40,59 @@ def login_access_token(
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     elif not crud.user.is_active(user):
         raise HTTPException(status_code=400, detail="Inactive user")
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    return {
-        "access_token": security.create_access_token(
-            user.id, user.email, expires_delta=access_token_expires
-        ),
-        "token_type": "bearer",
-    }
+    return security.create_token_pair(user.id, user.email)
+
+
+@router.post("/login/refresh-token", response_model=schemas.Token)
+def refresh_access_token(
+    db: Session = Depends(deps.get_db),
+    token_in: schemas.TokenRefresh = Body(...),
+) -> Any:
+    """
+    Trade a refresh token for a new access token and refresh token. Each
+    refresh token works once, so a stolen one stops working as soon as
+    either party uses it.
+    """
+    claims = security.decode_refresh_token(token_in.refresh_token)
+    if not claims or revocations.is_revoked(claims):
+        raise HTTPException(status_code=403, detail=INVALID_REFRESH_TOKEN)
+    if crud.revoked_token.is_revoked(db, claims=claims):
+        raise HTTPException(status_code=403, detail=INVALID_REFRESH_TOKEN)
+    user = crud.user.get(db, id=int(claims["sub"]))
+    if not user or not crud.user.is_active(user):
+        raise HTTPException(status_code=403, detail=INVALID_REFRESH_TOKEN)
+    expires_at = datetime.fromtimestamp(claims["exp"], timezone.utc)
+    if not crud.revoked_token.revoke(
+        db, jti=claims["jti"], user_id=user.id, expires_at=expires_at
+    ):
+        # Another request used it first
+        raise HTTPException(status_code=403, detail=INVALID_REFRESH_TOKEN)
+    return security.create_token_pair(user.id, user.email)
+
+
+@router.post("/logout", response_model=schemas.Msg)
+def logout(
+    db: Session = Depends(deps.get_db),
+    token: str = Depends(deps.jwt_bearer),
+) -> Any:
+    """
+    Revoke the access token and the refresh token it was issued with
+    """
+    claims = deps.get_token_claims(token)
+    user_id = int(claims["sub"])
+    if "jti" in claims:
+        expires_at = datetime.fromtimestamp(claims["exp"], timezone.utc)
+        crud.revoked_token.revoke(
+            db, jti=claims["jti"], user_id=user_id, expires_at=expires_at
+        )
+    if "sid" in claims:
+        expires_at = datetime.now(timezone.utc) + timedelta(
+            minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES
+        )
+        crud.revoked_token.revoke(
+            db, jti=claims["sid"], user_id=user_id, expires_at=expires_at
+        )
+    return {"msg": "Logged out"}
 
 
 @router.post("/login/test-token", response_model=schemas.User)
@@ -49,7 +103,11 @@ def test_token(current_user: models.User = Depends(deps.get_current_user)) -> An
     return current_user
 
 
-@router.post("/password-recovery/{email}", response_model=schemas.Msg)
+@router.post(
+    "/password-recovery/{email}",
+    response_model=schemas.Msg,
+    dependencies=[Depends(recovery_rate_limit)],
+)
 def recover_password(email: str, db: Session = Depends(deps.get_db)) -> Any:
     """
     Password Recovery
@@ -88,8 +146,5 @@ def reset_password(
         )
     elif not crud.user.is_active(user):
         raise HTTPException(status_code=400, detail="Inactive user")
-    hashed_password = get_password_hash(new_password)
-    user.hashed_password = hashed_password
-    db.add(user)
-    db.commit()
+    crud.user.update(db, db_obj=user, obj_in={"password": new_password})
     return {"msg": "Password updated successfully"}
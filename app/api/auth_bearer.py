@@ -3,7 +3,10 @@ from typing import Optional
 from fastapi import Request, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
-from app.core.security import decode_access_token
+from app.core.instrumentation import phase
+from app.core.revocation import revocations
+from app.core.security import ACCESS_TOKEN_TYPE, decode_access_token
+from app.core.token_cache import token_cache
 
 
 class JWTBearer(HTTPBearer):
@@ -25,7 +28,9 @@ class JWTBearer(HTTPBearer):
         if credentials.scheme.lower() != "bearer":
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid authentication scheme.")
 
-        if not self.verify_jwt(credentials.credentials):
+        with phase("auth"):
+            verified = self.verify_jwt(credentials.credentials)
+        if not verified:
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Invalid token or expired token.")
 
         return credentials.credentials
@@ -33,10 +38,20 @@ class JWTBearer(HTTPBearer):
     def verify_jwt(self, jwt_token: str) -> bool:
         """
         Verifies the JWT token and returns True if valid, otherwise False.
+        Verified tokens are cached until they expire, so a repeat token skips decoding;
+        revocation is checked every time, against the in-memory revocation list.
         """
+        cached = token_cache.get(jwt_token)
+        if cached is not None:
+            return not revocations.is_revoked(cached.claims)
         try:
             payload = decode_access_token(jwt_token)
-            return bool(payload)  # Return True if payload is not None, otherwise False
+            # Refresh tokens are only good for getting new tokens; tokens
+            # issued before token types existed are access tokens
+            if not payload or payload.get("type", ACCESS_TOKEN_TYPE) != ACCESS_TOKEN_TYPE:
+                return False
+            token_cache.put(jwt_token, payload)
+            return not revocations.is_revoked(payload)
         except Exception as e:
             # Log the error if needed
             return False
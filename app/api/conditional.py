@@ -0,0 +1,68 @@
+from typing import Any, Optional, Type
+
+from fastapi import Request, Response
+from pydantic import BaseModel
+
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.serialization import serialized_response, serializer_for
+
+DEFAULT_CACHE_CONTROL = "private, no-cache"
+
+
+def etag(kind: str, obj: Any) -> str:
+    """
+    Weak ETag of a versioned row, or of a snapshot that kept its `version_id`.
+    """
+    return f'W/"{kind}-{obj.id}-{obj.version_id}"'
+
+
+def etag_matches(if_none_match: Optional[str], tag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison: W/ prefixes are ignored
+    return any(
+        candidate.strip().removeprefix("W/") == tag.removeprefix("W/")
+        for candidate in if_none_match.split(",")
+    )
+
+
+def cache_control(route: str) -> str:
+    return settings.CACHE_CONTROL.get(route, DEFAULT_CACHE_CONTROL)
+
+
+def conditional_response(
+    request: Request,
+    response: Response,
+    *,
+    route: str,
+    viewer_id: Any,
+    kind: str,
+    obj: Any,
+    schema: Type[BaseModel],
+) -> Any:
+    """
+    Answer a GET of one versioned row: 304 when the client's `If-None-Match`
+    still matches, otherwise the body kept in the response cache, otherwise
+    `obj` serialized as usual.
+
+    Cached bodies are keyed on the route, the caller and the ETag, so an
+    update, which bumps the row version, stops them from being served.
+    """
+    tag = etag(kind, obj)
+    headers = {"ETag": tag, "Cache-Control": cache_control(route)}
+    if etag_matches(request.headers.get("if-none-match"), tag):
+        return Response(status_code=304, headers=headers)
+    if not settings.RESPONSE_CACHE_ENABLED:
+        if settings.FAST_SERIALIZATION:
+            return serialized_response(schema, obj, headers=headers)
+        response.headers.update(headers)
+        return obj
+    key = f"response:{route}:{viewer_id}:{tag}"
+    body = cache.get(key)
+    if body is None:
+        body = serializer_for(schema).dumps(obj).decode()
+        cache.set(key, body, settings.RESPONSE_CACHE_TTL_SECONDS)
+    return Response(content=body, media_type="application/json", headers=headers)
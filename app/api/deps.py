@@ -1,16 +1,21 @@
-from typing import Generator
+from typing import AsyncGenerator, Generator, Optional
 
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from pydantic import ValidationError
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
 from app.core import security
 from app.core.config import settings
+from app.core.instrumentation import phase
+from app.core.principal import Principal
 from app.core.security import decode_access_token
-from app.db.session import SessionLocal
+from app.core.token_cache import CachedToken, token_cache
+from app.db.session import AsyncSessionLocal, SessionLocal
+from app.db.tenancy import set_tenant
 from .auth_bearer import JWTBearer
 
 # reusable_oauth2 = OAuth2PasswordBearer(
@@ -28,36 +33,191 @@ def get_db() -> Generator:
         db.close()
 
 
+async def get_async_db() -> AsyncGenerator:
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_token_claims(token: str) -> dict:
+    """
+    Claims of a token `jwt_bearer` has already verified.
+    """
+    cached = token_cache.get(token)
+    return cached.claims if cached is not None else decode_access_token(token)
+
+
+def get_token_data(token: str) -> schemas.TokenPayload:
+    with phase("auth"):
+        try:
+            return schemas.TokenPayload(**get_token_claims(token))
+        except (jwt.JWTError, ValidationError):
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Could not validate credentials",
+            )
+
+
+def _token_entry(token: str, cached: Optional[CachedToken]) -> Optional[CachedToken]:
+    # The bearer caches every token it verifies, unless it was evicted since
+    if cached is None:
+        cached = token_cache.put(token, decode_access_token(token) or {})
+    return cached
+
+
 def get_current_user(
     db: Session = Depends(get_db), token: str = Depends(jwt_bearer)
 ) -> models.User:
-    try:
-        payload = decode_access_token(token)
-        token_data = schemas.TokenPayload(**payload)
-    except (jwt.JWTError, ValidationError):
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Could not validate credentials",
-        )
+    token_data = get_token_data(token)
     user = crud.user.get(db, id=token_data.sub)
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
+    set_tenant(db, user.tenant_id)
     return user
 
 
+def get_current_principal(
+    db: Session = Depends(get_db), token: str = Depends(jwt_bearer)
+) -> Principal:
+    """
+    The token's user as a `Principal`, cached with the token, so repeat
+    requests neither query the database nor build an ORM object. The request's
+    session is scoped to the user's tenant.
+    """
+    cached = token_cache.get(token)
+    principal = cached.principal if cached is not None else None
+    if principal is None:
+        token_data = get_token_data(token)
+        principal = crud.user.get_principal(db, id=token_data.sub)
+        if principal is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        cached = _token_entry(token, cached)
+        if cached is not None:
+            cached.principal = principal
+    set_tenant(db, principal.tenant_id)
+    return principal
+
+
 def get_current_active_user(
-    current_user: models.User = Depends(get_current_user),
-) -> models.User:
+    current_user: Principal = Depends(get_current_principal),
+) -> Principal:
     if not crud.user.is_active(current_user):
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
 
 
 def get_current_active_superuser(
+    current_user: Principal = Depends(get_current_principal),
+) -> Principal:
+    if not crud.user.is_superuser(current_user):
+        raise HTTPException(
+            status_code=400, detail="The user doesn't have enough privileges"
+        )
+    return current_user
+
+
+def get_current_active_user_model(
     current_user: models.User = Depends(get_current_user),
 ) -> models.User:
-    if not crud.user.is_superuser(current_user):
+    """
+    Like `get_current_active_user`, but loads the `models.User` row, for
+    routes that read more of the user or update it.
+    """
+    if not crud.user.is_active(current_user):
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
+
+
+def _cached_user_snapshot(
+    token: str, user: models.User, cached: Optional[CachedToken]
+) -> schemas.UserSnapshot:
+    snapshot = schemas.UserSnapshot.from_orm(user)
+    cached = _token_entry(token, cached)
+    if cached is not None:
+        cached.user = snapshot
+    return snapshot
+
+
+def get_current_active_user_cached(
+    db: Session = Depends(get_db), token: str = Depends(jwt_bearer)
+) -> schemas.UserSnapshot:
+    """
+    Like `get_current_active_user`, but returns a read-only snapshot of the user
+    that is cached with the token, so repeat requests skip the database.
+    """
+    cached = token_cache.get(token)
+    snapshot = cached.user if cached is not None else None
+    if snapshot is None:
+        user = get_current_user(db, token)
+        snapshot = _cached_user_snapshot(token, user, cached)
+    set_tenant(db, snapshot.tenant_id)
+    if not snapshot.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return snapshot
+
+
+async def get_current_user_async(
+    db: AsyncSession = Depends(get_async_db), token: str = Depends(jwt_bearer)
+) -> models.User:
+    token_data = get_token_data(token)
+    user = await crud.async_user.get(db, id=token_data.sub)
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    set_tenant(db, user.tenant_id)
+    return user
+
+
+async def get_current_principal_async(
+    db: AsyncSession = Depends(get_async_db), token: str = Depends(jwt_bearer)
+) -> Principal:
+    cached = token_cache.get(token)
+    principal = cached.principal if cached is not None else None
+    if principal is None:
+        token_data = get_token_data(token)
+        principal = await crud.async_user.get_principal(db, id=token_data.sub)
+        if principal is None:
+            raise HTTPException(status_code=404, detail="User not found")
+        cached = _token_entry(token, cached)
+        if cached is not None:
+            cached.principal = principal
+    set_tenant(db, principal.tenant_id)
+    return principal
+
+
+async def get_current_active_user_async(
+    current_user: Principal = Depends(get_current_principal_async),
+) -> Principal:
+    if not crud.async_user.is_active(current_user):
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
+
+
+async def get_current_active_superuser_async(
+    current_user: Principal = Depends(get_current_principal_async),
+) -> Principal:
+    if not crud.async_user.is_superuser(current_user):
         raise HTTPException(
             status_code=400, detail="The user doesn't have enough privileges"
         )
     return current_user
+
+
+async def get_current_active_user_model_async(
+    current_user: models.User = Depends(get_current_user_async),
+) -> models.User:
+    if not crud.async_user.is_active(current_user):
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
+
+
+async def get_current_active_user_cached_async(
+    db: AsyncSession = Depends(get_async_db), token: str = Depends(jwt_bearer)
+) -> schemas.UserSnapshot:
+    cached = token_cache.get(token)
+    snapshot = cached.user if cached is not None else None
+    if snapshot is None:
+        user = await get_current_user_async(db, token)
+        snapshot = _cached_user_snapshot(token, user, cached)
+    set_tenant(db, snapshot.tenant_id)
+    if not snapshot.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return snapshot
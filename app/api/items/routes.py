@@ -0,0 +1,132 @@
+from typing import Any, List, Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy.orm import Session
+
+from app import crud, schemas
+from app.api import deps
+from app.api.conditional import conditional_response
+from app.core.principal import Principal
+
+router = APIRouter()
+
+
+@router.get("/", response_model=List[schemas.Item])
+def read_items(
+    response: Response,
+    db: Session = Depends(deps.get_db),
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    owner_id: Optional[int] = None,
+    current_user: Principal = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Retrieve items.
+
+    Users get their own items. Superusers get every item, or those of
+    `owner_id`. Paging works as for `GET /users/`.
+    """
+    if not crud.user.is_superuser(current_user):
+        owner_id = current_user.id
+    if cursor is None and skip:
+        if owner_id is None:
+            return crud.item.get_multi(db, skip=skip, limit=limit)
+        return crud.item.get_multi_by_owner(
+            db, owner_id=owner_id, skip=skip, limit=limit
+        )
+    try:
+        if owner_id is None:
+            items, next_cursor = crud.item.get_multi_keyset(
+                db, cursor=cursor, limit=limit
+            )
+        else:
+            items, next_cursor = crud.item.get_multi_by_owner_keyset(
+                db, owner_id=owner_id, cursor=cursor, limit=limit
+            )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return items
+
+
+@router.post("/", response_model=schemas.Item)
+def create_item(
+    *,
+    db: Session = Depends(deps.get_db),
+    item_in: schemas.ItemCreate,
+    current_user: Principal = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Create new item.
+    """
+    item = crud.item.create_with_owner(db=db, obj_in=item_in, owner_id=current_user.id)
+    return item
+
+
+@router.put("/{id}", response_model=schemas.Item)
+def update_item(
+    *,
+    db: Session = Depends(deps.get_db),
+    id: int,
+    item_in: schemas.ItemUpdate,
+    current_user: Principal = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Update an item.
+    """
+    item = crud.item.get(db=db, id=id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
+    if not crud.user.is_superuser(current_user) and (item.owner_id != current_user.id):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    item = crud.item.update(db=db, db_obj=item, obj_in=item_in)
+    return item
+
+
+@router.get("/{id}", response_model=schemas.Item)
+def read_item(
+    *,
+    request: Request,
+    response: Response,
+    db: Session = Depends(deps.get_db),
+    id: int,
+    current_user: Principal = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Get item by ID, with an `ETag` as for `GET /users/me`.
+    """
+    item = crud.item.get(db=db, id=id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
+    if not crud.user.is_superuser(current_user) and (item.owner_id != current_user.id):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    return conditional_response(
+        request,
+        response,
+        route="read_item",
+        viewer_id=current_user.id,
+        kind="item",
+        obj=item,
+        schema=schemas.Item,
+    )
+
+
+@router.delete("/{id}", response_model=schemas.Item)
+def delete_item(
+    *,
+    db: Session = Depends(deps.get_db),
+    id: int,
+    current_user: Principal = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Delete an item.
+    """
+    item = crud.item.get(db=db, id=id)
+    if not item:
+        raise HTTPException(status_code=404, detail="Item not found")
+    if not crud.user.is_superuser(current_user) and (item.owner_id != current_user.id):
+        raise HTTPException(status_code=400, detail="Not enough permissions")
+    item = crud.item.remove(db=db, id=id)
+    return item
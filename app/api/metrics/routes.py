@@ -0,0 +1,83 @@
+from typing import Any, Dict, List
+
+from fastapi import APIRouter, Depends
+
+from app.api import deps
+from app.core.cache import cache
+from app.core.hashing import hasher
+from app.core.mail import mailer
+from app.core.principal import Principal
+from app.core.rate_limit import rate_limiter
+from app.db.pool import pool_status
+from app.db.routing import ReplicaSet
+from app.db.session import async_engine, async_replicas, engine, replicas
+
+router = APIRouter()
+
+
+@router.get("/hashing")
+def read_hashing_metrics(
+    current_user: Principal = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Password hashing pool counters: time spent waiting for a worker versus hashing.
+    """
+    return {
+        "pool_size": hasher.pool_size,
+        "queue_depth": hasher.queue_depth,
+        **hasher.metrics.snapshot(),
+    }
+
+
+@router.get("/cache")
+def read_cache_metrics(
+    current_user: Principal = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Hit/miss counters of this worker's view of the row cache.
+    """
+    return {"backend": type(cache).__name__, **cache.stats.snapshot()}
+
+
+@router.get("/email")
+def read_email_metrics(
+    current_user: Principal = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Email queue depth and send outcomes of this worker.
+    """
+    return {"pending": mailer.pending(), "workers": mailer.workers, **mailer.metrics.snapshot()}
+
+
+@router.get("/rate-limit")
+def read_rate_limit_metrics(
+    current_user: Principal = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Requests this worker let through or rejected with 429.
+    """
+    return {"backend": type(rate_limiter).__name__, **rate_limiter.stats.snapshot()}
+
+
+@router.get("/db-pool")
+def read_db_pool_metrics(
+    current_user: Principal = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Connection pool occupancy and checkout waits of this worker's engines.
+    """
+    pools = {"sync": pool_status(engine)}
+    if replicas is not None:
+        pools["sync_replicas"] = _replica_status(replicas)
+    if async_engine is not None:
+        pools["async"] = pool_status(async_engine.sync_engine)
+    if async_replicas is not None:
+        pools["async_replicas"] = _replica_status(async_replicas)
+    return pools
+
+
+def _replica_status(replicas: ReplicaSet) -> List[Dict[str, Any]]:
+    return [
+        {**status, **pool_status(replica)}
+        for status, replica in zip(replicas.status(), replicas.engines)
+    ]
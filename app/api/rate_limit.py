@@ -0,0 +1,86 @@
+import math
+from typing import Any, Callable, Optional
+
+from fastapi import HTTPException, Request, status
+
+from app.core.config import settings
+from app.core.rate_limit import parse_limit, rate_limiter
+
+
+class RateLimit:
+    def __init__(
+        self,
+        scope: str,
+        *,
+        per_ip: str,
+        per_account: Optional[str] = None,
+        account: Optional[Callable[[Request], Any]] = None,
+    ):
+        """
+        Dependency that rejects a request with 429 once its client IP, or the
+        account it names, is over the limit for `scope`.
+
+        Add it to the route decorator's `dependencies` so it runs before the
+        route's own dependencies, i.e. before any database or bcrypt work.
+        `account` picks the account out of the request; it may await the
+        body, which FastAPI has already read at that point.
+        """
+        self.scope = scope
+        self.per_ip = parse_limit(per_ip)
+        self.per_account = parse_limit(per_account) if per_account else None
+        self.account = account
+
+    async def __call__(self, request: Request) -> None:
+        if not settings.RATE_LIMIT_ENABLED:
+            return
+        retry_after = await rate_limiter.hit(
+            f"{self.scope}:ip:{client_ip(request)}", *self.per_ip
+        )
+        if retry_after is None and self.per_account and self.account:
+            account = await self.account(request)
+            if account:
+                retry_after = await rate_limiter.hit(
+                    f"{self.scope}:account:{account}", *self.per_account
+                )
+        if retry_after is not None:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many attempts, please retry later",
+                headers={"Retry-After": str(max(math.ceil(retry_after), 1))},
+            )
+
+
+def client_ip(request: Request) -> str:
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",", 1)[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+async def login_account(request: Request) -> Optional[str]:
+    try:
+        body = await request.json()
+    except ValueError:
+        return None
+    username = body.get("username") if isinstance(body, dict) else None
+    return username.strip().lower() if isinstance(username, str) else None
+
+
+async def path_email_account(request: Request) -> Optional[str]:
+    email = request.path_params.get("email")
+    return email.strip().lower() if email else None
+
+
+login_rate_limit = RateLimit(
+    "login",
+    per_ip=settings.RATE_LIMIT_LOGIN_PER_IP,
+    per_account=settings.RATE_LIMIT_LOGIN_PER_ACCOUNT,
+    account=login_account,
+)
+recovery_rate_limit = RateLimit(
+    "recovery",
+    per_ip=settings.RATE_LIMIT_RECOVERY_PER_IP,
+    per_account=settings.RATE_LIMIT_RECOVERY_PER_ACCOUNT,
+    account=path_email_account,
+)
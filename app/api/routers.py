@@ -1,8 +1,26 @@
 from fastapi import APIRouter
+from app.api.users import async_routes as async_user_routes
 from app.api.users import routes as user_routes
+from app.api.auth import async_routes as async_auth_routes
 from app.api.auth import routes as auth_routes
+from app.api.items import async_routes as async_item_routes
+from app.api.items import routes as item_routes
+from app.api.metrics import routes as metrics_routes
+from app.api.search import async_routes as async_search_routes
+from app.api.search import routes as search_routes
+from app.core.config import settings
 
 api_router = APIRouter()
 
-api_router.include_router(user_routes.router, prefix="/users", tags=["users"])
-api_router.include_router(auth_routes.router, prefix="/auth", tags=["auth"])
+if settings.DB_ASYNC_MODE:
+    api_router.include_router(async_user_routes.router, prefix="/users", tags=["users"])
+    api_router.include_router(async_auth_routes.router, prefix="/auth", tags=["auth"])
+    api_router.include_router(async_item_routes.router, prefix="/items", tags=["items"])
+    api_router.include_router(async_search_routes.router, prefix="/search", tags=["search"])
+else:
+    api_router.include_router(user_routes.router, prefix="/users", tags=["users"])
+    api_router.include_router(auth_routes.router, prefix="/auth", tags=["auth"])
+    api_router.include_router(item_routes.router, prefix="/items", tags=["items"])
+    api_router.include_router(search_routes.router, prefix="/search", tags=["search"])
+
+api_router.include_router(metrics_routes.router, prefix="/metrics", tags=["metrics"])
@@ -0,0 +1,43 @@
+from typing import Any, List
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud, schemas
+from app.api import deps
+from app.core.principal import Principal
+
+router = APIRouter()
+
+
+@router.get("/items", response_model=List[schemas.Item])
+async def search_items(
+    q: str = Query(..., min_length=1, max_length=200),
+    skip: int = 0,
+    limit: int = 20,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: Principal = Depends(deps.get_current_active_user_async),
+) -> Any:
+    """
+    Search items by title and description, best matches first.
+    Users search their own items, superusers search every item.
+    """
+    if crud.async_user.is_superuser(current_user):
+        return await crud.async_item.search(db, q=q, skip=skip, limit=limit)
+    return await crud.async_item.search(
+        db, q=q, skip=skip, limit=limit, owner_id=current_user.id
+    )
+
+
+@router.get("/users", response_model=List[schemas.User])
+async def search_users(
+    q: str = Query(..., min_length=1, max_length=200),
+    skip: int = 0,
+    limit: int = 20,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: Principal = Depends(deps.get_current_active_superuser_async),
+) -> Any:
+    """
+    Search users by full name and email, best matches first.
+    """
+    return await crud.async_user.search(db, q=q, skip=skip, limit=limit)
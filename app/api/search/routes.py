@@ -0,0 +1,41 @@
+from typing import Any, List
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app import crud, schemas
+from app.api import deps
+from app.core.principal import Principal
+
+router = APIRouter()
+
+
+@router.get("/items", response_model=List[schemas.Item])
+def search_items(
+    q: str = Query(..., min_length=1, max_length=200),
+    skip: int = 0,
+    limit: int = 20,
+    db: Session = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_active_user),
+) -> Any:
+    """
+    Search items by title and description, best matches first.
+    Users search their own items, superusers search every item.
+    """
+    if crud.user.is_superuser(current_user):
+        return crud.item.search(db, q=q, skip=skip, limit=limit)
+    return crud.item.search(db, q=q, skip=skip, limit=limit, owner_id=current_user.id)
+
+
+@router.get("/users", response_model=List[schemas.User])
+def search_users(
+    q: str = Query(..., min_length=1, max_length=200),
+    skip: int = 0,
+    limit: int = 20,
+    db: Session = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Search users by full name and email, best matches first.
+    """
+    return crud.user.search(db, q=q, skip=skip, limit=limit)
@@ -0,0 +1,322 @@
+from typing import Any, AsyncIterator, Iterator, List, Optional
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from pydantic.networks import EmailStr
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud, models, schemas
+from app.api import deps
+from app.api.conditional import conditional_response
+from app.api.users import bulk
+from app.core.config import settings
+from app.core.principal import Principal
+from app.core.serialization import (
+    EXPORT_MEDIA_TYPES,
+    aexport_chunks,
+    schema_fields,
+    serialized_response,
+)
+from app.utils import send_new_account_email
+
+router = APIRouter()
+
+
+@router.get("/alive")
+async def alive():
+    return {'status': 'ok'}
+
+
+@router.get("/", response_model=List[schemas.User])
+async def read_users(
+    response: Response,
+    db: AsyncSession = Depends(deps.get_async_db),
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    order_by: str = "id",
+    current_user: Principal = Depends(deps.get_current_active_superuser_async),
+) -> Any:
+    """
+    Retrieve users.
+
+    Without `skip`, pages by keyset: pass the `X-Next-Cursor` header of the
+    previous page as `cursor` to get the next one.
+    """
+    if cursor is None and skip:
+        users = await crud.async_user.get_multi(db, skip=skip, limit=limit)
+        next_cursor = None
+    else:
+        try:
+            users, next_cursor = await crud.async_user.get_multi_keyset(
+                db, cursor=cursor, limit=limit, order_by=order_by
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    if settings.FAST_SERIALIZATION:
+        return serialized_response(schemas.User, users, headers=headers)
+    response.headers.update(headers)
+    return users
+
+
+@router.get("/export", response_class=StreamingResponse)
+async def export_users(
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: Principal = Depends(deps.get_current_active_superuser_async),
+) -> Any:
+    """
+    Stream all users as NDJSON or CSV straight from a server-side cursor.
+    """
+    fields = schema_fields(schemas.User)
+    result = await crud.async_user.stream(
+        db, fields=fields, batch_size=settings.EXPORT_BATCH_SIZE
+    )
+    return StreamingResponse(
+        aexport_chunks(fields, result.partitions(), format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=users.{format}"},
+    )
+
+
+@router.post("/", response_model=schemas.User)
+async def create_user(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    user_in: schemas.UserCreate,
+    current_user: Principal = Depends(deps.get_current_active_superuser_async),
+) -> Any:
+    """
+    Create new user.
+    """
+    if await crud.async_user.email_exists(db, email=user_in.email):
+        raise HTTPException(
+            status_code=400,
+            detail="The user with this username already exists in the system.",
+        )
+    try:
+        user = await crud.async_user.create(db, obj_in=user_in)
+    except IntegrityError:
+        # Taken by a concurrent request since the check
+        await db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="The user with this username already exists in the system.",
+        )
+    if settings.EMAILS_ENABLED and user_in.email:
+        send_new_account_email(
+            email_to=user_in.email, username=user_in.email, password=user_in.password
+        )
+    return user
+
+
+@router.post("/bulk", response_class=StreamingResponse)
+async def create_users_bulk(
+    request: Request,
+    db: AsyncSession = Depends(deps.get_async_db),
+    current_user: Principal = Depends(deps.get_current_active_superuser_async),
+) -> Any:
+    """
+    Import users from an NDJSON body, or CSV with a header row when sent as
+    `text/csv`. Rows are inserted in batches and one NDJSON result per input
+    row is streamed back: `created`, `exists`, `duplicate` or `invalid`.
+    """
+    body = await bulk.spool_body(request)
+    records = bulk.iter_records(body, request.headers.get("content-type", ""))
+
+    async def results() -> AsyncIterator[str]:
+        try:
+            for batch in bulk.batched(records, settings.BULK_IMPORT_BATCH_SIZE):
+                known, pending = bulk.plan_batch(batch)
+                created = await crud.async_user.create_bulk(
+                    db, objs_in=[u for _, u in pending]
+                )
+                for line in bulk.finish_batch(known, pending, created):
+                    yield line
+        finally:
+            body.close()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@router.put("/me", response_model=schemas.User)
+async def update_user_me(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    password: str = Body(None),
+    full_name: str = Body(None),
+    email: EmailStr = Body(None),
+    current_user: models.User = Depends(deps.get_current_active_user_model_async),
+) -> Any:
+    """
+    Update own user.
+    """
+    current_user_data = jsonable_encoder(current_user)
+    user_in = schemas.UserUpdate(**current_user_data)
+    if password is not None:
+        user_in.password = password
+    if full_name is not None:
+        user_in.full_name = full_name
+    if email is not None:
+        user_in.email = email
+    user = await crud.async_user.update(db, db_obj=current_user, obj_in=user_in)
+    return user
+
+
+@router.get("/me", response_model=schemas.User)
+async def read_user_me(
+    request: Request,
+    response: Response,
+    current_user: schemas.UserSnapshot = Depends(deps.get_current_active_user_cached_async),
+) -> Any:
+    """
+    Get current user.
+
+    Sends an `ETag`; a request whose `If-None-Match` still matches gets a 304.
+    """
+    return conditional_response(
+        request,
+        response,
+        route="read_user_me",
+        viewer_id=current_user.id,
+        kind="user",
+        obj=current_user,
+        schema=schemas.User,
+    )
+
+
+@router.post("/open", response_model=schemas.User)
+async def create_user_open(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    password: str = Body(...),
+    email: EmailStr = Body(...),
+    full_name: str = Body(None),
+) -> Any:
+    """
+    Create new user without the need to be logged in.
+    """
+    if not settings.USERS_OPEN_REGISTRATION:
+        raise HTTPException(
+            status_code=403,
+            detail="Open user registration is forbidden on this server",
+        )
+    if await crud.async_user.email_exists(db, email=email):
+        raise HTTPException(
+            status_code=400,
+            detail="The user with this username already exists in the system",
+        )
+    user_in = schemas.UserCreate(password=password, email=email, full_name=full_name)
+    try:
+        user = await crud.async_user.create(db, obj_in=user_in)
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="The user with this username already exists in the system",
+        )
+    return user
+
+
+@router.get("/batch", response_model=List[schemas.User])
+async def read_users_batch(
+    ids: List[int] = Query(...),
+    current_user: Principal = Depends(deps.get_current_active_user_async),
+    db: AsyncSession = Depends(deps.get_async_db),
+) -> Any:
+    """
+    Get several users by id (`?ids=1&ids=2`) with one query, in the order
+    the ids are given. As for `GET /users/{user_id}`, only superusers get
+    users other than themselves; those, and ids without a user, are left out.
+    Duplicate ids are dropped and at most `USERS_BATCH_MAX_IDS` are allowed.
+    """
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > settings.USERS_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.USERS_BATCH_MAX_IDS} ids can be requested at once",
+        )
+    if not crud.async_user.is_superuser(current_user):
+        ids = [id for id in ids if id == current_user.id]
+    users = await crud.async_user.get_many(db, ids)
+    if settings.FAST_SERIALIZATION:
+        return serialized_response(schemas.User, users)
+    return users
+
+
+@router.get("/{user_id}", response_model=schemas.User)
+async def read_user_by_id(
+    request: Request,
+    response: Response,
+    user_id: int,
+    current_user: Principal = Depends(deps.get_current_active_user_async),
+    db: AsyncSession = Depends(deps.get_async_db),
+) -> Any:
+    """
+    Get a specific user by id, with an `ETag` as for `GET /users/me`.
+    """
+    user = await crud.async_user.get(db, id=user_id)
+    if user_id != current_user.id and not crud.async_user.is_superuser(current_user):
+        raise HTTPException(
+            status_code=400, detail="The user doesn't have enough privileges"
+        )
+    if user is None:
+        return user
+    return conditional_response(
+        request,
+        response,
+        route="read_user_by_id",
+        viewer_id=current_user.id,
+        kind="user",
+        obj=user,
+        schema=schemas.User,
+    )
+
+
+@router.put("/{user_id}", response_model=schemas.User)
+async def update_user(
+    *,
+    db: AsyncSession = Depends(deps.get_async_db),
+    user_id: int,
+    user_in: schemas.UserUpdate,
+    current_user: Principal = Depends(deps.get_current_active_superuser_async),
+) -> Any:
+    """
+    Update a user.
+    """
+    user = await crud.async_user.get(db, id=user_id)
+    if not user:
+        raise HTTPException(
+            status_code=404,
+            detail="The user with this username does not exist in the system",
+        )
+    user = await crud.async_user.update(db, db_obj=user, obj_in=user_in)
+    return user
+
+
+@router.get("/{user_id}/items/export", response_class=StreamingResponse)
+async def export_user_items(
+    user_id: int,
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    current_user: Principal = Depends(deps.get_current_active_user_async),
+    db: AsyncSession = Depends(deps.get_async_db),
+) -> Any:
+    """
+    Stream the items owned by a user as NDJSON or CSV.
+    """
+    if user_id != current_user.id and not crud.async_user.is_superuser(current_user):
+        raise HTTPException(
+            status_code=400, detail="The user doesn't have enough privileges"
+        )
+    fields = schema_fields(schemas.Item)
+    result = await crud.async_item.stream(
+        db, fields=fields, batch_size=settings.EXPORT_BATCH_SIZE, owner_id=user_id
+    )
+    return StreamingResponse(
+        aexport_chunks(fields, result.partitions(), format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=items.{format}"},
+    )
@@ -0,0 +1,122 @@
+import codecs
+import csv
+import io
+import json
+import tempfile
+from itertools import islice
+from typing import IO, Any, Dict, Iterator, List, Sequence, Tuple
+
+from fastapi import HTTPException, Request
+from pydantic import ValidationError
+
+from app import schemas
+
+Record = Tuple[int, Any]
+Result = Dict[str, Any]
+
+# Uploads larger than this are spooled to disk while they are read
+SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
+
+async def spool_body(request: Request) -> IO[bytes]:
+    """
+    Read the request body into a spooled temporary file.
+
+    The body has to be consumed before a streaming response starts: once the
+    response is streaming, Starlette reads the receive channel to watch for
+    disconnects. For the same reason the encoding is checked here: a decoding
+    error while streaming would cut the response off after its 200.
+    """
+    body = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    try:
+        async for chunk in request.stream():
+            decoder.decode(chunk)
+            body.write(chunk)
+        decoder.decode(b"", final=True)
+    except UnicodeDecodeError:
+        body.close()
+        raise HTTPException(status_code=400, detail="The body is not valid UTF-8")
+    body.seek(0)
+    return body
+
+
+def iter_records(body: IO[bytes], content_type: str) -> Iterator[Record]:
+    """
+    Yield `(row number, record)` pairs from an NDJSON or CSV (with header) body.
+    Records that can't be parsed are yielded as None.
+    """
+    text = io.TextIOWrapper(body, encoding="utf-8", newline="")
+    if content_type.startswith("text/csv"):
+        for row, record in enumerate(csv.DictReader(text), start=1):
+            yield row, {key: value for key, value in record.items() if value}
+        return
+    for row, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield row, json.loads(line)
+        except ValueError:
+            yield row, None
+
+
+def batched(records: Iterator[Record], size: int) -> Iterator[List[Record]]:
+    while True:
+        batch = list(islice(records, size))
+        if not batch:
+            return
+        yield batch
+
+
+def plan_batch(
+    batch: Sequence[Record],
+) -> Tuple[Dict[int, Result], List[Tuple[int, schemas.UserCreate]]]:
+    """
+    Validate a batch and drop emails repeated within it. Returns the results
+    already known by row number, and the rows left to insert.
+    """
+    results: Dict[int, Result] = {}
+    pending: List[Tuple[int, schemas.UserCreate]] = []
+    seen = set()
+    for row, record in batch:
+        if not isinstance(record, dict):
+            results[row] = {"row": row, "status": "invalid", "error": "Malformed record"}
+            continue
+        try:
+            user_in = schemas.UserCreate(**record)
+        except ValidationError as e:
+            results[row] = {
+                "row": row,
+                "email": record.get("email"),
+                "status": "invalid",
+                "error": e.errors(),
+            }
+            continue
+        if user_in.email in seen:
+            results[row] = {"row": row, "email": user_in.email, "status": "duplicate"}
+            continue
+        seen.add(user_in.email)
+        pending.append((row, user_in))
+    return results, pending
+
+
+def finish_batch(
+    results: Dict[int, Result],
+    pending: Sequence[Tuple[int, schemas.UserCreate]],
+    created: Dict[str, int],
+) -> Iterator[str]:
+    """
+    Yield one NDJSON line per row of the batch, in input order.
+    """
+    for row, user_in in pending:
+        if user_in.email in created:
+            results[row] = {
+                "row": row,
+                "email": user_in.email,
+                "status": "created",
+                "id": created[user_in.email],
+            }
+        else:
+            results[row] = {"row": row, "email": user_in.email, "status": "exists"}
+    for row in sorted(results):
+        yield json.dumps(results[row]) + "\n"
@@ -1,13 +1,24 @@
-from typing import Any, List
+from typing import IO, Any, Iterator, List, Optional
 
-from fastapi import APIRouter, Body, Depends, HTTPException
+from fastapi import APIRouter, Body, Depends, HTTPException, Query, Request, Response
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
 from pydantic.networks import EmailStr
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
 from app import crud, models, schemas
 from app.api import deps
+from app.api.conditional import conditional_response
+from app.api.users import bulk
 from app.core.config import settings
+from app.core.principal import Principal
+from app.core.serialization import (
+    EXPORT_MEDIA_TYPES,
+    export_chunks,
+    schema_fields,
+    serialized_response,
+)
 from app.utils import send_new_account_email
 
 router = APIRouter()
@@ -20,35 +31,79 @@ def alive():
 
 @router.get("/", response_model=List[schemas.User])
 def read_users(
+    response: Response,
     db: Session = Depends(deps.get_db),
     skip: int = 0,
     limit: int = 100,
-    current_user: models.User = Depends(deps.get_current_active_superuser),
+    cursor: Optional[str] = None,
+    order_by: str = "id",
+    current_user: Principal = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
     Retrieve users.
+
+    Without `skip`, pages by keyset: pass the `X-Next-Cursor` header of the
+    previous page as `cursor` to get the next one.
     """
-    users = crud.user.get_multi(db, skip=skip, limit=limit)
+    if cursor is None and skip:
+        users = crud.user.get_multi(db, skip=skip, limit=limit)
+        next_cursor = None
+    else:
+        try:
+            users, next_cursor = crud.user.get_multi_keyset(
+                db, cursor=cursor, limit=limit, order_by=order_by
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    if settings.FAST_SERIALIZATION:
+        return serialized_response(schemas.User, users, headers=headers)
+    response.headers.update(headers)
     return users
 
 
+@router.get("/export", response_class=StreamingResponse)
+def export_users(
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    db: Session = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Stream all users as NDJSON or CSV straight from a server-side cursor.
+    """
+    fields = schema_fields(schemas.User)
+    result = crud.user.stream(db, fields=fields, batch_size=settings.EXPORT_BATCH_SIZE)
+    return StreamingResponse(
+        export_chunks(fields, result.partitions(), format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=users.{format}"},
+    )
+
+
 @router.post("/", response_model=schemas.User)
 def create_user(
     *,
     db: Session = Depends(deps.get_db),
     user_in: schemas.UserCreate,
-    current_user: models.User = Depends(deps.get_current_active_superuser),
+    current_user: Principal = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
     Create new user.
     """
-    user = crud.user.get_by_email(db, email=user_in.email)
-    if user:
+    if crud.user.email_exists(db, email=user_in.email):
+        raise HTTPException(
+            status_code=400,
+            detail="The user with this username already exists in the system.",
+        )
+    try:
+        user = crud.user.create(db, obj_in=user_in)
+    except IntegrityError:
+        # Taken by a concurrent request since the check
+        db.rollback()
         raise HTTPException(
             status_code=400,
             detail="The user with this username already exists in the system.",
         )
-    user = crud.user.create(db, obj_in=user_in)
     if settings.EMAILS_ENABLED and user_in.email:
         send_new_account_email(
             email_to=user_in.email, username=user_in.email, password=user_in.password
@@ -56,6 +111,34 @@ def create_user(
     return user
 
 
+@router.post("/bulk", response_class=StreamingResponse)
+def create_users_bulk(
+    request: Request,
+    body: IO[bytes] = Depends(bulk.spool_body),
+    db: Session = Depends(deps.get_db),
+    current_user: Principal = Depends(deps.get_current_active_superuser),
+) -> Any:
+    """
+    Import users from an NDJSON body, or CSV with a header row when sent as
+    `text/csv`. Rows are inserted in batches and one NDJSON result per input
+    row is streamed back: `created`, `exists`, `duplicate` or `invalid`.
+    """
+    # A sync route, so the session is only used from the threadpool; the
+    # body is read on the event loop by the `spool_body` dependency
+    records = bulk.iter_records(body, request.headers.get("content-type", ""))
+
+    def results() -> Iterator[str]:
+        try:
+            for batch in bulk.batched(records, settings.BULK_IMPORT_BATCH_SIZE):
+                known, pending = bulk.plan_batch(batch)
+                created = crud.user.create_bulk(db, objs_in=[u for _, u in pending])
+                yield from bulk.finish_batch(known, pending, created)
+        finally:
+            body.close()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
 @router.put("/me", response_model=schemas.User)
 def update_user_me(
     *,
@@ -63,7 +146,7 @@ def update_user_me(
     password: str = Body(None),
     full_name: str = Body(None),
     email: EmailStr = Body(None),
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: models.User = Depends(deps.get_current_active_user_model),
 ) -> Any:
     """
     Update own user.
@@ -82,13 +165,24 @@ def update_user_me(
 
 @router.get("/me", response_model=schemas.User)
 def read_user_me(
-    db: Session = Depends(deps.get_db),
-    current_user: models.User = Depends(deps.get_current_active_user),
+    request: Request,
+    response: Response,
+    current_user: schemas.UserSnapshot = Depends(deps.get_current_active_user_cached),
 ) -> Any:
     """
     Get current user.
+
+    Sends an `ETag`; a request whose `If-None-Match` still matches gets a 304.
     """
-    return current_user
+    return conditional_response(
+        request,
+        response,
+        route="read_user_me",
+        viewer_id=current_user.id,
+        kind="user",
+        obj=current_user,
+        schema=schemas.User,
+    )
 
 
 @router.post("/open", response_model=schemas.User)
@@ -107,34 +201,76 @@ def create_user_open(
             status_code=403,
             detail="Open user registration is forbidden on this server",
         )
-    user = crud.user.get_by_email(db, email=email)
-    if user:
+    if crud.user.email_exists(db, email=email):
         raise HTTPException(
             status_code=400,
             detail="The user with this username already exists in the system",
         )
     user_in = schemas.UserCreate(password=password, email=email, full_name=full_name)
-    user = crud.user.create(db, obj_in=user_in)
+    try:
+        user = crud.user.create(db, obj_in=user_in)
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=400,
+            detail="The user with this username already exists in the system",
+        )
     return user
 
 
+@router.get("/batch", response_model=List[schemas.User])
+def read_users_batch(
+    ids: List[int] = Query(...),
+    current_user: Principal = Depends(deps.get_current_active_user),
+    db: Session = Depends(deps.get_db),
+) -> Any:
+    """
+    Get several users by id (`?ids=1&ids=2`) with one query, in the order
+    the ids are given. As for `GET /users/{user_id}`, only superusers get
+    users other than themselves; those, and ids without a user, are left out.
+    Duplicate ids are dropped and at most `USERS_BATCH_MAX_IDS` are allowed.
+    """
+    ids = list(dict.fromkeys(ids))
+    if len(ids) > settings.USERS_BATCH_MAX_IDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {settings.USERS_BATCH_MAX_IDS} ids can be requested at once",
+        )
+    if not crud.user.is_superuser(current_user):
+        ids = [id for id in ids if id == current_user.id]
+    users = crud.user.get_many(db, ids)
+    if settings.FAST_SERIALIZATION:
+        return serialized_response(schemas.User, users)
+    return users
+
+
 @router.get("/{user_id}", response_model=schemas.User)
 def read_user_by_id(
+    request: Request,
+    response: Response,
     user_id: int,
-    current_user: models.User = Depends(deps.get_current_active_user),
+    current_user: Principal = Depends(deps.get_current_active_user),
     db: Session = Depends(deps.get_db),
 ) -> Any:
     """
-    Get a specific user by id.
+    Get a specific user by id, with an `ETag` as for `GET /users/me`.
     """
     user = crud.user.get(db, id=user_id)
-    if user == current_user:
-        return user
-    if not crud.user.is_superuser(current_user):
+    if user_id != current_user.id and not crud.user.is_superuser(current_user):
         raise HTTPException(
             status_code=400, detail="The user doesn't have enough privileges"
         )
-    return user
+    if user is None:
+        return user
+    return conditional_response(
+        request,
+        response,
+        route="read_user_by_id",
+        viewer_id=current_user.id,
+        kind="user",
+        obj=user,
+        schema=schemas.User,
+    )
 
 
 @router.put("/{user_id}", response_model=schemas.User)
@@ -143,7 +279,7 @@ def update_user(
     db: Session = Depends(deps.get_db),
     user_id: int,
     user_in: schemas.UserUpdate,
-    current_user: models.User = Depends(deps.get_current_active_superuser),
+    current_user: Principal = Depends(deps.get_current_active_superuser),
 ) -> Any:
     """
     Update a user.
@@ -156,3 +292,28 @@ def update_user(
         )
     user = crud.user.update(db, db_obj=user, obj_in=user_in)
     return user
+
+
+@router.get("/{user_id}/items/export", response_class=StreamingResponse)
+def export_user_items(
+    user_id: int,
+    format: str = Query("ndjson", regex="^(ndjson|csv)$"),
+    current_user: Principal = Depends(deps.get_current_active_user),
+    db: Session = Depends(deps.get_db),
+) -> Any:
+    """
+    Stream the items owned by a user as NDJSON or CSV.
+    """
+    if user_id != current_user.id and not crud.user.is_superuser(current_user):
+        raise HTTPException(
+            status_code=400, detail="The user doesn't have enough privileges"
+        )
+    fields = schema_fields(schemas.Item)
+    result = crud.item.stream(
+        db, fields=fields, batch_size=settings.EXPORT_BATCH_SIZE, owner_id=user_id
+    )
+    return StreamingResponse(
+        export_chunks(fields, result.partitions(), format),
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f"attachment; filename=items.{format}"},
+    )
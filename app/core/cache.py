@@ -0,0 +1,195 @@
+import json
+import logging
+from abc import ABC, abstractmethod
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+InvalidationHandler = Callable[[Dict[str, Any]], None]
+
+
+class CacheStats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def hit(self) -> None:
+        with self._lock:
+            self.hits += 1
+
+    def miss(self) -> None:
+        with self._lock:
+            self.misses += 1
+
+    def invalidated(self) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
+
+
+class CacheBackend(ABC):
+    """
+    Key/value store plus an invalidation bus that reaches every worker.
+
+    Values are strings; callers serialize. `publish` delivers a message to the
+    handlers registered with `subscribe` in every process sharing the backend.
+    """
+
+    def __init__(self) -> None:
+        self.stats = CacheStats()
+        self._handlers: List[InvalidationHandler] = []
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: str, ttl: int) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, *keys: str) -> None:
+        ...
+
+    @abstractmethod
+    def publish(self, message: Dict[str, Any]) -> None:
+        ...
+
+    def subscribe(self, handler: InvalidationHandler) -> None:
+        self._handlers.append(handler)
+
+    def start(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def _dispatch(self, message: Dict[str, Any]) -> None:
+        for handler in self._handlers:
+            try:
+                handler(message)
+            except Exception:
+                logger.exception("Cache invalidation handler failed")
+
+
+class MemoryCacheBackend(CacheBackend):
+    """
+    Per-process backend: only correct with a single worker, or as a stand-in
+    in development.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._data: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[1] <= time.monotonic():
+                del self._data[key]
+                entry = None
+        if entry is None:
+            self.stats.miss()
+            return None
+        self.stats.hit()
+        return entry[0]
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+
+    def delete(self, *keys: str) -> None:
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        self.stats.invalidated()
+        self._dispatch(message)
+
+
+class RedisCacheBackend(CacheBackend):
+    """
+    Backend shared by all workers through any server speaking the Redis
+    protocol. Pass `client` to use an existing client (e.g. fakeredis in tests).
+    """
+
+    def __init__(
+        self,
+        url: Optional[str] = None,
+        *,
+        client: Any = None,
+        channel: str = "learnit:invalidate",
+    ) -> None:
+        super().__init__()
+        if client is None:
+            import redis
+
+            client = redis.Redis.from_url(url)
+        self.client = client
+        self.channel = channel
+        self._pubsub: Any = None
+        self._listener: Any = None
+
+    def get(self, key: str) -> Optional[str]:
+        value = self.client.get(key)
+        if value is None:
+            self.stats.miss()
+            return None
+        self.stats.hit()
+        return value.decode() if isinstance(value, bytes) else value
+
+    def set(self, key: str, value: str, ttl: int) -> None:
+        self.client.set(key, value, ex=ttl)
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self.client.delete(*keys)
+
+    def publish(self, message: Dict[str, Any]) -> None:
+        self.stats.invalidated()
+        self.client.publish(self.channel, json.dumps(message))
+
+    def start(self) -> None:
+        """
+        Listen for invalidations published by other workers on a background thread.
+        """
+        if self._listener is not None:
+            return
+        self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(**{self.channel: self._on_message})
+        self._listener = self._pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+
+    def close(self) -> None:
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+        if self._pubsub is not None:
+            self._pubsub.close()
+            self._pubsub = None
+
+    def _on_message(self, message: Dict[str, Any]) -> None:
+        self._dispatch(json.loads(message["data"]))
+
+
+def get_cache_backend() -> CacheBackend:
+    if settings.CACHE_BACKEND == "redis":
+        return RedisCacheBackend(settings.REDIS_URL)
+    return MemoryCacheBackend()
+
+
+cache = get_cache_backend()
@@ -1,5 +1,6 @@
 import os
 import secrets
+from pathlib import Path
 from typing import Any, Dict, List, Optional, Union
 
 from dotenv import load_dotenv
@@ -12,8 +13,40 @@ class Settings(BaseSettings):
     API_V1_STR: str = "/api/v1"
     # SECRET_KEY: str = secrets.token_urlsafe(32)
     SECRET_KEY: str = os.getenv('SECRET_KEY')
+    # Access tokens are short-lived; clients renew them with the refresh token,
+    # which is rotated on every use
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
     # 60 minutes * 24 hours * 8 days = 8 days
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
+    REFRESH_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 8
+    # How often each worker loads new rows of the token revocation table;
+    # revocations made by the worker itself apply immediately
+    TOKEN_REVOCATION_SYNC_SECONDS: float = 5
+    # "HS256" signs tokens with SECRET_KEY. "ES256" or "EdDSA" sign them with
+    # the PEM private key in JWT_SIGNING_KEY_FILE, and other services verify
+    # them with the public keys served at /.well-known/jwks.json. To rotate,
+    # list the new public key in JWT_VERIFY_KEY_FILES on every worker, then
+    # make it the signing key, then drop the old one once its tokens expired
+    JWT_ALGORITHM: str = "HS256"
+    JWT_SIGNING_KEY_FILE: Optional[str] = None
+    JWT_VERIFY_KEY_FILES: List[str] = []
+    # Keep accepting HS256 tokens without a key id, issued before switching
+    # to an asymmetric algorithm; turn off once those have expired
+    JWT_ACCEPT_HS256: bool = True
+
+    @validator("JWT_ALGORITHM")
+    def jwt_algorithm_is_known(cls, v: str) -> str:
+        if v not in ("HS256", "ES256", "EdDSA"):
+            raise ValueError("JWT_ALGORITHM must be 'HS256', 'ES256' or 'EdDSA'")
+        return v
+
+    @validator("JWT_SIGNING_KEY_FILE", always=True)
+    def signing_key_file_is_set(cls, v: Optional[str], values: Dict[str, Any]) -> Optional[str]:
+        if values.get("JWT_ALGORITHM", "HS256") != "HS256" and not v:
+            raise ValueError("JWT_SIGNING_KEY_FILE is required for asymmetric JWT_ALGORITHM")
+        return v
+
+    # Verified access tokens kept in memory per worker, 0 disables the cache
+    TOKEN_CACHE_SIZE: int = 10_000
     SERVER_NAME: str = 'learnit'
     SERVER_HOST: AnyHttpUrl = 'http://127.0.0.1'
     # BACKEND_CORS_ORIGINS is a JSON-formatted list of origins
@@ -56,12 +89,163 @@ class Settings(BaseSettings):
             path=f"/{values.get('POSTGRES_DB') or ''}",
         )
 
+    # Serve the API through async routes on an asyncpg AsyncEngine instead of
+    # sync routes on the threadpool
+    DB_ASYNC_MODE: bool = False
+    SQLALCHEMY_ASYNC_DATABASE_URI: Optional[str] = None
+
+    @validator("SQLALCHEMY_ASYNC_DATABASE_URI", pre=True)
+    def assemble_async_db_connection(cls, v: Optional[str], values: Dict[str, Any]) -> Any:
+        if isinstance(v, str):
+            return v
+        sync_uri = values.get("SQLALCHEMY_DATABASE_URI")
+        if not sync_uri:
+            return None
+        return "postgresql+asyncpg://" + str(sync_uri).split("://", 1)[1]
+
+    # Connections kept open per engine and per worker process, plus up to
+    # DB_MAX_OVERFLOW more under load; size against workers * engines
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    # Seconds to wait for a free connection before failing the request
+    DB_POOL_TIMEOUT: float = 30
+    # Replace connections older than this many seconds, -1 keeps them forever
+    DB_POOL_RECYCLE: int = 1800
+    # Test every connection with a round trip on checkout; with it off, a
+    # dropped connection fails one request and is then replaced
+    DB_POOL_PRE_PING: bool = True
+    # For PgBouncer in transaction pooling mode: open a connection per session
+    # (PgBouncer does the pooling) and never reuse server-side prepared statements
+    DB_PGBOUNCER_MODE: bool = False
+
+    # Read replicas of SQLALCHEMY_DATABASE_URI, as a JSON list of DSNs.
+    # Sessions read from one of them until they write; replicas that fail to
+    # connect are skipped for DB_REPLICA_EJECT_SECONDS
+    DB_REPLICA_URIS: List[str] = []
+    # "round_robin" or "least_connections"
+    DB_REPLICA_STRATEGY: str = "round_robin"
+    DB_REPLICA_EJECT_SECONDS: int = 30
+
+    @validator("DB_REPLICA_STRATEGY")
+    def replica_strategy_is_known(cls, v: str) -> str:
+        if v not in ("round_robin", "least_connections"):
+            raise ValueError("DB_REPLICA_STRATEGY must be 'round_robin' or 'least_connections'")
+        return v
+
+    # bcrypt runs in this many worker processes (0 hashes inline); once
+    # PASSWORD_HASH_QUEUE_DEPTH calls are waiting, new ones get a 503
+    PASSWORD_HASH_POOL_SIZE: int = 2
+    PASSWORD_HASH_QUEUE_DEPTH: int = 64
+    PASSWORD_HASH_RETRY_AFTER_SECONDS: int = 1
+
+    # "memory" caches per worker; "redis" shares the cache and its invalidations
+    # between workers through REDIS_URL
+    CACHE_BACKEND: str = "memory"
+    REDIS_URL: Optional[str] = None
+    USER_CACHE_TTL_SECONDS: int = 60
+
+    @validator("CACHE_BACKEND")
+    def cache_backend_is_known(cls, v: str) -> str:
+        if v not in ("memory", "redis"):
+            raise ValueError("CACHE_BACKEND must be 'memory' or 'redis'")
+        return v
+
+    # Login and password recovery attempts allowed per client IP and per
+    # account, as "<count>/<second|minute|hour|day>". Counters live in memory
+    # per worker, or in Redis at REDIS_URL shared by all workers
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    RATE_LIMIT_LOGIN_PER_IP: str = "20/minute"
+    RATE_LIMIT_LOGIN_PER_ACCOUNT: str = "5/minute"
+    RATE_LIMIT_RECOVERY_PER_IP: str = "5/hour"
+    RATE_LIMIT_RECOVERY_PER_ACCOUNT: str = "3/hour"
+    # Take the client IP from the first X-Forwarded-For entry; only enable
+    # behind a proxy that sets it
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = False
+
+    @validator("RATE_LIMIT_BACKEND")
+    def rate_limit_backend_is_known(cls, v: str) -> str:
+        if v not in ("memory", "redis"):
+            raise ValueError("RATE_LIMIT_BACKEND must be 'memory' or 'redis'")
+        return v
+
+    # Serve Prometheus metrics at /metrics: per-route request counts, latency
+    # histograms, in-flight requests and time spent in auth, the database,
+    # serialization and password hashing. Under several worker processes set
+    # the PROMETHEUS_MULTIPROC_DIR environment variable to aggregate them
+    PROMETHEUS_ENABLED: bool = True
+
+    # Development/test guard on the SQL each request runs. "warn" logs, and
+    # "raise" fails the request (and so the test client call), when a request
+    # runs more statements than its budget, or one statement with at least
+    # SQL_N_PLUS_ONE_THRESHOLD different parameter sets. Budgets are keyed by
+    # route path, e.g. {"/api/v1/users/": 3}; routes without one are unlimited
+    # unless SQL_QUERY_BUDGET_DEFAULT is set
+    SQL_GUARD_MODE: str = "off"
+    SQL_QUERY_BUDGETS: Dict[str, int] = {}
+    SQL_QUERY_BUDGET_DEFAULT: Optional[int] = None
+    SQL_N_PLUS_ONE_THRESHOLD: int = 5
+
+    @validator("SQL_GUARD_MODE")
+    def sql_guard_mode_is_known(cls, v: str) -> str:
+        if v not in ("off", "warn", "raise"):
+            raise ValueError("SQL_GUARD_MODE must be 'off', 'warn' or 'raise'")
+        return v
+
+    # Rows validated, hashed and inserted together by POST /users/bulk
+    BULK_IMPORT_BATCH_SIZE: int = 1000
+    # Rows fetched from the server-side cursor per chunk of an export
+    EXPORT_BATCH_SIZE: int = 1000
+    # Most distinct ids GET /users/batch looks up per request
+    USERS_BATCH_MAX_IDS: int = 100
+
+    # Serialize user responses with precompiled field getters and orjson
+    # instead of pydantic validation plus jsonable_encoder
+    FAST_SERIALIZATION: bool = False
+
+    # Cache-Control of responses that carry an ETag, by route name. The default
+    # has clients revalidate every time, which If-None-Match makes cheap
+    CACHE_CONTROL: Dict[str, str] = {}
+    # Keep the serialized bodies of those responses in the cache backend,
+    # keyed on route, caller and row version
+    RESPONSE_CACHE_ENABLED: bool = False
+    RESPONSE_CACHE_TTL_SECONDS: int = 300
+
     EMAIL_TEST_USER: EmailStr = "test@example.com"  # type: ignore
     FIRST_SUPERUSER: EmailStr = "admin@example.com"
     FIRST_SUPERUSER_PASSWORD: str = "password"
     USERS_OPEN_REGISTRATION: bool = False
     EMAILS_ENABLED: bool = False
 
+    SMTP_TLS: bool = True
+    SMTP_PORT: Optional[int] = None
+    SMTP_HOST: Optional[str] = None
+    SMTP_USER: Optional[str] = None
+    SMTP_PASSWORD: Optional[str] = None
+    EMAILS_FROM_EMAIL: Optional[EmailStr] = None
+    EMAILS_FROM_NAME: Optional[str] = None
+
+    @validator("EMAILS_FROM_NAME")
+    def get_project_name(cls, v: Optional[str], values: Dict[str, Any]) -> str:
+        if not v:
+            return values["PROJECT_NAME"]
+        return v
+
+    EMAIL_RESET_TOKEN_EXPIRE_HOURS: int = 48
+    EMAIL_TEMPLATES_DIR: str = str(Path(__file__).resolve().parents[1] / "email-templates" / "build")
+    # Seconds between checks of a template file for changes, 0 never reloads
+    EMAIL_TEMPLATES_RELOAD_SECONDS: float = 2
+    # Emails are queued and sent by this many worker threads, each keeping its
+    # SMTP session open between messages; when the queue is full new emails
+    # are dropped and logged
+    EMAIL_WORKERS: int = 2
+    EMAIL_QUEUE_SIZE: int = 1000
+    # Failed sends are retried after EMAIL_RETRY_BACKOFF_SECONDS, doubling each time
+    EMAIL_MAX_RETRIES: int = 3
+    EMAIL_RETRY_BACKOFF_SECONDS: float = 1
+    # Idle SMTP sessions are closed after this long, before servers drop them
+    SMTP_IDLE_TIMEOUT_SECONDS: int = 60
+
     class Config:
         case_sensitive = True
 
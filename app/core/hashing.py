@@ -0,0 +1,210 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import anyio
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+class HashingOverloaded(Exception):
+    """
+    Raised when the password hashing queue is full and the work is refused.
+    """
+
+
+def _hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+
+def _verify(plain_password: str, hashed_password: str) -> bool:
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+def _timed(fn: Callable[..., Any], *args: Any) -> Tuple[Any, float, float]:
+    # Runs in the worker process; CLOCK_MONOTONIC is shared by all processes
+    # on the host, so `started` can be compared with the submit time
+    started = time.monotonic()
+    result = fn(*args)
+    return result, started, time.monotonic() - started
+
+
+class HashingMetrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.queue_wait_seconds_total = 0.0
+        self.queue_wait_seconds_max = 0.0
+        self.hash_seconds_total = 0.0
+        self.hash_seconds_max = 0.0
+
+    def on_submit(self) -> None:
+        with self._lock:
+            self.submitted += 1
+            self.in_flight += 1
+
+    def on_reject(self) -> None:
+        with self._lock:
+            self.rejected += 1
+
+    def on_done(self, queue_wait: float, hash_time: float) -> None:
+        with self._lock:
+            self.completed += 1
+            self.in_flight -= 1
+            self.queue_wait_seconds_total += queue_wait
+            self.queue_wait_seconds_max = max(self.queue_wait_seconds_max, queue_wait)
+            self.hash_seconds_total += hash_time
+            self.hash_seconds_max = max(self.hash_seconds_max, hash_time)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "in_flight": self.in_flight,
+                "queue_wait_seconds_total": self.queue_wait_seconds_total,
+                "queue_wait_seconds_max": self.queue_wait_seconds_max,
+                "hash_seconds_total": self.hash_seconds_total,
+                "hash_seconds_max": self.hash_seconds_max,
+            }
+
+
+class PasswordHasher:
+    def __init__(self, pool_size: int, queue_depth: int):
+        """
+        Runs bcrypt in a pool of worker processes so hashing doesn't hold the
+        GIL of the process serving requests.
+
+        **Parameters**
+
+        * `pool_size`: Number of worker processes, 0 hashes inline in the caller
+        * `queue_depth`: How many calls may wait for a free worker before new
+          ones are refused with `HashingOverloaded`
+        """
+        self.pool_size = pool_size
+        self.queue_depth = queue_depth
+        self.metrics = HashingMetrics()
+        self._slots = threading.BoundedSemaphore(max(pool_size, 1) + queue_depth)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    # spawn, not fork: forking a process that runs threads is unsafe
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.pool_size,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+        return self._executor
+
+    def submit(self, fn: Callable[..., Any], *args: Any, block: bool = False) -> Future:
+        """
+        Queue `fn(*args)` on the pool and return a future of its result.
+
+        Raises `HashingOverloaded` when the queue is full, unless `block` is set,
+        in which case it waits for a slot.
+        """
+        if not self._slots.acquire(blocking=block):
+            self.metrics.on_reject()
+            raise HashingOverloaded()
+        self.metrics.on_submit()
+        submitted = time.monotonic()
+        try:
+            timed = self._get_executor().submit(_timed, fn, *args)
+        except BaseException:
+            self._slots.release()
+            self.metrics.on_done(0.0, 0.0)
+            raise
+        future: Future = Future()
+
+        def _on_done(done: Future) -> None:
+            self._slots.release()
+            if done.cancelled():
+                self.metrics.on_done(time.monotonic() - submitted, 0.0)
+                future.cancel()
+                return
+            exc = done.exception()
+            if exc is not None:
+                self.metrics.on_done(time.monotonic() - submitted, 0.0)
+                future.set_exception(exc)
+                return
+            result, started, hash_time = done.result()
+            self.metrics.on_done(started - submitted, hash_time)
+            future.set_result(result)
+
+        timed.add_done_callback(_on_done)
+        return future
+
+    def _run_inline(self, fn: Callable[..., Any], *args: Any) -> Any:
+        self.metrics.on_submit()
+        result, _, hash_time = _timed(fn, *args)
+        self.metrics.on_done(0.0, hash_time)
+        return result
+
+    def hash(self, password: str) -> str:
+        if self.pool_size <= 0:
+            return self._run_inline(_hash, password)
+        return self.submit(_hash, password).result()
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        if self.pool_size <= 0:
+            return self._run_inline(_verify, plain_password, hashed_password)
+        return self.submit(_verify, plain_password, hashed_password).result()
+
+    def hash_many(self, passwords: List[str]) -> List[str]:
+        """
+        Hash a batch in parallel, waiting for queue slots instead of refusing
+        them. At most `pool_size` hashes of the batch are outstanding at once,
+        which leaves the queue free for interactive logins.
+        """
+        if self.pool_size <= 0:
+            return [self._run_inline(_hash, password) for password in passwords]
+        hashes: List[str] = []
+        window: "deque[Future]" = deque()
+        for password in passwords:
+            if len(window) >= self.pool_size:
+                hashes.append(window.popleft().result())
+            window.append(self.submit(_hash, password, block=True))
+        hashes.extend(future.result() for future in window)
+        return hashes
+
+    async def ahash(self, password: str) -> str:
+        if self.pool_size <= 0:
+            return await anyio.to_thread.run_sync(self._run_inline, _hash, password)
+        return await asyncio.wrap_future(self.submit(_hash, password))
+
+    async def averify(self, plain_password: str, hashed_password: str) -> bool:
+        if self.pool_size <= 0:
+            return await anyio.to_thread.run_sync(
+                self._run_inline, _verify, plain_password, hashed_password
+            )
+        return await asyncio.wrap_future(
+            self.submit(_verify, plain_password, hashed_password)
+        )
+
+    async def ahash_many(self, passwords: List[str]) -> List[str]:
+        return await anyio.to_thread.run_sync(self.hash_many, passwords)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+hasher = PasswordHasher(
+    pool_size=settings.PASSWORD_HASH_POOL_SIZE,
+    queue_depth=settings.PASSWORD_HASH_QUEUE_DEPTH,
+)
@@ -0,0 +1,210 @@
+import inspect
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterable, Iterator, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.concurrency import run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+from starlette.routing import BaseRoute
+
+PHASES = ("auth", "db", "serialization", "hashing")
+
+REQUESTS = Counter(
+    "http_requests_total", "Requests handled, by route and status", ["method", "route", "status"]
+)
+LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time from routing a request to sending the end of its response",
+    ["method", "route"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+IN_FLIGHT = Gauge(
+    "http_requests_in_progress",
+    "Requests being handled",
+    ["method", "route"],
+    multiprocess_mode="livesum",
+)
+PHASE_SECONDS = Counter(
+    "http_request_phase_seconds",
+    "Time spent per phase of request handling: " + ", ".join(PHASES),
+    ["route", "phase"],
+)
+DB_STATEMENTS = Counter(
+    "http_request_db_statements", "SQL statements executed while handling requests", ["route"]
+)
+
+
+class RequestTimings:
+    """
+    Seconds spent per phase by the request being handled, collected through
+    a context variable so helpers deep in the stack can add to it.
+    """
+
+    __slots__ = ("auth", "db", "serialization", "hashing", "db_statements")
+
+    def __init__(self) -> None:
+        self.auth = 0.0
+        self.db = 0.0
+        self.serialization = 0.0
+        self.hashing = 0.0
+        self.db_statements = 0
+
+
+_timings: ContextVar[Optional[RequestTimings]] = ContextVar("request_timings", default=None)
+
+
+def current_timings() -> Optional[RequestTimings]:
+    return _timings.get()
+
+
+@contextmanager
+def phase(name: str) -> Iterator[None]:
+    """
+    Add the time spent in the block to phase `name` of the current request.
+    """
+    timings = _timings.get()
+    if timings is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(timings, name, getattr(timings, name) + time.perf_counter() - started)
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if context is not None:
+        context._instrumentation_started = time.perf_counter()
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    timings = _timings.get()
+    if timings is None or context is None:
+        return
+    timings.db += time.perf_counter() - context._instrumentation_started
+    timings.db_statements += 1
+
+
+class InstrumentedRoute:
+    """
+    ASGI wrapper around one route's app. It runs once the router has matched
+    the route, so every metric is labelled with the route template rather
+    than the raw path, and unmatched requests add no label values.
+    """
+
+    def __init__(self, app: Any, path: str) -> None:
+        self.app = app
+        self.path = path
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        method = scope["method"]
+        status = 500
+        timings = RequestTimings()
+        token = _timings.set(timings)
+
+        response_started = False
+
+        async def send_wrapper(message: Any) -> None:
+            nonlocal status, response_started
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                response_started = True
+            await send(message)
+
+        in_flight = IN_FLIGHT.labels(method, self.path)
+        in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception as exc:
+            # Run the app's handler here rather than in its exception
+            # middleware, so the status it answers with is the one recorded
+            handler = _exception_handler(scope, exc)
+            if handler is None or response_started:
+                raise
+            request = Request(scope, receive=receive)
+            if inspect.iscoroutinefunction(handler):
+                response = await handler(request, exc)
+            else:
+                response = await run_in_threadpool(handler, request, exc)
+            await response(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            in_flight.dec()
+            _timings.reset(token)
+            REQUESTS.labels(method, self.path, status).inc()
+            LATENCY.labels(method, self.path).observe(elapsed)
+            for name in PHASES:
+                seconds = getattr(timings, name)
+                if seconds:
+                    PHASE_SECONDS.labels(self.path, name).inc(seconds)
+            if timings.db_statements:
+                DB_STATEMENTS.labels(self.path).inc(timings.db_statements)
+
+
+def _exception_handler(scope: Any, exc: Exception) -> Optional[Callable]:
+    """
+    The handler the app registered for `exc`, found the way Starlette's
+    `ExceptionMiddleware` finds it.
+    """
+    handlers = scope["app"].exception_handlers
+    if isinstance(exc, HTTPException) and exc.status_code in handlers:
+        return handlers[exc.status_code]
+    for cls in type(exc).__mro__:
+        if cls in handlers:
+            return handlers[cls]
+    return None
+
+
+def instrument_routes(routes: Iterable[BaseRoute]) -> None:
+    for route in routes:
+        if hasattr(route, "methods") and not isinstance(route.app, InstrumentedRoute):
+            route.app = InstrumentedRoute(route.app, route.path)
+
+
+def metrics_response_body() -> bytes:
+    """
+    Current metrics in the Prometheus text format. With PROMETHEUS_MULTIPROC_DIR
+    set, values are aggregated over every worker process writing to it.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry)
+    return generate_latest()
+
+
+def mark_process_dead(pid: int) -> None:
+    """
+    Drop the live gauges of an exited worker; call from the process manager,
+    e.g. gunicorn's `child_exit` hook.
+    """
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
+
+
+__all__ = [
+    "CONTENT_TYPE_LATEST",
+    "current_timings",
+    "instrument_routes",
+    "mark_process_dead",
+    "metrics_response_body",
+    "phase",
+]
@@ -0,0 +1,182 @@
+import base64
+import hashlib
+import json
+from typing import Any, Dict, List, Mapping, Optional, Union
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric.ed25519 import (
+    Ed25519PrivateKey,
+    Ed25519PublicKey,
+)
+from jose import jwk, jwt
+from jose.backends.base import Key
+from jose.exceptions import JWTError
+
+from app.core.config import settings
+
+ASYMMETRIC_ALGORITHMS = ("ES256", "EdDSA")
+
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _unb64(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class Ed25519Key(Key):
+    """
+    EdDSA (Ed25519, RFC 8037) key for python-jose, which only ships HMAC,
+    RSA and ECDSA keys. Takes a PEM, an OKP JWK dict or a key object.
+    """
+
+    def __init__(self, key: Any, algorithm: str):
+        self._algorithm = algorithm
+        if isinstance(key, dict):
+            public = Ed25519PublicKey.from_public_bytes(_unb64(key["x"]))
+            key = (
+                Ed25519PrivateKey.from_private_bytes(_unb64(key["d"])) if "d" in key else public
+            )
+        elif isinstance(key, (str, bytes)):
+            pem = key.encode() if isinstance(key, str) else key
+            if b"PRIVATE" in pem:
+                key = serialization.load_pem_private_key(pem, password=None)
+            else:
+                key = serialization.load_pem_public_key(pem)
+        if not isinstance(key, (Ed25519PrivateKey, Ed25519PublicKey)):
+            raise JWTError("Not an Ed25519 key")
+        self.prepared_key = key
+
+    def is_public(self) -> bool:
+        return isinstance(self.prepared_key, Ed25519PublicKey)
+
+    def public_key(self) -> "Ed25519Key":
+        if self.is_public():
+            return self
+        return Ed25519Key(self.prepared_key.public_key(), self._algorithm)
+
+    def sign(self, msg: bytes) -> bytes:
+        return self.prepared_key.sign(msg)
+
+    def verify(self, msg: bytes, sig: bytes) -> bool:
+        public = self.prepared_key if self.is_public() else self.prepared_key.public_key()
+        try:
+            public.verify(sig, msg)
+            return True
+        except InvalidSignature:
+            return False
+
+    def to_dict(self) -> Dict[str, str]:
+        public = self.public_key().prepared_key
+        raw = public.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+        return {"kty": "OKP", "crv": "Ed25519", "alg": self._algorithm, "x": _b64(raw)}
+
+
+jwk.register_key("EdDSA", Ed25519Key)
+
+
+class JWTKey:
+    __slots__ = ("kid", "algorithm", "signing", "verifying")
+
+    def __init__(self, kid: Optional[str], algorithm: str, signing: Optional[Key], verifying: Key):
+        """
+        One parsed key: `signing` is None for keys that are only accepted
+        (the previous or next key during a rotation).
+        """
+        self.kid = kid
+        self.algorithm = algorithm
+        self.signing = signing
+        self.verifying = verifying
+
+
+def key_id(key: Key) -> str:
+    """
+    RFC 7638 thumbprint of an asymmetric key, so every service derives the
+    same `kid` from the same key file.
+    """
+    public = key.public_key().to_dict()
+    required = ("crv", "kty", "x", "y") if public["kty"] == "EC" else ("crv", "kty", "x")
+    members = json.dumps({name: public[name] for name in required}, separators=(",", ":"))
+    return _b64(hashlib.sha256(members.encode()).digest())
+
+
+def load_key(pem: Union[str, bytes], algorithm: str, *, signing: bool) -> JWTKey:
+    key = jwk.construct(pem, algorithm)
+    public = key.public_key()
+    return JWTKey(key_id(key), algorithm, key if signing else None, public)
+
+
+class KeyRing:
+    def __init__(self, keys: List[JWTKey], signing_kid: Optional[str]):
+        """
+        The keys tokens are signed and verified with, parsed once. Tokens are
+        signed by the key `signing_kid` and carry its `kid` in their header;
+        verification picks the key by `kid`, so a new key can be rolled out
+        for verification first, then made the signing key, and the old one
+        dropped once its tokens have expired. A key with no `kid` verifies
+        tokens without one (HS256 tokens from before key ids).
+        """
+        self._keys: Dict[Optional[str], JWTKey] = {}
+        for key in keys:
+            # The signing key may also be listed among the accepted ones
+            self._keys.setdefault(key.kid, key)
+        self.signing_key = self._keys[signing_kid]
+        self._headers = {"kid": signing_kid} if signing_kid is not None else None
+
+    def sign(self, claims: Mapping[str, Any]) -> str:
+        key = self.signing_key
+        return jwt.encode(dict(claims), key.signing, algorithm=key.algorithm, headers=self._headers)
+
+    def decode(self, token: str, **kwargs: Any) -> Dict[str, Any]:
+        """
+        Verify `token` with the key its `kid` names and return its claims,
+        raising `JWTError` if the key is unknown or the token is invalid.
+        """
+        key = self._keys.get(jwt.get_unverified_header(token).get("kid"))
+        if key is None:
+            raise JWTError("Unknown signing key")
+        return jwt.decode(token, key.verifying, algorithms=[key.algorithm], **kwargs)
+
+    def jwks(self) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Public keys as a JWK Set, for services that only verify tokens.
+        """
+        return {
+            "keys": [
+                {**key.verifying.to_dict(), "kid": key.kid, "use": "sig"}
+                for key in self._keys.values()
+                if key.algorithm in ASYMMETRIC_ALGORITHMS
+            ]
+        }
+
+
+def _read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def load_keyring() -> KeyRing:
+    keys: List[JWTKey] = []
+    if settings.JWT_ALGORITHM == "HS256" or settings.JWT_ACCEPT_HS256:
+        hmac = jwk.construct(settings.SECRET_KEY, "HS256")
+        keys.append(JWTKey(None, "HS256", hmac, hmac))
+    signing_kid = None
+    if settings.JWT_ALGORITHM in ASYMMETRIC_ALGORITHMS:
+        signing = load_key(
+            _read(settings.JWT_SIGNING_KEY_FILE), settings.JWT_ALGORITHM, signing=True
+        )
+        keys.append(signing)
+        signing_kid = signing.kid
+    for path in settings.JWT_VERIFY_KEY_FILES:
+        pem = _read(path)
+        # The algorithm is the key's: an EC key is ES256, an Ed25519 key EdDSA
+        algorithm = "EdDSA" if isinstance(
+            serialization.load_pem_public_key(pem), Ed25519PublicKey
+        ) else "ES256"
+        keys.append(load_key(pem, algorithm, signing=False))
+    return KeyRing(keys, signing_kid)
+
+
+keyring = load_keyring()
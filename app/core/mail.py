@@ -0,0 +1,401 @@
+import logging
+import queue
+import smtplib
+import threading
+import time
+from email.message import EmailMessage
+from email.utils import formataddr
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from jinja2 import Environment, Template, TemplateError, TemplateNotFound, select_autoescape
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+Recipient = Tuple[str, Dict[str, Any]]
+# Refusals the server answered with; the SMTP session can carry on after them
+SESSION_INTACT_ERRORS = (smtplib.SMTPResponseException, smtplib.SMTPRecipientsRefused)
+
+
+class TemplateRegistry:
+    """
+    Email templates compiled once and kept in memory. A template is
+    recompiled when its file's mtime changes; each file is checked at most
+    every `check_interval` seconds, and never if it is 0.
+    """
+
+    def __init__(self, directory: str, *, check_interval: float = 2) -> None:
+        self.directory = Path(directory)
+        self.check_interval = check_interval
+        self.environment = Environment(autoescape=select_autoescape(["html"]))
+        # name -> (template, file mtime, when the mtime was last checked)
+        self._templates: Dict[str, Tuple[Template, float, float]] = {}
+        self._lock = threading.Lock()
+
+    def load_all(self) -> None:
+        """
+        Compile every template up front, so no request pays for it.
+        """
+        for path in sorted(self.directory.glob("*.html")):
+            self._compile(path.name)
+
+    def get(self, name: str) -> Template:
+        entry = self._templates.get(name)
+        if entry is None:
+            return self._compile(name)
+        template, mtime, checked_at = entry
+        now = time.monotonic()
+        if self.check_interval and now - checked_at >= self.check_interval:
+            try:
+                changed = (self.directory / name).stat().st_mtime != mtime
+            except OSError:
+                # Mid-deploy or deleted: keep serving the compiled copy
+                changed = False
+            if changed:
+                return self._compile(name)
+            self._templates[name] = (template, mtime, now)
+        return template
+
+    def render(self, name: str, environment: Dict[str, Any]) -> str:
+        return self.get(name).render(**environment)
+
+    def render_batch(self, name: str, environments: Iterable[Dict[str, Any]]) -> List[str]:
+        """
+        Render one template for many recipients, looking it up once.
+        """
+        render = self.get(name).render
+        return [render(**environment) for environment in environments]
+
+    def _compile(self, name: str) -> Template:
+        path = self.directory / name
+        with self._lock:
+            try:
+                mtime = path.stat().st_mtime
+                source = path.read_text()
+            except OSError:
+                raise TemplateNotFound(name)
+            template = self.environment.from_string(source)
+            self._templates[name] = (template, mtime, time.monotonic())
+        return template
+
+
+templates = TemplateRegistry(
+    settings.EMAIL_TEMPLATES_DIR, check_interval=settings.EMAIL_TEMPLATES_RELOAD_SECONDS
+)
+
+
+def build_message(email_to: str, subject: str, html: str) -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = formataddr((settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL))
+    message["To"] = email_to
+    message["Subject"] = subject
+    message.set_content(html, subtype="html")
+    return message
+
+
+class EmailJob:
+    __slots__ = ("email_to", "subject", "template", "environment", "attempts")
+
+    def __init__(
+        self, email_to: str, subject: str, template: str, environment: Dict[str, Any]
+    ) -> None:
+        self.email_to = email_to
+        self.subject = subject
+        self.template = template
+        self.environment = environment
+        self.attempts = 0
+
+    def message(self) -> EmailMessage:
+        html = templates.render(self.template, self.environment)
+        return build_message(self.email_to, self.subject, html)
+
+
+class EmailBatchJob:
+    """
+    One template sent to many recipients: rendered in one pass and sent over
+    a single SMTP session. Recipients whose send fails are retried one by one.
+    """
+
+    __slots__ = ("subject", "template", "recipients")
+
+    def __init__(self, subject: str, template: str, recipients: Sequence[Recipient]) -> None:
+        self.subject = subject
+        self.template = template
+        self.recipients = recipients
+
+
+class EmailMetrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.dropped = 0
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.send_seconds_total = 0.0
+
+    def on_queued(self) -> None:
+        with self._lock:
+            self.queued += 1
+
+    def on_dropped(self) -> None:
+        with self._lock:
+            self.dropped += 1
+
+    def on_sent(self, seconds: float) -> None:
+        with self._lock:
+            self.sent += 1
+            self.send_seconds_total += seconds
+
+    def on_retried(self) -> None:
+        with self._lock:
+            self.retried += 1
+
+    def on_failed(self) -> None:
+        with self._lock:
+            self.failed += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queued": self.queued,
+                "dropped": self.dropped,
+                "sent": self.sent,
+                "retried": self.retried,
+                "failed": self.failed,
+                "send_seconds_total": self.send_seconds_total,
+            }
+
+
+class SMTPConnection:
+    """
+    One SMTP session reused across messages. It connects on the first send,
+    and reconnects when the server has dropped it or it sat idle for longer
+    than `idle_timeout`.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        *,
+        tls: bool = False,
+        user: Optional[str] = None,
+        password: Optional[str] = None,
+        idle_timeout: float = 60,
+        timeout: float = 10,
+    ) -> None:
+        self.host = host
+        self.port = port
+        self.tls = tls
+        self.user = user
+        self.password = password
+        self.idle_timeout = idle_timeout
+        self.timeout = timeout
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+
+    def send(self, message: EmailMessage) -> None:
+        if self._smtp is not None and time.monotonic() - self._last_used > self.idle_timeout:
+            self.close()
+        if self._smtp is None:
+            self._connect()
+        try:
+            self._smtp.send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            # Dropped since the last message; one fresh session, then give up
+            self.close()
+            self._connect()
+            self._smtp.send_message(message)
+        finally:
+            # Refused messages count as use too, or the next send would reconnect
+            self._last_used = time.monotonic()
+
+    def close(self) -> None:
+        if self._smtp is None:
+            return
+        try:
+            self._smtp.quit()
+        except (smtplib.SMTPException, OSError):
+            self._smtp.close()
+        self._smtp = None
+
+    def _connect(self) -> None:
+        smtp = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.tls:
+                smtp.starttls()
+            if self.user:
+                smtp.login(self.user, self.password or "")
+        except BaseException:
+            smtp.close()
+            raise
+        self._smtp = smtp
+
+
+def smtp_connection() -> SMTPConnection:
+    return SMTPConnection(
+        settings.SMTP_HOST,
+        settings.SMTP_PORT,
+        tls=settings.SMTP_TLS,
+        user=settings.SMTP_USER,
+        password=settings.SMTP_PASSWORD,
+        idle_timeout=settings.SMTP_IDLE_TIMEOUT_SECONDS,
+    )
+
+
+class EmailDispatcher:
+    """
+    Queue of emails sent in the background by `workers` threads, each with
+    its own reused `SMTPConnection`. Request handlers only enqueue.
+
+    Sends failing with a connection error or a 4xx reply are retried up to
+    `max_retries` times, `backoff` seconds later and doubling each time;
+    other failures are logged and dropped.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int,
+        queue_size: int,
+        max_retries: int,
+        backoff: float,
+        connection_factory: Callable[[], SMTPConnection] = smtp_connection,
+    ) -> None:
+        self.workers = workers
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.connection_factory = connection_factory
+        self.metrics = EmailMetrics()
+        self._queue: "queue.Queue[Union[EmailJob, EmailBatchJob, None]]" = queue.Queue(
+            maxsize=queue_size
+        )
+        self._threads: list = []
+
+    def enqueue(self, job: Union[EmailJob, EmailBatchJob]) -> bool:
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self.metrics.on_dropped()
+            logger.error("Email queue full, dropped %s", _describe(job))
+            return False
+        self.metrics.on_queued()
+        return True
+
+    def start(self) -> None:
+        if self._threads:
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"email-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 10) -> None:
+        """
+        Send what is already queued, then stop the workers. Pending retries are lost.
+        """
+        for _ in self._threads:
+            self._queue.put(None)
+        deadline = time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(max(deadline - time.monotonic(), 0))
+        self._threads = []
+
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def _work(self) -> None:
+        connection = self.connection_factory()
+        try:
+            while True:
+                job = self._queue.get()
+                if job is None:
+                    return
+                if isinstance(job, EmailBatchJob):
+                    self._send_batch(connection, job)
+                else:
+                    self._send(connection, job)
+        finally:
+            connection.close()
+
+    def _send(self, connection: SMTPConnection, job: EmailJob) -> None:
+        started = time.monotonic()
+        try:
+            message = job.message()
+        except TemplateError:
+            self.metrics.on_failed()
+            logger.exception("Failed to render email %s", job.template)
+            return
+        try:
+            connection.send(message)
+        except (smtplib.SMTPException, OSError) as e:
+            if not isinstance(e, SESSION_INTACT_ERRORS):
+                # The session is in an unknown state; start a new one next time
+                connection.close()
+            self._retry_or_fail(job, e)
+            return
+        self.metrics.on_sent(time.monotonic() - started)
+
+    def _send_batch(self, connection: SMTPConnection, batch: EmailBatchJob) -> None:
+        try:
+            bodies = templates.render_batch(
+                batch.template, (environment for _, environment in batch.recipients)
+            )
+        except TemplateError:
+            self.metrics.on_failed()
+            logger.exception("Failed to render email %s", batch.template)
+            return
+        for (email_to, environment), html in zip(batch.recipients, bodies):
+            started = time.monotonic()
+            try:
+                connection.send(build_message(email_to, batch.subject, html))
+            except (smtplib.SMTPException, OSError) as e:
+                if not isinstance(e, SESSION_INTACT_ERRORS):
+                    connection.close()
+                job = EmailJob(email_to, batch.subject, batch.template, environment)
+                self._retry_or_fail(job, e)
+                continue
+            self.metrics.on_sent(time.monotonic() - started)
+
+    def _retry_or_fail(self, job: EmailJob, error: Exception) -> None:
+        if isinstance(error, smtplib.SMTPResponseException):
+            transient = 400 <= error.smtp_code < 500
+        elif isinstance(error, smtplib.SMTPRecipientsRefused):
+            # E.g. greylisting, which refuses the recipient with a 4xx at first
+            transient = all(400 <= code < 500 for code, _ in error.recipients.values())
+        else:
+            transient = True
+        if not transient or job.attempts >= self.max_retries:
+            self.metrics.on_failed()
+            logger.error("Failed to send email to %s: %r", job.email_to, error)
+            return
+        delay = self.backoff * 2 ** job.attempts
+        job.attempts += 1
+        self.metrics.on_retried()
+        timer = threading.Timer(delay, self._requeue, (job,))
+        timer.daemon = True
+        timer.start()
+
+    def _requeue(self, job: EmailJob) -> None:
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self.metrics.on_dropped()
+            logger.error("Email queue full, dropped retry of email to %s", job.email_to)
+
+
+def _describe(job: Union[EmailJob, EmailBatchJob]) -> str:
+    if isinstance(job, EmailBatchJob):
+        return f"batch of {len(job.recipients)} {job.template} emails"
+    return f"email to {job.email_to}"
+
+
+mailer = EmailDispatcher(
+    workers=settings.EMAIL_WORKERS,
+    queue_size=settings.EMAIL_QUEUE_SIZE,
+    max_retries=settings.EMAIL_MAX_RETRIES,
+    backoff=settings.EMAIL_RETRY_BACKOFF_SECONDS,
+)
@@ -0,0 +1,53 @@
+from typing import Any
+
+
+class Principal:
+    """
+    The authenticated user as the auth dependencies see it: just what access
+    checks need, in a fixed-layout immutable object that is cached with the
+    access token. Routes that need the rest of the user, or to write to it,
+    load the `models.User` row themselves.
+    """
+
+    __slots__ = ("id", "email", "is_active", "is_superuser", "version", "tenant_id")
+
+    id: int
+    email: str
+    is_active: bool
+    is_superuser: bool
+    version: int
+    tenant_id: int
+
+    def __init__(
+        self,
+        id: int,
+        email: str,
+        is_active: bool,
+        is_superuser: bool,
+        version: int,
+        tenant_id: int,
+    ) -> None:
+        setattr_ = object.__setattr__
+        setattr_(self, "id", id)
+        setattr_(self, "email", email)
+        setattr_(self, "is_active", is_active)
+        setattr_(self, "is_superuser", is_superuser)
+        setattr_(self, "version", version)
+        setattr_(self, "tenant_id", tenant_id)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        raise AttributeError("Principal is immutable")
+
+    def __delattr__(self, name: str) -> None:
+        raise AttributeError("Principal is immutable")
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Principal):
+            return NotImplemented
+        return self.id == other.id and self.version == other.version
+
+    def __hash__(self) -> int:
+        return hash((self.id, self.version))
+
+    def __repr__(self) -> str:
+        return f"Principal(id={self.id!r}, email={self.email!r})"
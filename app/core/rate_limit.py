@@ -0,0 +1,162 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+
+def parse_limit(limit: str) -> Tuple[int, int]:
+    """
+    Parse a limit such as `"5/minute"` into `(5, 60)`: requests per window seconds.
+    """
+    count, _, period = limit.partition("/")
+    if period not in PERIODS or not count.strip().isdigit():
+        raise ValueError(f"Invalid rate limit {limit!r}, expected e.g. '5/minute'")
+    return int(count), PERIODS[period]
+
+
+class RateLimitStats:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.allowed = 0
+        self.rejected = 0
+
+    def record(self, allowed: bool) -> None:
+        with self._lock:
+            if allowed:
+                self.allowed += 1
+            else:
+                self.rejected += 1
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            return {"allowed": self.allowed, "rejected": self.rejected}
+
+
+class RateLimiter(ABC):
+    """
+    Sliding-window counters. A key's rate is its count in the current fixed
+    window plus the previous window's count weighted by how much of it still
+    overlaps the sliding window; that takes two counters per key instead of
+    a timestamp per request.
+
+    Rejected requests count too, so a client that keeps hammering stays
+    locked out instead of getting a request through every time the
+    estimate dips under the limit.
+    """
+
+    def __init__(self) -> None:
+        self.stats = RateLimitStats()
+
+    async def hit(self, key: str, limit: int, window: int) -> Optional[float]:
+        """
+        Count a request against `key`. Returns None if it is within `limit`
+        requests per `window` seconds, otherwise the seconds to wait.
+        """
+        now = time.time()
+        index, elapsed = divmod(now, window)
+        current, previous = await self._incr(key, int(index), window)
+        rate = previous * (1 - elapsed / window) + current
+        allowed = rate <= limit
+        self.stats.record(allowed)
+        if allowed:
+            return None
+        return _retry_after(current, previous, limit, window, elapsed)
+
+    @abstractmethod
+    async def _incr(self, key: str, index: int, window: int) -> Tuple[int, int]:
+        """
+        Increment the counter of window `index` and return it with the
+        counter of the window before.
+        """
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryRateLimiter(RateLimiter):
+    """
+    Per-process counters: each worker enforces the limits on its own.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        # key -> [window index, count in it, count in the window before]
+        self._counters: Dict[Tuple[str, int], List[int]] = {}
+        self._lock = threading.Lock()
+        self._next_prune = 0.0
+
+    async def _incr(self, key: str, index: int, window: int) -> Tuple[int, int]:
+        with self._lock:
+            self._prune()
+            counter = self._counters.setdefault((key, window), [index, 0, 0])
+            if counter[0] != index:
+                counter[2] = counter[1] if counter[0] == index - 1 else 0
+                counter[0], counter[1] = index, 0
+            counter[1] += 1
+            return counter[1], counter[2]
+
+    def _prune(self) -> None:
+        now = time.time()
+        if now < self._next_prune:
+            return
+        self._next_prune = now + 60
+        self._counters = {
+            (key, window): counter
+            for (key, window), counter in self._counters.items()
+            if counter[0] >= now // window - 1
+        }
+
+
+class RedisRateLimiter(RateLimiter):
+    """
+    Counters shared by all workers through any server speaking the Redis
+    protocol, one pipelined round trip per request. Pass `client` to use an
+    existing `redis.asyncio` client.
+    """
+
+    def __init__(
+        self, url: Optional[str] = None, *, client: Any = None, prefix: str = "learnit:rl"
+    ) -> None:
+        super().__init__()
+        if client is None:
+            import redis.asyncio
+
+            client = redis.asyncio.Redis.from_url(url)
+        self.client = client
+        self.prefix = prefix
+
+    async def _incr(self, key: str, index: int, window: int) -> Tuple[int, int]:
+        current_key = f"{self.prefix}:{window}:{key}:{index}"
+        pipe = self.client.pipeline(transaction=False)
+        pipe.incr(current_key)
+        pipe.expire(current_key, window * 2)
+        pipe.get(f"{self.prefix}:{window}:{key}:{index - 1}")
+        current, _, previous = await pipe.execute()
+        return int(current), int(previous or 0)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def _retry_after(
+    current: int, previous: int, limit: int, window: int, elapsed: float
+) -> float:
+    # When the previous window's share has decayed enough, or else when the
+    # next window starts and the current count becomes the decaying one
+    if previous and current <= limit:
+        overlap_needed = (limit - current) / previous
+        return max(window * (1 - overlap_needed) - elapsed, 0.0)
+    return window - elapsed + (window * (1 - limit / current) if current > limit else 0.0)
+
+
+def get_rate_limiter() -> RateLimiter:
+    if settings.RATE_LIMIT_BACKEND == "redis":
+        return RedisRateLimiter(settings.REDIS_URL)
+    return MemoryRateLimiter()
+
+
+rate_limiter = get_rate_limiter()
@@ -0,0 +1,152 @@
+import heapq
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Rows written this long before the last sync started are loaded again, so a
+# transaction that committed after its `revoked_at` is still picked up
+SYNC_OVERLAP = timedelta(seconds=60)
+
+# Loads the revocations with `revoked_at` after the given time (all unexpired
+# ones when None), as rows with `jti`, `user_id`, `revoked_at` and `expires_at`
+RevocationLoader = Callable[[Optional[datetime]], Iterable[Any]]
+
+
+def _timestamp(value: datetime) -> float:
+    if value.tzinfo is None:
+        # SQLite hands back naive datetimes; they are stored in UTC
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class RevocationList:
+    def __init__(self, sync_seconds: float):
+        """
+        In-memory copy of the token revocation table, so checking a token is a
+        couple of dict lookups and never a query. Entries are evicted once the
+        tokens they cover have expired, which keeps the list down to the
+        revocations of the last refresh token lifetime.
+
+        **Parameters**
+
+        * `sync_seconds`: How often the background thread loads new revocations
+        """
+        self.sync_seconds = sync_seconds
+        # jti -> expiry of the revoked token
+        self._jtis: Dict[str, float] = {}
+        # user id (as in `sub`) -> (tokens issued before this are revoked, expiry)
+        self._users: Dict[str, Tuple[float, float]] = {}
+        # (expiry, kind, key) min-heap driving eviction
+        self._expiries: List[Tuple[float, str, str]] = []
+        self._lock = threading.Lock()
+        self._watermark: Optional[datetime] = None
+        self._load: Optional[RevocationLoader] = None
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._jtis) + len(self._users)
+
+    def is_revoked(self, claims: Mapping[str, Any]) -> bool:
+        """
+        Whether the token with these claims, or the refresh token (`sid`) it
+        was issued with, was revoked, or its user's tokens were revoked after
+        it was issued. Tokens without `jti` predate revocation and can only be
+        revoked by user.
+        """
+        jtis = self._jtis
+        if claims.get("jti") in jtis or claims.get("sid") in jtis:
+            return True
+        if self._users:
+            revoked = self._users.get(str(claims.get("sub")))
+            if revoked is not None and float(claims.get("iat", 0)) < revoked[0]:
+                return True
+        return False
+
+    def add(self, jti: str, expires_at: float) -> None:
+        with self._lock:
+            if self._jtis.get(jti, 0) < expires_at:
+                self._jtis[jti] = expires_at
+                heapq.heappush(self._expiries, (expires_at, "jti", jti))
+
+    def add_user(self, user_id: Any, revoked_at: float, expires_at: float) -> None:
+        key = str(user_id)
+        with self._lock:
+            current = self._users.get(key)
+            if current is None or current[0] < revoked_at:
+                self._users[key] = (revoked_at, expires_at)
+                heapq.heappush(self._expiries, (expires_at, "user", key))
+
+    def apply(self, rows: Iterable[Any]) -> None:
+        for row in rows:
+            expires_at = _timestamp(row.expires_at)
+            if row.jti is not None:
+                self.add(row.jti, expires_at)
+            else:
+                self.add_user(row.user_id, _timestamp(row.revoked_at), expires_at)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._jtis.clear()
+            self._users.clear()
+            self._expiries.clear()
+
+    def evict_expired(self, now: float) -> None:
+        with self._lock:
+            while self._expiries and self._expiries[0][0] <= now:
+                expires_at, kind, key = heapq.heappop(self._expiries)
+                # Skip heap entries superseded by a later revocation of the same key
+                if kind == "jti":
+                    if self._jtis.get(key) == expires_at:
+                        del self._jtis[key]
+                else:
+                    current = self._users.get(key)
+                    if current is not None and current[1] == expires_at:
+                        del self._users[key]
+
+    def sync(self) -> None:
+        if self._load is None:
+            return
+        started = datetime.now(timezone.utc)
+        since = None if self._watermark is None else self._watermark - SYNC_OVERLAP
+        self.apply(self._load(since))
+        self._watermark = started
+        self.evict_expired(started.timestamp())
+
+    def start(self, load: RevocationLoader) -> None:
+        """
+        Load every unexpired revocation now, then keep syncing in the background.
+        """
+        if self._thread is not None:
+            return
+        self._load = load
+        try:
+            self.sync()
+        except Exception:
+            logger.exception("Failed to load token revocations")
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="token-revocations", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.sync_seconds):
+            try:
+                self.sync()
+            except Exception:
+                logger.exception("Failed to sync token revocations")
+
+
+revocations = RevocationList(sync_seconds=settings.TOKEN_REVOCATION_SYNC_SECONDS)
@@ -1,42 +1,82 @@
+import time
 from datetime import datetime, timedelta, timezone
-from typing import Any, Union, Dict
+from typing import Any, Dict, List, Optional, Union
+from uuid import uuid4
 
 from jose import jwt
-from passlib.context import CryptContext
 
 from app.core.config import settings
+from app.core.hashing import hasher, pwd_context  # noqa: F401
+from app.core.instrumentation import phase
+from app.core.keys import keyring
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-ALGORITHM = "HS256"
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
 
 
 def create_access_token(
-        user_id: Union[str, Any], user_email: Union[str, Any], expires_delta: timedelta = None
+        user_id: Union[str, Any],
+        user_email: Union[str, Any],
+        expires_delta: timedelta = None,
+        session_id: Optional[str] = None,
 ) -> str:
+    """
+    Access token for the user. `session_id` is the `jti` of the refresh token
+    it was issued with, so revoking that refresh token revokes it too.
+    """
     if expires_delta:
         expire = datetime.utcnow() + expires_delta
     else:
         expire = datetime.utcnow() + timedelta(
             minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
         )
-    to_encode = {"exp": expire, "sub": str(user_id), "email": str(user_email)}
-    secret_key = settings.SECRET_KEY
-    algorithm = ALGORITHM
-    # print(f'Encode secret key = {secret_key}')
-    # print(f'Encode algorithm = {algorithm}')
-    encoded_jwt = jwt.encode(to_encode, secret_key, algorithm=algorithm)
-    return encoded_jwt
+    to_encode = {
+        "exp": expire,
+        # Fractional, so a token issued right after its user's tokens were
+        # revoked isn't caught by the revocation
+        "iat": time.time(),
+        "jti": uuid4().hex,
+        "type": ACCESS_TOKEN_TYPE,
+        "sub": str(user_id),
+        "email": str(user_email),
+    }
+    if session_id is not None:
+        to_encode["sid"] = session_id
+    return keyring.sign(to_encode)
+
+
+def create_refresh_token(
+        user_id: Union[str, Any], jti: Optional[str] = None, expires_delta: timedelta = None
+) -> str:
+    expire = datetime.utcnow() + (
+        expires_delta or timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES)
+    )
+    to_encode = {
+        "exp": expire,
+        "iat": time.time(),
+        "jti": jti or uuid4().hex,
+        "type": REFRESH_TOKEN_TYPE,
+        "sub": str(user_id),
+    }
+    return keyring.sign(to_encode)
+
+
+def create_token_pair(user_id: Union[str, Any], user_email: Union[str, Any]) -> Dict[str, str]:
+    """
+    A new refresh token and an access token tied to it, as the login response.
+    """
+    session_id = uuid4().hex
+    return {
+        "access_token": create_access_token(user_id, user_email, session_id=session_id),
+        "refresh_token": create_refresh_token(user_id, jti=session_id),
+        "token_type": "bearer",
+    }
 
 
 def decode_access_token(token: str) -> dict:
     # print(f'Incoming token for decoding: {token}')
     try:
-        secret_key = settings.SECRET_KEY
-        algorithm = ALGORITHM
-        # print(f'Decode secret key = {secret_key}')
-        # print(f'Decode algorithm = {algorithm}')
-        decoded_token = jwt.decode(token, secret_key, algorithms=[algorithm])
+        decoded_token = keyring.decode(token)
         # print(f'decoded_token: {decoded_token}')
         exp_datetime = datetime.fromtimestamp(decoded_token["exp"], timezone.utc)
 
@@ -49,9 +89,38 @@ def decode_access_token(token: str) -> dict:
         return {}
 
 
+def decode_refresh_token(token: str) -> Optional[dict]:
+    claims = decode_access_token(token)
+    if not claims or claims.get("type") != REFRESH_TOKEN_TYPE:
+        return None
+    return claims
+
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    with phase("hashing"):
+        return hasher.verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    with phase("hashing"):
+        return hasher.hash(password)
+
+
+def get_password_hashes(passwords: List[str]) -> List[str]:
+    with phase("hashing"):
+        return hasher.hash_many(passwords)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    with phase("hashing"):
+        return await hasher.averify(plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    with phase("hashing"):
+        return await hasher.ahash(password)
+
+
+async def get_password_hashes_async(passwords: List[str]) -> List[str]:
+    with phase("hashing"):
+        return await hasher.ahash_many(passwords)
@@ -0,0 +1,124 @@
+import csv
+import io
+from functools import lru_cache
+from operator import attrgetter
+from typing import (
+    Any,
+    AsyncIterable,
+    AsyncIterator,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Type,
+    Union,
+)
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+
+from app.core.instrumentation import phase
+
+EXPORT_MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+Rows = Sequence[Sequence]
+
+
+def schema_fields(schema: Type[BaseModel]) -> List[str]:
+    """
+    Names of the fields a response schema exposes, in declaration order.
+    """
+    return list(schema.__fields__)
+
+
+class ModelSerializer:
+    def __init__(self, schema: Type[BaseModel]):
+        """
+        Serializes ORM rows (or instances of `schema`) to JSON the way
+        `response_model=schema` would, but without building a pydantic model
+        per row or going through `jsonable_encoder`. The fields are read with
+        one precompiled `attrgetter` and encoded with orjson.
+
+        Only meant for schemas whose fields the ORM already holds in their
+        final JSON type, such as `schemas.User` and `schemas.Item`.
+        """
+        self.fields = schema_fields(schema)
+        getter = attrgetter(*self.fields)
+        if len(self.fields) == 1:
+            self._values = lambda obj: (getter(obj),)
+        else:
+            self._values = getter
+
+    def to_dict(self, obj: Any) -> dict:
+        return dict(zip(self.fields, self._values(obj)))
+
+    def dumps(self, obj: Union[Any, Sequence[Any]]) -> bytes:
+        with phase("serialization"):
+            if isinstance(obj, (list, tuple)):
+                return orjson.dumps([self.to_dict(item) for item in obj])
+            return orjson.dumps(self.to_dict(obj))
+
+
+@lru_cache(maxsize=None)
+def serializer_for(schema: Type[BaseModel]) -> ModelSerializer:
+    return ModelSerializer(schema)
+
+
+def serialized_response(
+    schema: Type[BaseModel],
+    obj: Union[Any, Sequence[Any]],
+    headers: Optional[Mapping[str, str]] = None,
+) -> Response:
+    """
+    JSON response for `obj` (a row or a list of rows) serialized through
+    `serializer_for(schema)`, bypassing the route's `response_model`.
+    """
+    return Response(
+        content=serializer_for(schema).dumps(obj),
+        media_type="application/json",
+        headers=headers,
+    )
+
+
+def encode_ndjson(fields: Sequence[str], rows: Rows) -> str:
+    with phase("serialization"):
+        return "".join(
+            orjson.dumps(dict(zip(fields, row)), default=str).decode() + "\n"
+            for row in rows
+        )
+
+
+def encode_csv(rows: Rows) -> str:
+    with phase("serialization"):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerows(rows)
+        return buffer.getvalue()
+
+
+def export_chunks(fields: Sequence[str], partitions: Iterable[Rows], format: str) -> Iterator[str]:
+    """
+    Encode batches of rows, whose values are in `fields` order, into NDJSON or
+    CSV chunks, one chunk per batch.
+    """
+    if format == "csv":
+        yield encode_csv([fields])
+        for rows in partitions:
+            yield encode_csv(rows)
+    else:
+        for rows in partitions:
+            yield encode_ndjson(fields, rows)
+
+
+async def aexport_chunks(
+    fields: Sequence[str], partitions: AsyncIterable[Rows], format: str
+) -> AsyncIterator[str]:
+    if format == "csv":
+        yield encode_csv([fields])
+        async for rows in partitions:
+            yield encode_csv(rows)
+    else:
+        async for rows in partitions:
+            yield encode_ndjson(fields, rows)
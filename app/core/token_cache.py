@@ -0,0 +1,96 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
+
+from app.core.config import settings
+
+
+class CachedToken:
+    __slots__ = ("claims", "user_id", "expires_at", "user", "principal")
+
+    def __init__(self, claims: Dict[str, Any], user_id: Any, expires_at: float):
+        self.claims = claims
+        self.user_id = user_id
+        self.expires_at = expires_at
+        # Snapshot of the token's user, filled in by the first request that loads it
+        self.user: Optional[Any] = None
+        # Principal of the token's user, filled in the same way
+        self.principal: Optional[Any] = None
+
+
+class TokenCache:
+    def __init__(self, maxsize: int):
+        """
+        LRU cache of verified access tokens, so a token is decoded once and not
+        on every request. Entries expire with the token's own `exp`.
+
+        **Parameters**
+
+        * `maxsize`: Maximum number of tokens kept, 0 disables the cache
+        """
+        self.maxsize = maxsize
+        self._entries: "OrderedDict[bytes, CachedToken]" = OrderedDict()
+        self._by_user: Dict[Any, Set[bytes]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> Optional[CachedToken]:
+        if not self.maxsize:
+            return None
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry.expires_at <= time.time():
+                self._pop(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def put(self, token: str, claims: Dict[str, Any]) -> Optional[CachedToken]:
+        if not self.maxsize or "exp" not in claims:
+            return None
+        key = self._key(token)
+        entry = CachedToken(claims, claims.get("sub"), float(claims["exp"]))
+        with self._lock:
+            self._pop(key)
+            self._entries[key] = entry
+            self._by_user.setdefault(entry.user_id, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._pop(next(iter(self._entries)))
+        return entry
+
+    def invalidate_user(self, user_id: Any) -> None:
+        """
+        Drop the user snapshots and principals cached for `user_id`; their
+        claims stay valid.
+        """
+        with self._lock:
+            for key in self._by_user.get(str(user_id), ()):
+                entry = self._entries[key]
+                entry.user = None
+                entry.principal = None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_user.clear()
+
+    def _pop(self, key: bytes) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._by_user.get(entry.user_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_user[entry.user_id]
+
+
+token_cache = TokenCache(maxsize=settings.TOKEN_CACHE_SIZE)
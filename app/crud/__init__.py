@@ -1,5 +1,8 @@
-from .crud_item import item
-from .crud_user import user
+from .async_base import async_unit_of_work
+from .base import unit_of_work
+from .crud_item import async_item, item
+from .crud_revoked_token import async_revoked_token, revoked_token
+from .crud_user import async_user, user
 
 # For a new basic set of CRUD operations you could just do
 
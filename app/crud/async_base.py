@@ -0,0 +1,210 @@
+from contextlib import asynccontextmanager
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Generic,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    Union,
+)
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncResult, AsyncSession
+
+from app.core.cache import CacheBackend
+from app.crud.base import (
+    UNIT_OF_WORK,
+    CacheMixin,
+    CreateSchemaType,
+    ModelType,
+    QueryBuilderMixin,
+    UpdateSchemaType,
+    send_invalidations,
+)
+
+
+@asynccontextmanager
+async def async_unit_of_work(db: AsyncSession) -> AsyncIterator[AsyncSession]:
+    """
+    Async counterpart of `unit_of_work`.
+    """
+    if UNIT_OF_WORK in db.info:
+        yield db
+        return
+    pending = db.info[UNIT_OF_WORK] = []
+    try:
+        yield db
+        await db.commit()
+    except BaseException:
+        await db.rollback()
+        raise
+    finally:
+        del db.info[UNIT_OF_WORK]
+    send_invalidations(pending)
+
+
+async def commit_async(db: AsyncSession) -> None:
+    """
+    Commit, or only flush when inside `async_unit_of_work`.
+    """
+    if UNIT_OF_WORK in db.info:
+        await db.flush()
+    else:
+        await db.commit()
+
+
+class AsyncCRUDBase(
+    QueryBuilderMixin,
+    CacheMixin,
+    Generic[ModelType, CreateSchemaType, UpdateSchemaType],
+):
+    def __init__(
+        self,
+        model: Type[ModelType],
+        cache: Optional[CacheBackend] = None,
+        cache_ttl: int = 60,
+    ):
+        """
+        Async counterpart of `CRUDBase`, used when `DB_ASYNC_MODE` is enabled.
+        It shares the cache backend with the sync path; the backend's calls
+        are blocking, like the sync path's, and are kept to one per read.
+
+        **Parameters**
+
+        * `model`: A SQLAlchemy model class
+        * `cache`: Optional cache backend for `get`, invalidated by every write
+        * `cache_ttl`: Seconds a cached row may be served
+        """
+        self.model = model
+        self.cache = cache
+        self.cache_ttl = cache_ttl
+
+    async def get(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
+        if not self._reads_cache(db):
+            return await self._get_from_db(db, id)
+        key = self.cache_key(id)
+        cached = self.cache.get(key)
+        if cached is not None:
+            # Merging without loading does no IO, so the sync session can do it
+            db_obj = self._from_cache(db.sync_session, cached)
+            if db_obj is not None:
+                return db_obj
+        db_obj = await self._get_from_db(db, id)
+        if db_obj is not None:
+            self.cache.set(key, self._to_cache(db_obj), self.cache_ttl)
+        return db_obj
+
+    async def _get_from_db(self, db: AsyncSession, id: Any) -> Optional[ModelType]:
+        result = await db.execute(select(self.model).where(self.model.id == id))
+        return result.scalars().first()
+
+    async def get_many(
+        self, db: AsyncSession, ids: Sequence[Any], *, load: Optional[Mapping[str, str]] = None
+    ) -> List[ModelType]:
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return []
+        stmt = self.get_many_query(db, ids).options(*self.loader_options(load))
+        result = await db.scalars(stmt)
+        return self.in_order(result.unique(), ids)
+
+    async def get_multi(
+        self,
+        db: AsyncSession,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        load: Optional[Mapping[str, str]] = None,
+    ) -> List[ModelType]:
+        stmt = select(self.model).options(*self.loader_options(load))
+        result = await db.execute(stmt.offset(skip).limit(limit))
+        # Lazy loads can't run under asyncio, so relationships read by the
+        # caller must be eagerly loaded through `load` or `list_loaders`
+        return list(result.scalars().unique().all())
+
+    async def get_multi_keyset(
+        self,
+        db: AsyncSession,
+        *,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        order_by: str = "id",
+        load: Optional[Mapping[str, str]] = None,
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        stmt = select(self.model).options(*self.loader_options(load))
+        stmt = self.keyset_query(stmt, cursor=cursor, order_by=order_by)
+        result = await db.execute(stmt.limit(limit))
+        rows = list(result.scalars().unique().all())
+        return rows, self.next_cursor(rows, limit=limit, order_by=order_by)
+
+    async def search(
+        self,
+        db: AsyncSession,
+        *,
+        q: str,
+        skip: int = 0,
+        limit: int = 100,
+        load: Optional[Mapping[str, str]] = None,
+        **filter_by: Any
+    ) -> List[ModelType]:
+        stmt = self.search_query(q).filter_by(**filter_by).offset(skip).limit(limit)
+        return list((await db.scalars(stmt.options(*self.loader_options(load)))).unique())
+
+    async def stream(
+        self,
+        db: AsyncSession,
+        *,
+        fields: Sequence[str],
+        batch_size: int = 1000,
+        **filter_by: Any
+    ) -> AsyncResult:
+        return await db.stream(
+            self.stream_query(fields, **filter_by).execution_options(yield_per=batch_size)
+        )
+
+    async def create(self, db: AsyncSession, *, obj_in: CreateSchemaType) -> ModelType:
+        obj_in_data = jsonable_encoder(obj_in)
+        db_obj = self.model(**obj_in_data)  # type: ignore
+        db.add(db_obj)
+        await commit_async(db)
+        self.invalidate(db, db_obj)
+        return db_obj
+
+    async def update(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+    ) -> ModelType:
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        # Mapped columns rather than the loaded ones: rows built from the cache
+        # haven't loaded their `cache_exclude` columns. Relationships are left
+        # alone, as they were when only loaded columns were updated
+        columns = self.model.__mapper__.column_attrs
+        for field in update_data:
+            if field in columns:
+                setattr(db_obj, field, update_data[field])
+        db.add(db_obj)
+        await commit_async(db)
+        self.invalidate(db, db_obj)
+        return db_obj
+
+    async def remove(self, db: AsyncSession, *, id: int) -> Optional[ModelType]:
+        obj = await db.scalar(
+            delete(self.model).where(self.model.id == id).returning(self.model)
+        )
+        if obj is None:
+            return None
+        await commit_async(db)
+        self.invalidate(db, obj)
+        return obj
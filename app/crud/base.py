@@ -1,18 +1,344 @@
-from typing import Any, Dict, Generic, List, Optional, Type, TypeVar, Union
+import base64
+import binascii
+import json
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Collection,
+    Dict,
+    Generic,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+)
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import Result, any_, delete, func, literal, or_, select, tuple_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import (
+    Query,
+    Session,
+    joinedload,
+    lazyload,
+    make_transient_to_detached,
+    raiseload,
+    selectinload,
+)
+from sqlalchemy.orm.util import identity_key
+from sqlalchemy.sql import Select
 
+from app.core.cache import CacheBackend
 from app.db.base_class import Base
+from app.db.tenancy import is_visible
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
+QueryType = TypeVar("QueryType", Query, Select)
 
+# Set in `Session.info` once a request has written, so its later reads skip the cache
+CACHE_BYPASS = "cache_bypass"
+# Set in `Session.info` inside `unit_of_work`; holds the invalidations to send on commit
+UNIT_OF_WORK = "unit_of_work"
 
-class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
-    def __init__(self, model: Type[ModelType]):
+LOADER_STRATEGIES = {
+    "selectin": selectinload,
+    "joined": joinedload,
+    "lazy": lazyload,
+    "raise": raiseload,
+}
+
+
+def encode_cursor(order_by: str, value: Any, id: Any) -> str:
+    """
+    Pack the sort key of the last row of a page into an opaque cursor.
+    """
+    raw = json.dumps([order_by, value, id], separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, Any, Any]:
+    """
+    Unpack a cursor produced by `encode_cursor`, raising ValueError if it is malformed.
+    """
+    padded = cursor + "=" * (-len(cursor) % 4)
+    try:
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(values, list) or len(values) != 3:
+        raise ValueError("Invalid cursor")
+    return values[0], values[1], values[2]
+
+
+def cursor_value(column: Any, value: Any) -> Any:
+    """
+    `value` from a cursor as the Python type of `column`, raising ValueError
+    if it isn't one, so a tampered cursor never reaches the database.
+    """
+    python_type = column.type.python_type
+    if isinstance(value, str) and python_type is not str and hasattr(python_type, "fromisoformat"):
+        # Dates and times are encoded as their str()
+        try:
+            return python_type.fromisoformat(value)
+        except ValueError:
+            raise ValueError("Invalid cursor")
+    # bool is an int, but never a valid id
+    if not isinstance(value, python_type) or (isinstance(value, bool) and python_type is not bool):
+        raise ValueError("Invalid cursor")
+    return value
+
+
+def insert_ignoring_conflicts(db: Any, model: Type[Base], *, index_elements: List[Any]) -> Any:
+    """
+    `INSERT ... ON CONFLICT DO NOTHING` for the dialect `db` is bound to.
+    SQLite is supported so the benchmarks can run without a database server.
+    """
+    dialect = sqlite if db.get_bind().dialect.name == "sqlite" else postgresql
+    return dialect.insert(model).on_conflict_do_nothing(index_elements=index_elements)
+
+
+@contextmanager
+def unit_of_work(db: Session) -> Iterator[Session]:
+    """
+    Run several CRUD writes in one transaction. Inside the block writes are
+    only flushed; the block commits once at the end, or rolls back if it
+    raises, and only then invalidates the cache.
+    """
+    if UNIT_OF_WORK in db.info:
+        yield db
+        return
+    pending = db.info[UNIT_OF_WORK] = []
+    try:
+        yield db
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+    finally:
+        del db.info[UNIT_OF_WORK]
+    send_invalidations(pending)
+
+
+def send_invalidations(pending: List[Tuple[CacheBackend, List[str], Dict[str, Any]]]) -> None:
+    for cache, keys, message in pending:
+        cache.delete(*keys)
+        cache.publish(message)
+
+
+def commit(db: Session) -> None:
+    """
+    Commit, or only flush when inside `unit_of_work`.
+    """
+    if UNIT_OF_WORK in db.info:
+        db.flush()
+    else:
+        db.commit()
+
+
+class QueryBuilderMixin:
+    """
+    Statement builders shared by the sync and async CRUD classes.
+    """
+
+    model: Type[Base]
+    # Columns matched by trigram similarity when a search finds no whole words
+    search_fields: Sequence[str] = ()
+    # How the list methods load relationships, as {relationship: strategy};
+    # relationships left out keep the strategy declared on the model
+    list_loaders: Mapping[str, str] = {}
+
+    def loader_options(self, load: Optional[Mapping[str, str]] = None) -> List[Any]:
+        """
+        Loader options for `load`, or `list_loaders` when None. Strategies are
+        "selectin" (one extra `IN` query for the whole page), "joined" (a
+        `LEFT OUTER JOIN`, best for many-to-one), "lazy" (a query per row on
+        first access) and "raise" (access raises, to catch N+1 loads).
+        """
+        if load is None:
+            load = self.list_loaders
+        options = []
+        for relationship, strategy in load.items():
+            if strategy not in LOADER_STRATEGIES:
+                raise ValueError(f"Unknown loader strategy: {strategy}")
+            options.append(LOADER_STRATEGIES[strategy](getattr(self.model, relationship)))
+        return options
+
+    def keyset_query(
+        self, query: QueryType, *, cursor: Optional[str] = None, order_by: str = "id"
+    ) -> QueryType:
+        """
+        Order `query` (a `Query` or a `select()`) by `(order_by, id)` and,
+        given a cursor, seek past its last row.
+        """
+        column = self._keyset_column(order_by)
+        if cursor is not None:
+            cursor_order_by, value, last_id = decode_cursor(cursor)
+            if cursor_order_by != order_by:
+                raise ValueError("Cursor does not match the requested ordering")
+            last_id = cursor_value(self.model.id, last_id)
+            if column is self.model.id:
+                query = query.filter(self.model.id > last_id)
+            else:
+                value = cursor_value(column, value)
+                query = query.filter(
+                    tuple_(column, self.model.id) > tuple_(value, last_id)
+                )
+        if column is self.model.id:
+            return query.order_by(self.model.id)
+        return query.order_by(column, self.model.id)
+
+    def next_cursor(
+        self, rows: List[Any], *, limit: int, order_by: str = "id"
+    ) -> Optional[str]:
+        if not rows or len(rows) < limit:
+            return None
+        last = rows[-1]
+        return encode_cursor(order_by, getattr(last, order_by), last.id)
+
+    def stream_query(self, fields: Sequence[str], **filter_by: Any) -> Select:
+        columns = [getattr(self.model, field) for field in fields]
+        return select(*columns).filter_by(**filter_by).order_by(self.model.id)
+
+    def get_many_query(self, db: Any, ids: Sequence[Any]) -> Select:
+        """
+        Rows with these ids. On PostgreSQL the ids are bound as one array,
+        `id = ANY(:ids)`, so the statement is the same however many there
+        are; SQLite gets an `IN` list.
+        """
+        stmt = select(self.model)
+        # Passing the statement lets a routing session keep it on a replica
+        if db.get_bind(clause=stmt).dialect.name == "postgresql":
+            criterion = self.model.id == any_(
+                literal(list(ids), postgresql.ARRAY(self.model.id.type))
+            )
+        else:
+            criterion = self.model.id.in_(ids)
+        return stmt.where(criterion)
+
+    @staticmethod
+    def in_order(rows: Iterable[Any], ids: Sequence[Any]) -> List[Any]:
+        """
+        `rows` in the order of `ids`, leaving out ids without a row.
+        """
+        by_id = {row.id: row for row in rows}
+        return [by_id[id] for id in ids if id in by_id]
+
+    def search_query(self, q: str) -> Select:
+        """
+        Rows whose `search_vector` matches `q` as a web search query, or whose
+        `search_fields` contain a word similar to `q` (prefixes and typos),
+        best matches first. Postgres only.
+        """
+        tsquery = func.websearch_to_tsquery("simple", q)
+        columns = [getattr(self.model, field) for field in self.search_fields]
+        return (
+            select(self.model)
+            .where(
+                or_(
+                    self.model.search_vector.op("@@")(tsquery),
+                    *(literal(q).op("<%")(column) for column in columns),
+                )
+            )
+            .order_by(
+                func.ts_rank(self.model.search_vector, tsquery).desc(),
+                func.greatest(*(func.word_similarity(q, column) for column in columns)).desc(),
+                self.model.id,
+            )
+        )
+
+    def _keyset_column(self, order_by: str) -> Any:
+        column = self.model.__table__.columns.get(order_by)
+        if column is None:
+            raise ValueError(f"Unknown sort column: {order_by}")
+        indexed = column.index or column.unique
+        if not (column.primary_key or (indexed and not column.nullable)):
+            raise ValueError(f"Column {order_by} is not an indexed, non-null column")
+        return getattr(self.model, order_by)
+
+
+class CacheMixin:
+    """
+    Read-through row cache shared by the sync and async CRUD classes.
+    """
+
+    model: Type[Base]
+    cache: Optional[CacheBackend]
+    cache_ttl: int
+    # Columns kept out of the cache, which other services may read, e.g. secrets.
+    # Rows built from the cache load them from the database on first access,
+    # which async sessions can't do: load them explicitly there
+    cache_exclude: Collection[str] = ()
+
+    def cache_key(self, id: Any) -> str:
+        return f"{self.model.__tablename__}:id:{id}"
+
+    def invalidate(self, db: Any, db_obj: Any, *extra_keys: str) -> None:
+        """
+        Drop `db_obj` from the cache and tell every worker it changed. The rest
+        of the request then reads from the database, so it sees its own writes.
+        """
+        if self.cache is None:
+            return
+        db.info[CACHE_BYPASS] = True
+        keys = [self.cache_key(db_obj.id), *self._extra_cache_keys(db_obj), *extra_keys]
+        message = {"table": self.model.__tablename__, "id": db_obj.id}
+        pending = db.info.get(UNIT_OF_WORK)
+        if pending is not None:
+            # Other workers could otherwise re-cache the old row before the commit
+            pending.append((self.cache, keys, message))
+            return
+        self.cache.delete(*keys)
+        self.cache.publish(message)
+
+    def _extra_cache_keys(self, db_obj: Any) -> List[str]:
+        return []
+
+    def _reads_cache(self, db: Any) -> bool:
+        return self.cache is not None and not db.info.get(CACHE_BYPASS)
+
+    def _to_cache(self, db_obj: Any) -> str:
+        # Generated columns are left out: they can't be written back and are deferred
+        columns = [
+            c
+            for c in self.model.__table__.columns
+            if c.computed is None and c.key not in self.cache_exclude
+        ]
+        return json.dumps({column.key: getattr(db_obj, column.key) for column in columns})
+
+    def _from_cache(self, db: Session, cached: str) -> Any:
+        data = json.loads(cached)
+        # The cache is shared by all tenants; None makes the caller run its scoped query
+        if not is_visible(db, self.model, data.get("tenant_id")):
+            return None
+        ident = tuple(data[column.key] for column in self.model.__mapper__.primary_key)
+        in_session = db.identity_map.get(identity_key(self.model, ident))
+        if in_session is not None:
+            return in_session
+        db_obj = self.model(**data)
+        make_transient_to_detached(db_obj)
+        return db.merge(db_obj, load=False)
+
+
+class CRUDBase(
+    QueryBuilderMixin,
+    CacheMixin,
+    Generic[ModelType, CreateSchemaType, UpdateSchemaType],
+):
+    def __init__(
+        self,
+        model: Type[ModelType],
+        cache: Optional[CacheBackend] = None,
+        cache_ttl: int = 60,
+    ):
         """
         CRUD object with default methods to Create, Read, Update, Delete (CRUD).
 
@@ -20,23 +346,115 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
 
         * `model`: A SQLAlchemy model class
         * `schema`: A Pydantic model (schema) class
+        * `cache`: Optional cache backend for `get`, invalidated by every write
+        * `cache_ttl`: Seconds a cached row may be served
         """
         self.model = model
+        self.cache = cache
+        self.cache_ttl = cache_ttl
 
     def get(self, db: Session, id: Any) -> Optional[ModelType]:
-        return db.query(self.model).filter(self.model.id == id).first()
+        if not self._reads_cache(db):
+            return db.query(self.model).filter(self.model.id == id).first()
+        key = self.cache_key(id)
+        cached = self.cache.get(key)
+        if cached is not None:
+            db_obj = self._from_cache(db, cached)
+            if db_obj is not None:
+                return db_obj
+        db_obj = db.query(self.model).filter(self.model.id == id).first()
+        if db_obj is not None:
+            self.cache.set(key, self._to_cache(db_obj), self.cache_ttl)
+        return db_obj
+
+    def get_many(
+        self, db: Session, ids: Sequence[Any], *, load: Optional[Mapping[str, str]] = None
+    ) -> List[ModelType]:
+        """
+        The rows with these ids, in one query and in the order of `ids`;
+        duplicates and ids without a row are left out. Unlike `get` this
+        doesn't read through the cache, which would cost a lookup per id.
+        """
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            return []
+        stmt = self.get_many_query(db, ids).options(*self.loader_options(load))
+        return self.in_order(db.scalars(stmt).unique(), ids)
 
     def get_multi(
-        self, db: Session, *, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        skip: int = 0,
+        limit: int = 100,
+        load: Optional[Mapping[str, str]] = None,
     ) -> List[ModelType]:
-        return db.query(self.model).offset(skip).limit(limit).all()
+        return (
+            db.query(self.model)
+            .options(*self.loader_options(load))
+            .offset(skip)
+            .limit(limit)
+            .all()
+        )
+
+    def get_multi_keyset(
+        self,
+        db: Session,
+        *,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        order_by: str = "id",
+        load: Optional[Mapping[str, str]] = None,
+    ) -> Tuple[List[ModelType], Optional[str]]:
+        """
+        Page through rows by keyset instead of offset, so every page costs the
+        same index range scan no matter how deep it is.
+
+        Returns the page and the cursor of the next page, or None on the last page.
+        """
+        query = db.query(self.model).options(*self.loader_options(load))
+        query = self.keyset_query(query, cursor=cursor, order_by=order_by)
+        rows = query.limit(limit).all()
+        return rows, self.next_cursor(rows, limit=limit, order_by=order_by)
+
+    def stream(
+        self,
+        db: Session,
+        *,
+        fields: Sequence[str],
+        batch_size: int = 1000,
+        **filter_by: Any
+    ) -> Result:
+        """
+        Select `fields` of every matching row through a server-side cursor.
+        Iterate the result's `partitions()` to get batches of `batch_size` rows
+        without loading the whole table or building ORM objects.
+        """
+        return db.execute(
+            self.stream_query(fields, **filter_by).execution_options(yield_per=batch_size)
+        )
+
+    def search(
+        self,
+        db: Session,
+        *,
+        q: str,
+        skip: int = 0,
+        limit: int = 100,
+        load: Optional[Mapping[str, str]] = None,
+        **filter_by: Any
+    ) -> List[ModelType]:
+        stmt = self.search_query(q).filter_by(**filter_by).offset(skip).limit(limit)
+        return list(db.scalars(stmt.options(*self.loader_options(load))).unique())
 
     def create(self, db: Session, *, obj_in: CreateSchemaType) -> ModelType:
         obj_in_data = jsonable_encoder(obj_in)
         db_obj = self.model(**obj_in_data)  # type: ignore
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        # The flush is an INSERT ... RETURNING the generated id, and sessions
+        # don't expire on commit, so there is nothing to refresh
+        commit(db)
+        self.invalidate(db, db_obj)
         return db_obj
 
     def update(
@@ -46,21 +464,30 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         db_obj: ModelType,
         obj_in: Union[UpdateSchemaType, Dict[str, Any]]
     ) -> ModelType:
-        obj_data = jsonable_encoder(db_obj)
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.dict(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
+        # Mapped columns rather than the loaded ones: rows built from the cache
+        # haven't loaded their `cache_exclude` columns. Relationships are left
+        # alone, as they were when only loaded columns were updated
+        columns = self.model.__mapper__.column_attrs
+        for field in update_data:
+            if field in columns:
                 setattr(db_obj, field, update_data[field])
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        commit(db)
+        self.invalidate(db, db_obj)
         return db_obj
 
-    def remove(self, db: Session, *, id: int) -> ModelType:
-        obj = db.query(self.model).get(id)
-        db.delete(obj)
-        db.commit()
+    def remove(self, db: Session, *, id: int) -> Optional[ModelType]:
+        """
+        Delete the row in one `DELETE ... RETURNING` and return it, or None if
+        there was no such row. Being a single statement, it skips ORM cascades.
+        """
+        obj = db.scalar(delete(self.model).where(self.model.id == id).returning(self.model))
+        if obj is None:
+            return None
+        commit(db)
+        self.invalidate(db, obj)
         return obj
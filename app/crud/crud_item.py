@@ -1,34 +1,114 @@
-from typing import List
+from typing import List, Mapping, Optional, Tuple
 
 from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.crud.base import CRUDBase
+from app.crud.async_base import AsyncCRUDBase, commit_async
+from app.crud.base import CRUDBase, commit
 from app.models.item import Item
 from app.schemas.item import ItemCreate, ItemUpdate
 
 
 class CRUDItem(CRUDBase[Item, ItemCreate, ItemUpdate]):
+    search_fields = ("title",)
+    # Item responses don't include the owner: reading it from a listed item
+    # fails at once instead of costing a query per row
+    list_loaders = {"owner": "raise"}
+
     def create_with_owner(
         self, db: Session, *, obj_in: ItemCreate, owner_id: int
     ) -> Item:
         obj_in_data = jsonable_encoder(obj_in)
         db_obj = self.model(**obj_in_data, owner_id=owner_id)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        commit(db)
         return db_obj
 
     def get_multi_by_owner(
-        self, db: Session, *, owner_id: int, skip: int = 0, limit: int = 100
+        self,
+        db: Session,
+        *,
+        owner_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        load: Optional[Mapping[str, str]] = None,
     ) -> List[Item]:
         return (
             db.query(self.model)
+            .options(*self.loader_options(load))
             .filter(Item.owner_id == owner_id)
             .offset(skip)
             .limit(limit)
             .all()
         )
 
+    def get_multi_by_owner_keyset(
+        self,
+        db: Session,
+        *,
+        owner_id: int,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        order_by: str = "id",
+        load: Optional[Mapping[str, str]] = None,
+    ) -> Tuple[List[Item], Optional[str]]:
+        query = db.query(self.model).options(*self.loader_options(load))
+        query = query.filter(Item.owner_id == owner_id)
+        query = self.keyset_query(query, cursor=cursor, order_by=order_by)
+        rows = query.limit(limit).all()
+        return rows, self.next_cursor(rows, limit=limit, order_by=order_by)
+
+
+class AsyncCRUDItem(AsyncCRUDBase[Item, ItemCreate, ItemUpdate]):
+    search_fields = ("title",)
+    list_loaders = {"owner": "raise"}
+
+    async def create_with_owner(
+        self, db: AsyncSession, *, obj_in: ItemCreate, owner_id: int
+    ) -> Item:
+        obj_in_data = jsonable_encoder(obj_in)
+        db_obj = self.model(**obj_in_data, owner_id=owner_id)
+        db.add(db_obj)
+        await commit_async(db)
+        return db_obj
+
+    async def get_multi_by_owner(
+        self,
+        db: AsyncSession,
+        *,
+        owner_id: int,
+        skip: int = 0,
+        limit: int = 100,
+        load: Optional[Mapping[str, str]] = None,
+    ) -> List[Item]:
+        result = await db.execute(
+            select(self.model)
+            .options(*self.loader_options(load))
+            .where(Item.owner_id == owner_id)
+            .offset(skip)
+            .limit(limit)
+        )
+        return list(result.scalars().unique().all())
+
+    async def get_multi_by_owner_keyset(
+        self,
+        db: AsyncSession,
+        *,
+        owner_id: int,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        order_by: str = "id",
+        load: Optional[Mapping[str, str]] = None,
+    ) -> Tuple[List[Item], Optional[str]]:
+        stmt = select(self.model).options(*self.loader_options(load))
+        stmt = stmt.where(Item.owner_id == owner_id)
+        stmt = self.keyset_query(stmt, cursor=cursor, order_by=order_by)
+        result = await db.execute(stmt.limit(limit))
+        rows = list(result.scalars().unique().all())
+        return rows, self.next_cursor(rows, limit=limit, order_by=order_by)
+
 
 item = CRUDItem(Item)
+async_item = AsyncCRUDItem(Item)
@@ -0,0 +1,141 @@
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, List, Mapping, Optional
+
+from pydantic import BaseModel
+from sqlalchemy import delete, or_, select
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.revocation import RevocationLoader, revocations
+from app.crud.async_base import AsyncCRUDBase, commit_async
+from app.crud.base import CRUDBase, commit, insert_ignoring_conflicts
+from app.models.revoked_token import RevokedToken
+
+# Expired rows are deleted at most this often, by whichever worker syncs first
+PURGE_INTERVAL_SECONDS = 3600
+
+
+def _user_revocation(user_id: int) -> RevokedToken:
+    # Covers every token issued so far, so it's needed until the longest lived expires
+    now = datetime.now(timezone.utc)
+    return RevokedToken(
+        user_id=user_id,
+        revoked_at=now,
+        expires_at=now + timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES),
+    )
+
+
+def _revoked_query(claims: Mapping[str, Any]) -> Any:
+    issued_at = datetime.fromtimestamp(float(claims.get("iat", 0)), timezone.utc)
+    return select(RevokedToken.id).where(
+        or_(
+            RevokedToken.jti == claims.get("jti"),
+            (RevokedToken.user_id == int(claims["sub"]))
+            & RevokedToken.jti.is_(None)
+            & (RevokedToken.revoked_at > issued_at),
+        )
+    ).limit(1)
+
+
+class CRUDRevokedToken(CRUDBase[RevokedToken, BaseModel, BaseModel]):
+    def revoke(self, db: Session, *, jti: str, user_id: int, expires_at: datetime) -> bool:
+        """
+        Revoke the token `jti` until it expires. Returns False if it already
+        was revoked, which makes this the check-and-set of refresh token rotation.
+        """
+        stmt = insert_ignoring_conflicts(db, RevokedToken, index_elements=[RevokedToken.jti])
+        revoked_id = db.scalar(
+            stmt.values(
+                jti=jti,
+                user_id=user_id,
+                revoked_at=datetime.now(timezone.utc),
+                expires_at=expires_at,
+            ).returning(RevokedToken.id)
+        )
+        commit(db)
+        revocations.add(jti, expires_at.timestamp())
+        return revoked_id is not None
+
+    def revoke_user(self, db: Session, *, user_id: int) -> None:
+        """
+        Revoke every token issued to the user so far.
+        """
+        db_obj = _user_revocation(user_id)
+        db.add(db_obj)
+        commit(db)
+        revocations.apply([db_obj])
+
+    def is_revoked(self, db: Session, *, claims: Mapping[str, Any]) -> bool:
+        """
+        Authoritative version of `revocations.is_revoked`, for refresh tokens,
+        which other workers may have revoked since the last sync.
+        """
+        return db.scalar(_revoked_query(claims)) is not None
+
+    def get_since(self, db: Session, *, since: Optional[datetime] = None) -> List[Row]:
+        """
+        Unexpired revocations, only those made after `since` if given.
+        """
+        stmt = select(
+            RevokedToken.jti,
+            RevokedToken.user_id,
+            RevokedToken.revoked_at,
+            RevokedToken.expires_at,
+        ).where(RevokedToken.expires_at > datetime.now(timezone.utc))
+        if since is not None:
+            stmt = stmt.where(RevokedToken.revoked_at > since)
+        return list(db.execute(stmt))
+
+    def purge_expired(self, db: Session) -> None:
+        db.execute(delete(RevokedToken).where(RevokedToken.expires_at <= datetime.now(timezone.utc)))
+        commit(db)
+
+    def loader(self, session_factory: Callable[[], Session]) -> RevocationLoader:
+        """
+        Loader for `revocations.start` reading through sessions of `session_factory`.
+        """
+        purged_at = 0.0
+
+        def load(since: Optional[datetime]) -> List[Row]:
+            nonlocal purged_at
+            with session_factory() as db:
+                if time.monotonic() - purged_at > PURGE_INTERVAL_SECONDS:
+                    purged_at = time.monotonic()
+                    self.purge_expired(db)
+                return self.get_since(db, since=since)
+
+        return load
+
+
+class AsyncCRUDRevokedToken(AsyncCRUDBase[RevokedToken, BaseModel, BaseModel]):
+    async def revoke(
+        self, db: AsyncSession, *, jti: str, user_id: int, expires_at: datetime
+    ) -> bool:
+        stmt = insert_ignoring_conflicts(db, RevokedToken, index_elements=[RevokedToken.jti])
+        revoked_id = await db.scalar(
+            stmt.values(
+                jti=jti,
+                user_id=user_id,
+                revoked_at=datetime.now(timezone.utc),
+                expires_at=expires_at,
+            ).returning(RevokedToken.id)
+        )
+        await commit_async(db)
+        revocations.add(jti, expires_at.timestamp())
+        return revoked_id is not None
+
+    async def revoke_user(self, db: AsyncSession, *, user_id: int) -> None:
+        db_obj = _user_revocation(user_id)
+        db.add(db_obj)
+        await commit_async(db)
+        revocations.apply([db_obj])
+
+    async def is_revoked(self, db: AsyncSession, *, claims: Mapping[str, Any]) -> bool:
+        return await db.scalar(_revoked_query(claims)) is not None
+
+
+revoked_token = CRUDRevokedToken(RevokedToken)
+async_revoked_token = AsyncCRUDRevokedToken(RevokedToken)
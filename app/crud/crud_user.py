@@ -1,16 +1,131 @@
-from typing import Any, Dict, Optional, Union
+import json
+from typing import Any, Dict, List, Optional, Sequence, Union
 
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
-from app.core.security import get_password_hash, verify_password
-from app.crud.base import CRUDBase
+from app.core.cache import cache
+from app.core.config import settings
+from app.core.principal import Principal
+from app.core.security import (
+    get_password_hash,
+    get_password_hash_async,
+    get_password_hashes,
+    get_password_hashes_async,
+    verify_password,
+    verify_password_async,
+)
+from app.core.token_cache import token_cache
+from app.crud.async_base import AsyncCRUDBase, commit_async
+from app.crud.base import CRUDBase, commit, insert_ignoring_conflicts
+from app.crud.crud_revoked_token import async_revoked_token, revoked_token
+from app.db.tenancy import ALL_TENANTS, get_tenant
 from app.models.user import User
 from app.schemas.user import UserCreate, UserUpdate
 
 
+def email_cache_key(email: str) -> str:
+    return f"user:email:{email}"
+
+
+def _principal_query(id: Any) -> Any:
+    # Only the columns a principal needs: no identity map entry, no instrumentation
+    return select(
+        User.id, User.email, User.is_active, User.is_superuser, User.version_id, User.tenant_id
+    ).where(User.id == id)
+
+
+def _principal(row: Any) -> Optional[Principal]:
+    return Principal(*row) if row is not None else None
+
+
+def _principal_from_cache(cached: str) -> Optional[Principal]:
+    data = json.loads(cached)
+    if data.get("tenant_id") is None:
+        # Cached before users had tenants
+        return None
+    return Principal(
+        data["id"],
+        data["email"],
+        data["is_active"],
+        data["is_superuser"],
+        data["version_id"],
+        data["tenant_id"],
+    )
+
+
+def _existing_emails_query(emails: Sequence[str]) -> Any:
+    # Emails are unique across tenants, since logging in doesn't name one
+    return select(User.email).where(User.email.in_(emails)).execution_options(
+        **{ALL_TENANTS: True}
+    )
+
+
+def _cuts_off_tokens(update_data: Dict[str, Any]) -> bool:
+    return bool(update_data.get("password")) or update_data.get("is_active") is False
+
+
+def _bulk_rows(
+    db: Any, objs_in: Sequence[UserCreate], hashes: List[str]
+) -> List[Dict[str, Any]]:
+    # Core inserts skip the flush hook that puts new rows in the session's tenant
+    tenant_id = get_tenant(db)
+    tenant = {} if tenant_id is None else {"tenant_id": tenant_id}
+    return [
+        {
+            "email": obj_in.email,
+            "hashed_password": hashed_password,
+            "full_name": obj_in.full_name,
+            "is_active": obj_in.is_active,
+            "is_superuser": obj_in.is_superuser,
+            **tenant,
+        }
+        for obj_in, hashed_password in zip(objs_in, hashes)
+    ]
+
+
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
+    search_fields = ("full_name", "email")
+    # User responses don't include items: reading them from a listed user
+    # fails at once instead of costing a query per row
+    list_loaders = {"items": "raise"}
+    # Password hashes never leave the database; `authenticate` reads them from there
+    cache_exclude = ("hashed_password",)
+
     def get_by_email(self, db: Session, *, email: str) -> Optional[User]:
-        return db.query(User).filter(User.email == email).first()
+        if not self._reads_cache(db):
+            return db.query(User).filter(User.email == email).first()
+        # The email key only maps to an id; the row itself lives under the id key
+        cached_id = self.cache.get(email_cache_key(email))
+        if cached_id is not None:
+            user = self.get(db, id=int(cached_id))
+            if user is not None and user.email == email:
+                return user
+        user = db.query(User).filter(User.email == email).first()
+        if user is not None:
+            self.cache.set(email_cache_key(email), str(user.id), self.cache_ttl)
+            self.cache.set(self.cache_key(user.id), self._to_cache(user), self.cache_ttl)
+        return user
+
+    def email_exists(self, db: Session, *, email: str) -> bool:
+        """
+        Whether any tenant has a user with `email`; `get_by_email` only looks
+        in the session's tenant.
+        """
+        return db.scalar(_existing_emails_query([email])) is not None
+
+    def get_principal(self, db: Session, *, id: Any) -> Optional[Principal]:
+        """
+        The user's `Principal`, read from the cached row or with a narrow
+        column select, without loading the row into an ORM object.
+        """
+        if self._reads_cache(db):
+            cached = self.cache.get(self.cache_key(id))
+            principal = _principal_from_cache(cached) if cached is not None else None
+            if principal is not None:
+                return principal
+        return _principal(db.execute(_principal_query(id)).first())
 
     def create(self, db: Session, *, obj_in: UserCreate) -> User:
         db_obj = User(
@@ -20,10 +135,32 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             is_superuser=obj_in.is_superuser,
         )
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        commit(db)
+        self.invalidate(db, db_obj)
         return db_obj
 
+    def create_bulk(self, db: Session, *, objs_in: Sequence[UserCreate]) -> Dict[str, int]:
+        """
+        Insert a batch of users in one statement and return the ids of the ones
+        created by email. Emails that already exist are skipped before hashing,
+        and rows racing with another insert are dropped by `ON CONFLICT`.
+        """
+        if not objs_in:
+            return {}
+        emails = [obj_in.email for obj_in in objs_in]
+        existing = set(db.scalars(_existing_emails_query(emails)))
+        objs_in = [obj_in for obj_in in objs_in if obj_in.email not in existing]
+        if not objs_in:
+            return {}
+        hashes = get_password_hashes([obj_in.password for obj_in in objs_in])
+        stmt = insert_ignoring_conflicts(db, User, index_elements=[User.email])
+        result = db.execute(
+            stmt.returning(User.id, User.email), _bulk_rows(db, objs_in, hashes)
+        )
+        created = {email: id for id, email in result}
+        commit(db)
+        return created
+
     def update(
         self, db: Session, *, db_obj: User, obj_in: Union[UserUpdate, Dict[str, Any]]
     ) -> User:
@@ -31,25 +168,149 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
             update_data = obj_in
         else:
             update_data = obj_in.dict(exclude_unset=True)
-        if update_data["password"]:
+        if _cuts_off_tokens(update_data):
+            # Revoked first: if the update then fails, the user only has to log in again
+            revoked_token.revoke_user(db, user_id=db_obj.id)
+        if update_data.get("password"):
             hashed_password = get_password_hash(update_data["password"])
             del update_data["password"]
             update_data["hashed_password"] = hashed_password
-        return super().update(db, db_obj=db_obj, obj_in=update_data)
+        db_obj = super().update(db, db_obj=db_obj, obj_in=update_data)
+        # Tokens cache a snapshot of their user; make the next request reload it
+        token_cache.invalidate_user(db_obj.id)
+        return db_obj
 
     def authenticate(self, db: Session, *, email: str, password: str) -> Optional[User]:
-        user = self.get_by_email(db, email=email)
+        # Not through the cache, which doesn't hold the password hash
+        user = db.query(User).filter(User.email == email).first()
         if not user:
             return None
         if not verify_password(password, user.hashed_password):
             return None
         return user
 
-    def is_active(self, user: User) -> bool:
+    def is_active(self, user: Union[User, Principal]) -> bool:
+        return user.is_active
+
+    def is_superuser(self, user: Union[User, Principal]) -> bool:
+        return user.is_superuser
+
+    def _extra_cache_keys(self, db_obj: User) -> List[str]:
+        return [email_cache_key(db_obj.email)]
+
+
+class AsyncCRUDUser(AsyncCRUDBase[User, UserCreate, UserUpdate]):
+    search_fields = ("full_name", "email")
+    list_loaders = {"items": "raise"}
+    cache_exclude = ("hashed_password",)
+
+    async def get_by_email(self, db: AsyncSession, *, email: str) -> Optional[User]:
+        if not self._reads_cache(db):
+            return await self._get_by_email_from_db(db, email)
+        cached_id = self.cache.get(email_cache_key(email))
+        if cached_id is not None:
+            user = await self.get(db, id=int(cached_id))
+            if user is not None and user.email == email:
+                return user
+        user = await self._get_by_email_from_db(db, email)
+        if user is not None:
+            self.cache.set(email_cache_key(email), str(user.id), self.cache_ttl)
+            self.cache.set(self.cache_key(user.id), self._to_cache(user), self.cache_ttl)
+        return user
+
+    async def _get_by_email_from_db(self, db: AsyncSession, email: str) -> Optional[User]:
+        result = await db.execute(select(User).where(User.email == email))
+        return result.scalars().first()
+
+    async def email_exists(self, db: AsyncSession, *, email: str) -> bool:
+        return await db.scalar(_existing_emails_query([email])) is not None
+
+    async def get_principal(self, db: AsyncSession, *, id: Any) -> Optional[Principal]:
+        if self._reads_cache(db):
+            cached = self.cache.get(self.cache_key(id))
+            principal = _principal_from_cache(cached) if cached is not None else None
+            if principal is not None:
+                return principal
+        return _principal((await db.execute(_principal_query(id))).first())
+
+    async def create(self, db: AsyncSession, *, obj_in: UserCreate) -> User:
+        db_obj = User(
+            email=obj_in.email,
+            hashed_password=await get_password_hash_async(obj_in.password),
+            full_name=obj_in.full_name,
+            is_superuser=obj_in.is_superuser,
+        )
+        db.add(db_obj)
+        await commit_async(db)
+        self.invalidate(db, db_obj)
+        return db_obj
+
+    async def create_bulk(
+        self, db: AsyncSession, *, objs_in: Sequence[UserCreate]
+    ) -> Dict[str, int]:
+        if not objs_in:
+            return {}
+        emails = [obj_in.email for obj_in in objs_in]
+        existing = set(await db.scalars(_existing_emails_query(emails)))
+        objs_in = [obj_in for obj_in in objs_in if obj_in.email not in existing]
+        if not objs_in:
+            return {}
+        hashes = await get_password_hashes_async([obj_in.password for obj_in in objs_in])
+        stmt = insert_ignoring_conflicts(db, User, index_elements=[User.email])
+        result = await db.execute(
+            stmt.returning(User.id, User.email), _bulk_rows(db, objs_in, hashes)
+        )
+        created = {email: id for id, email in result}
+        await commit_async(db)
+        return created
+
+    async def update(
+        self,
+        db: AsyncSession,
+        *,
+        db_obj: User,
+        obj_in: Union[UserUpdate, Dict[str, Any]]
+    ) -> User:
+        if isinstance(obj_in, dict):
+            update_data = obj_in
+        else:
+            update_data = obj_in.dict(exclude_unset=True)
+        if _cuts_off_tokens(update_data):
+            await async_revoked_token.revoke_user(db, user_id=db_obj.id)
+        if update_data.get("password"):
+            hashed_password = await get_password_hash_async(update_data["password"])
+            del update_data["password"]
+            update_data["hashed_password"] = hashed_password
+        db_obj = await super().update(db, db_obj=db_obj, obj_in=update_data)
+        token_cache.invalidate_user(db_obj.id)
+        return db_obj
+
+    async def authenticate(
+        self, db: AsyncSession, *, email: str, password: str
+    ) -> Optional[User]:
+        user = await self._get_by_email_from_db(db, email)
+        if not user:
+            return None
+        if not await verify_password_async(password, user.hashed_password):
+            return None
+        return user
+
+    def is_active(self, user: Union[User, Principal]) -> bool:
         return user.is_active
 
-    def is_superuser(self, user: User) -> bool:
+    def is_superuser(self, user: Union[User, Principal]) -> bool:
         return user.is_superuser
 
+    def _extra_cache_keys(self, db_obj: User) -> List[str]:
+        return [email_cache_key(db_obj.email)]
+
+
+def _drop_token_snapshots(message: Dict[str, Any]) -> None:
+    # Users updated by another worker must not be served from this worker's token cache
+    if message.get("table") == User.__tablename__:
+        token_cache.invalidate_user(message["id"])
+
 
-user = CRUDUser(User)
+user = CRUDUser(User, cache=cache, cache_ttl=settings.USER_CACHE_TTL_SECONDS)
+async_user = AsyncCRUDUser(User, cache=cache, cache_ttl=settings.USER_CACHE_TTL_SECONDS)
+cache.subscribe(_drop_token_snapshots)
@@ -1,3 +1,5 @@
 from app.db.base_class import Base  # noqa
 from app.models.item import Item  # noqa
+from app.models.revoked_token import RevokedToken  # noqa
+from app.models.tenant import Tenant  # noqa
 from app.models.user import User  # noqa
@@ -0,0 +1,138 @@
+import threading
+import time
+from typing import Any, Dict
+from uuid import uuid4
+
+from sqlalchemy import exc
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, Pool, QueuePool
+
+from app.core.config import settings
+
+
+class PoolMetrics:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.in_use = 0
+        self.checkout_wait_seconds_total = 0.0
+        self.checkout_wait_seconds_max = 0.0
+
+    def on_checkout(self, wait: float) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.in_use += 1
+            self.checkout_wait_seconds_total += wait
+            self.checkout_wait_seconds_max = max(self.checkout_wait_seconds_max, wait)
+
+    def on_checkin(self) -> None:
+        with self._lock:
+            self.in_use -= 1
+
+    def on_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "in_use": self.in_use,
+                "checkout_wait_seconds_total": self.checkout_wait_seconds_total,
+                "checkout_wait_seconds_max": self.checkout_wait_seconds_max,
+            }
+
+
+class InstrumentedPoolMixin:
+    """
+    Times how long each checkout waits for a connection, including opening a
+    new one and the pre-ping, and counts the connections currently handed out.
+    """
+
+    metrics: PoolMetrics
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def recreate(self) -> Pool:
+        # `Engine.dispose()` swaps in a fresh pool; keep counting into the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+    def connect(self) -> Any:
+        started = time.monotonic()
+        try:
+            connection = super().connect()
+        except exc.TimeoutError:
+            self.metrics.on_timeout()
+            raise
+        self.metrics.on_checkout(time.monotonic() - started)
+        return connection
+
+    def _do_return_conn(self, record: Any) -> None:
+        self.metrics.on_checkin()
+        super()._do_return_conn(record)
+
+
+class InstrumentedQueuePool(InstrumentedPoolMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+class InstrumentedNullPool(InstrumentedPoolMixin, NullPool):
+    pass
+
+
+def engine_options(*, asyncio: bool = False) -> Dict[str, Any]:
+    """
+    `create_engine` / `create_async_engine` keyword arguments for the pool
+    configured in settings.
+    """
+    options: Dict[str, Any] = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+    if settings.DB_PGBOUNCER_MODE:
+        options["poolclass"] = InstrumentedNullPool
+        if asyncio:
+            # asyncpg prepares every statement; PgBouncer may run the next one
+            # on a server connection that never saw it, so don't cache them
+            # and give each a unique name
+            options["connect_args"] = {
+                "statement_cache_size": 0,
+                "prepared_statement_cache_size": 0,
+                "prepared_statement_name_func": _unique_statement_name,
+            }
+        return options
+    options.update(
+        poolclass=InstrumentedAsyncQueuePool if asyncio else InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    return options
+
+
+def pool_status(engine: Engine) -> Dict[str, Any]:
+    pool = engine.pool
+    status: Dict[str, Any] = {"pool": type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        status.update(
+            size=pool.size(),
+            checked_in=pool.checkedin(),
+            overflow=max(pool.overflow(), 0),
+            max_overflow=pool._max_overflow,
+        )
+    metrics = getattr(pool, "metrics", None)
+    if metrics is not None:
+        status.update(metrics.snapshot())
+    return status
+
+
+def _unique_statement_name() -> str:
+    return f"__asyncpg_{uuid4()}__"
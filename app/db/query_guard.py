@@ -0,0 +1,136 @@
+import logging
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.routing import BaseRoute
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBudgetExceeded(Exception):
+    """
+    Raised in "raise" mode when a request runs more SQL statements than its
+    budget, or runs the same statement over and over with different
+    parameters (an N+1 query, typically a lazy load per row).
+    """
+
+
+class QueryLog:
+    """
+    Statements executed by one request (or one `track_queries` block).
+    """
+
+    __slots__ = ("name", "budget", "statements", "_parameters")
+
+    def __init__(self, name: str, budget: Optional[int] = None) -> None:
+        self.name = name
+        self.budget = budget
+        self.statements = 0
+        # Distinct parameter sets per statement text
+        self._parameters: Dict[str, Set[str]] = defaultdict(set)
+
+    def record(self, statement: str, parameters: Any) -> None:
+        self.statements += 1
+        self._parameters[statement].add(repr(parameters))
+
+    def repeated(self, threshold: int) -> Dict[str, int]:
+        """
+        Statements run with at least `threshold` different parameter sets.
+        """
+        return {
+            statement: len(parameters)
+            for statement, parameters in self._parameters.items()
+            if len(parameters) >= threshold
+        }
+
+    def violations(self, threshold: int) -> List[str]:
+        problems = []
+        if self.budget is not None and self.statements > self.budget:
+            problems.append(
+                f"{self.name} ran {self.statements} SQL statements, over its budget of {self.budget}"
+            )
+        for statement, count in self.repeated(threshold).items():
+            problems.append(
+                f"{self.name} ran the same statement with {count} different parameter sets "
+                f"(N+1 query?): {' '.join(statement.split())}"
+            )
+        return problems
+
+
+_log: ContextVar[Optional[QueryLog]] = ContextVar("query_log", default=None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    log = _log.get()
+    if log is not None and not executemany:
+        log.record(statement, parameters)
+
+
+def install(engine: Engine) -> None:
+    """
+    Count the statements `engine` executes into the current `QueryLog`.
+    Pass `async_engine.sync_engine` for an async engine.
+    """
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+
+
+def budget_for(route: str) -> Optional[int]:
+    return settings.SQL_QUERY_BUDGETS.get(route, settings.SQL_QUERY_BUDGET_DEFAULT)
+
+
+def check(log: QueryLog) -> None:
+    problems = log.violations(settings.SQL_N_PLUS_ONE_THRESHOLD)
+    if not problems:
+        return
+    if settings.SQL_GUARD_MODE == "raise":
+        raise QueryBudgetExceeded("; ".join(problems))
+    for problem in problems:
+        logger.warning(problem)
+
+
+@contextmanager
+def track_queries(name: str = "block", budget: Optional[int] = None) -> Iterator[QueryLog]:
+    """
+    Log the statements run inside the block and check them on exit, the way
+    each request is checked. For tests and benchmarks of code below the API.
+    """
+    log = QueryLog(name, budget)
+    token = _log.set(log)
+    try:
+        yield log
+    finally:
+        _log.reset(token)
+    check(log)
+
+
+class GuardedRoute:
+    """
+    ASGI wrapper around one route's app that checks the statements each
+    request runs against the route's budget once the response is sent.
+    """
+
+    def __init__(self, app: Any, path: str) -> None:
+        self.app = app
+        self.path = path
+
+    async def __call__(self, scope: Any, receive: Any, send: Any) -> None:
+        log = QueryLog(f"{scope['method']} {self.path}", budget_for(self.path))
+        token = _log.set(log)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _log.reset(token)
+        check(log)
+
+
+def guard_routes(routes: Iterable[BaseRoute]) -> None:
+    for route in routes:
+        if hasattr(route, "methods") and not isinstance(route.app, GuardedRoute):
+            route.app = GuardedRoute(route.app, route.path)
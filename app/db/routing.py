@@ -0,0 +1,119 @@
+import itertools
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.sql import Select
+from sqlalchemy.sql.dml import UpdateBase
+
+# Set in `Session.info` once a session has written, so its later reads see the write
+USE_PRIMARY = "use_primary"
+
+
+class ReplicaSet:
+    """
+    Read replicas of the primary database, picked round-robin or by fewest
+    connections in use. A replica whose connection fails is ejected for
+    `eject_seconds` and then tried again.
+    """
+
+    def __init__(
+        self,
+        engines: Sequence[Engine],
+        *,
+        strategy: str = "round_robin",
+        eject_seconds: float = 30,
+    ) -> None:
+        self.engines = list(engines)
+        self.strategy = strategy
+        self.eject_seconds = eject_seconds
+        self._lock = threading.Lock()
+        self._counter = itertools.count()
+        self._ejected_until: Dict[Engine, float] = {}
+        for engine in self.engines:
+            event.listen(engine, "handle_error", self._on_error)
+
+    def choose(self) -> Optional[Engine]:
+        """
+        A healthy replica, or None if every replica is ejected.
+        """
+        healthy = self.healthy()
+        if not healthy:
+            return None
+        with self._lock:
+            start = next(self._counter) % len(healthy)
+        if self.strategy == "least_connections":
+            # Rotate first so ties are broken round-robin too
+            return min(healthy[start:] + healthy[:start], key=_in_use)
+        return healthy[start]
+
+    def healthy(self) -> List[Engine]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                engine
+                for engine in self.engines
+                if self._ejected_until.get(engine, 0) <= now
+            ]
+
+    def eject(self, engine: Engine) -> None:
+        with self._lock:
+            self._ejected_until[engine] = time.monotonic() + self.eject_seconds
+
+    def status(self) -> List[Dict[str, Any]]:
+        now = time.monotonic()
+        with self._lock:
+            return [
+                {
+                    "url": engine.url.render_as_string(hide_password=True),
+                    "ejected_for_seconds": max(self._ejected_until.get(engine, 0) - now, 0),
+                }
+                for engine in self.engines
+            ]
+
+    def _on_error(self, context: Any) -> None:
+        # Lost connections and failures to connect at all; query errors don't count
+        if context.is_disconnect or context.connection is None:
+            self.eject(context.engine)
+
+
+class RoutingSession(Session):
+    """
+    Session that reads from a replica and writes to its bind, the primary.
+
+    The first write, flush or `SELECT ... FOR UPDATE` pins the session to
+    the primary for the rest of its life, so a request reads its own writes.
+    A session also keeps to the replica it first picked, so its reads agree
+    with each other.
+    """
+
+    def __init__(self, *args: Any, replicas: Optional[ReplicaSet] = None, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+        self._replica: Optional[Engine] = None
+
+    def get_bind(self, mapper: Any = None, clause: Any = None, **kwargs: Any) -> Any:
+        primary = super().get_bind(mapper, clause=clause, **kwargs)
+        if self.replicas is None or self.info.get(USE_PRIMARY):
+            return primary
+        if self._flushing or not _is_read(clause):
+            self.info[USE_PRIMARY] = True
+            return primary
+        if self._replica is None:
+            self._replica = self.replicas.choose()
+        return self._replica or primary
+
+
+def _is_read(clause: Any) -> bool:
+    if isinstance(clause, UpdateBase):
+        return False
+    # Anything else, e.g. text(), is assumed to write
+    return isinstance(clause, Select) and clause._for_update_arg is None
+
+
+def _in_use(engine: Engine) -> int:
+    metrics = getattr(engine.pool, "metrics", None)
+    return metrics.in_use if metrics is not None else engine.pool.checkedout()
@@ -1,7 +1,64 @@
 from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
 
 from app.core.config import settings
+from app.db import query_guard
+from app.db.pool import engine_options
+from app.db.routing import ReplicaSet, RoutingSession
 
-engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, pool_pre_ping=True)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+engine = create_engine(settings.SQLALCHEMY_DATABASE_URI, **engine_options())
+replica_engines = [
+    create_engine(uri, **engine_options()) for uri in settings.DB_REPLICA_URIS
+]
+replicas = None
+if replica_engines:
+    replicas = ReplicaSet(
+        replica_engines,
+        strategy=settings.DB_REPLICA_STRATEGY,
+        eject_seconds=settings.DB_REPLICA_EJECT_SECONDS,
+    )
+if settings.SQL_GUARD_MODE != "off":
+    for guarded in (engine, *replica_engines):
+        query_guard.install(guarded)
+# Objects stay loaded after commit; CRUD writes get generated values from
+# RETURNING instead of reloading rows
+SessionLocal = sessionmaker(
+    class_=RoutingSession,
+    autocommit=False,
+    autoflush=False,
+    expire_on_commit=False,
+    bind=engine,
+    replicas=replicas,
+)
+
+# Only built in async mode, so sync deployments don't need asyncpg installed
+async_engine = None
+async_replicas = None
+AsyncSessionLocal = None
+if settings.DB_ASYNC_MODE:
+    async_engine = create_async_engine(
+        settings.SQLALCHEMY_ASYNC_DATABASE_URI, **engine_options(asyncio=True)
+    )
+    async_replica_engines = [
+        create_async_engine(
+            "postgresql+asyncpg://" + uri.split("://", 1)[1], **engine_options(asyncio=True)
+        )
+        for uri in settings.DB_REPLICA_URIS
+    ]
+    if async_replica_engines:
+        async_replicas = ReplicaSet(
+            [replica.sync_engine for replica in async_replica_engines],
+            strategy=settings.DB_REPLICA_STRATEGY,
+            eject_seconds=settings.DB_REPLICA_EJECT_SECONDS,
+        )
+    if settings.SQL_GUARD_MODE != "off":
+        for guarded in (async_engine, *async_replica_engines):
+            query_guard.install(guarded.sync_engine)
+    AsyncSessionLocal = async_sessionmaker(
+        bind=async_engine,
+        sync_session_class=RoutingSession,
+        replicas=async_replicas,
+        autoflush=False,
+        expire_on_commit=False,
+    )
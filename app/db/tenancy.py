@@ -0,0 +1,81 @@
+from typing import Any, Optional
+
+from sqlalchemy import Column, ForeignKey, Integer, event
+from sqlalchemy.orm import Mapped, ORMExecuteState, Session, declared_attr, with_loader_criteria
+
+# Set in `Session.info` to the tenant the session is scoped to
+TENANT_ID = "tenant_id"
+# Rows created outside a tenant-scoped session belong to this tenant
+DEFAULT_TENANT_ID = 1
+# Execution option for statements that must see every tenant's rows even in a
+# scoped session, e.g. checks against constraints that span tenants
+ALL_TENANTS = "include_all_tenants"
+
+
+class TenantScoped:
+    """
+    Adds `tenant_id` to a model. In a session scoped to a tenant, ORM
+    selects, updates and deletes of these models only see that tenant's rows,
+    and new rows are created in it; unscoped sessions see every tenant.
+    """
+
+    @declared_attr
+    def tenant_id(cls) -> Mapped[int]:
+        return Column(
+            Integer,
+            ForeignKey("tenant.id"),
+            nullable=False,
+            server_default=str(DEFAULT_TENANT_ID),
+        )
+
+
+def set_tenant(db: Any, tenant_id: Optional[int]) -> None:
+    """
+    Scope `db`, a sync or async session, to `tenant_id`; None unscopes it.
+    """
+    if tenant_id is None:
+        db.info.pop(TENANT_ID, None)
+    else:
+        db.info[TENANT_ID] = tenant_id
+
+
+def get_tenant(db: Any) -> Optional[int]:
+    return db.info.get(TENANT_ID)
+
+
+def is_visible(db: Any, model: Any, tenant_id: Optional[int]) -> bool:
+    """
+    Whether a `model` row of `tenant_id` is visible in `db`, for rows that
+    don't come from a query, such as rows read from the cache.
+    """
+    scoped_to = get_tenant(db)
+    return scoped_to is None or not issubclass(model, TenantScoped) or tenant_id == scoped_to
+
+
+@event.listens_for(Session, "do_orm_execute")
+def _scope_to_tenant(state: ORMExecuteState) -> None:
+    tenant_id = state.session.info.get(TENANT_ID)
+    if tenant_id is None or state.execution_options.get(ALL_TENANTS):
+        return
+    # Relationship and deferred column loads inherit the criteria of the query
+    # that loaded their parent
+    if state.is_column_load or state.is_relationship_load:
+        return
+    if state.is_select or state.is_update or state.is_delete:
+        state.statement = state.statement.options(
+            with_loader_criteria(
+                TenantScoped,
+                lambda cls: cls.tenant_id == tenant_id,
+                include_aliases=True,
+            )
+        )
+
+
+@event.listens_for(Session, "before_flush")
+def _assign_tenant(session: Session, flush_context: Any, instances: Any) -> None:
+    tenant_id = session.info.get(TENANT_ID)
+    if tenant_id is None:
+        return
+    for obj in session.new:
+        if isinstance(obj, TenantScoped) and obj.tenant_id is None:
+            obj.tenant_id = tenant_id
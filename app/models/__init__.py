@@ -1,2 +1,4 @@
 from .item import Item
+from .revoked_token import RevokedToken
+from .tenant import Tenant
 from .user import User
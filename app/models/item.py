@@ -1,17 +1,64 @@
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Column, ForeignKey, Integer, String
-from sqlalchemy.orm import relationship
+from sqlalchemy import (
+    Column,
+    Computed,
+    ForeignKey,
+    Index,
+    Integer,
+    PrimaryKeyConstraint,
+    String,
+)
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 
 from app.db.base_class import Base
+from app.db.tenancy import TenantScoped
 
 if TYPE_CHECKING:
     from .user import User  # noqa: F401
 
 
-class Item(Base):
-    id = Column(Integer, primary_key=True, index=True)
+class Item(TenantScoped, Base):
+    """
+    On PostgreSQL the table is hash-partitioned by `tenant_id` by the
+    `tenant_partitions` migration, with `(tenant_id, id)` as its primary key:
+    queries scoped to a tenant only touch its partition, and that key serves
+    a tenant's listings ordered by id.
+    """
+
+    # Still generated from its own sequence, so ids stay unique across tenants
+    id = Column(Integer, autoincrement=True, index=True)
     title = Column(String, index=True)
-    description = Column(String, index=True)
+    description = Column(String)
     owner_id = Column(Integer, ForeignKey("user.id"))
+    # Maintained by Postgres; deferred so regular loads don't fetch it
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed(
+                "to_tsvector('simple', coalesce(title, '') || ' ' || coalesce(description, ''))",
+                persisted=True,
+            ),
+        )
+    )
+    # Bumped by every ORM update (and checked by it, so concurrent updates of
+    # the same version conflict); serves as the ETag of the row
+    version_id = Column(Integer, nullable=False, server_default="1")
     owner = relationship("User", back_populates="items")
+
+    __mapper_args__ = {"version_id_col": version_id}
+    __table_args__ = (
+        PrimaryKeyConstraint("tenant_id", "id", name="item_pkey"),
+        # Serves owner listings, including keyset pages ordered by id, as one range scan
+        Index("ix_item_owner_id_id", "owner_id", "id"),
+        Index("ix_item_search_vector", "search_vector", postgresql_using="gin").ddl_if(
+            dialect="postgresql"
+        ),
+        Index(
+            "ix_item_title_trgm",
+            "title",
+            postgresql_using="gin",
+            postgresql_ops={"title": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String
+
+from app.db.base_class import Base
+
+
+class RevokedToken(Base):
+    """
+    A revoked token, by `jti`, or with no `jti` every token of `user_id`
+    issued before `revoked_at`. Rows are only needed until `expires_at`, when
+    the tokens they cover have expired anyway.
+    """
+
+    id = Column(Integer, primary_key=True)
+    jti = Column(String(32), unique=True)
+    user_id = Column(Integer, ForeignKey("user.id", ondelete="CASCADE"), index=True)
+    revoked_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
@@ -0,0 +1,13 @@
+from sqlalchemy import Column, Integer, String
+
+from app.db.base_class import Base
+
+
+class Tenant(Base):
+    """
+    A school hosted on the deployment. Users and items belong to one tenant,
+    the default tenant unless they were created in a tenant-scoped session.
+    """
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True, nullable=False)
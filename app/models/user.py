@@ -1,19 +1,54 @@
 from typing import TYPE_CHECKING
 
-from sqlalchemy import Boolean, Column, Integer, String
-from sqlalchemy.orm import relationship
+from sqlalchemy import Boolean, Column, Computed, Index, Integer, String
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.orm import deferred, relationship
 
 from app.db.base_class import Base
+from app.db.tenancy import TenantScoped
 
 if TYPE_CHECKING:
     from .item import Item  # noqa: F401
 
 
-class User(Base):
+class User(TenantScoped, Base):
     id = Column(Integer, primary_key=True, index=True)
     full_name = Column(String, index=True)
     email = Column(String, unique=True, index=True, nullable=False)
     hashed_password = Column(String, nullable=False)
     is_active = Column(Boolean(), default=True)
     is_superuser = Column(Boolean(), default=False)
+    # Maintained by Postgres; deferred so regular loads don't fetch it
+    search_vector = deferred(
+        Column(
+            TSVECTOR,
+            Computed(
+                "to_tsvector('simple', coalesce(full_name, '') || ' ' || email)",
+                persisted=True,
+            ),
+        )
+    )
+    # Bumped by every ORM update (and checked by it, so concurrent updates of
+    # the same version conflict); serves as the ETag of the row
+    version_id = Column(Integer, nullable=False, server_default="1")
     items = relationship("Item", back_populates="owner")
+
+    __mapper_args__ = {"version_id_col": version_id}
+    __table_args__ = (
+        Index("ix_user_tenant_id", "tenant_id"),
+        Index("ix_user_search_vector", "search_vector", postgresql_using="gin").ddl_if(
+            dialect="postgresql"
+        ),
+        Index(
+            "ix_user_full_name_trgm",
+            "full_name",
+            postgresql_using="gin",
+            postgresql_ops={"full_name": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_user_email_trgm",
+            "email",
+            postgresql_using="gin",
+            postgresql_ops={"email": "gin_trgm_ops"},
+        ).ddl_if(dialect="postgresql"),
+    )
@@ -1,4 +1,4 @@
 from .item import Item, ItemCreate, ItemInDB, ItemUpdate
 from .msg import Msg
-from .token import Token, TokenPayload
-from .user import User, UserCreate, UserInDB, UserUpdate, UserLogin
+from .token import Token, TokenPayload, TokenRefresh
+from .user import User, UserCreate, UserInDB, UserLogin, UserSnapshot, UserUpdate
@@ -39,6 +39,13 @@ class User(UserInDBBase):
     pass
 
 
+# Cached with access tokens; carries the row version for ETags, and the
+# tenant the request's session is scoped to
+class UserSnapshot(User):
+    version_id: int
+    tenant_id: int
+
+
 # Additional properties stored in DB
 class UserInDB(UserInDBBase):
     hashed_password: str
@@ -1,47 +1,72 @@
 import logging
 from datetime import datetime, timedelta
-from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Sequence
 
-import emails
-from emails.template import JinjaTemplate
 from jose import jwt
 
 from app.core.config import settings
+from app.core.keys import keyring
+from app.core.mail import EmailBatchJob, EmailJob, Recipient, mailer
+
+PASSWORD_RESET_TOKEN_TYPE = "password_reset"
 
 
 def send_email(
     email_to: str,
-    subject_template: str = "",
-    html_template: str = "",
+    subject: str = "",
+    template: str = "",
     environment: Dict[str, Any] = {},
 ) -> None:
+    """
+    Queue an email rendered from `template` in EMAIL_TEMPLATES_DIR; it is
+    sent in the background, so this returns without touching SMTP.
+    """
+    assert settings.EMAILS_ENABLED, "no provided configuration for email variables"
+    queued = mailer.enqueue(EmailJob(email_to, subject, template, environment))
+    logging.info(f"queue email result: {queued}")
+
+
+def send_batch_email(
+    recipients: Sequence[Recipient], subject: str = "", template: str = ""
+) -> None:
+    """
+    Queue one email per `(email_to, environment)` recipient, rendered from
+    the same template and sent together over one SMTP session.
+    """
     assert settings.EMAILS_ENABLED, "no provided configuration for email variables"
-    message = emails.Message(
-        subject=JinjaTemplate(subject_template),
-        html=JinjaTemplate(html_template),
-        mail_from=(settings.EMAILS_FROM_NAME, settings.EMAILS_FROM_EMAIL),
+    queued = mailer.enqueue(EmailBatchJob(subject, template, recipients))
+    logging.info(f"queue batch email result: {queued}")
+
+
+def send_notification_emails(emails_to: Sequence[str], title: str, body: str) -> None:
+    project_name = settings.PROJECT_NAME
+    subject = f"{project_name} - {title}"
+    send_batch_email(
+        [
+            (
+                email_to,
+                {
+                    "project_name": project_name,
+                    "email": email_to,
+                    "title": title,
+                    "body": body,
+                    "link": settings.SERVER_HOST,
+                },
+            )
+            for email_to in emails_to
+        ],
+        subject=subject,
+        template="notification.html",
     )
-    smtp_options = {"host": settings.SMTP_HOST, "port": settings.SMTP_PORT}
-    if settings.SMTP_TLS:
-        smtp_options["tls"] = True
-    if settings.SMTP_USER:
-        smtp_options["user"] = settings.SMTP_USER
-    if settings.SMTP_PASSWORD:
-        smtp_options["password"] = settings.SMTP_PASSWORD
-    response = message.send(to=email_to, render=environment, smtp=smtp_options)
-    logging.info(f"send email result: {response}")
 
 
 def send_test_email(email_to: str) -> None:
     project_name = settings.PROJECT_NAME
     subject = f"{project_name} - Test email"
-    with open(Path(settings.EMAIL_TEMPLATES_DIR) / "test_email.html") as f:
-        template_str = f.read()
     send_email(
         email_to=email_to,
-        subject_template=subject,
-        html_template=template_str,
+        subject=subject,
+        template="test_email.html",
         environment={"project_name": settings.PROJECT_NAME, "email": email_to},
     )
 
@@ -49,14 +74,12 @@ def send_test_email(email_to: str) -> None:
 def send_reset_password_email(email_to: str, email: str, token: str) -> None:
     project_name = settings.PROJECT_NAME
     subject = f"{project_name} - Password recovery for user {email}"
-    with open(Path(settings.EMAIL_TEMPLATES_DIR) / "reset_password.html") as f:
-        template_str = f.read()
     server_host = settings.SERVER_HOST
     link = f"{server_host}/reset-password?token={token}"
     send_email(
         email_to=email_to,
-        subject_template=subject,
-        html_template=template_str,
+        subject=subject,
+        template="reset_password.html",
         environment={
             "project_name": settings.PROJECT_NAME,
             "username": email,
@@ -70,13 +93,11 @@ def send_reset_password_email(email_to: str, email: str, token: str) -> None:
 def send_new_account_email(email_to: str, username: str, password: str) -> None:
     project_name = settings.PROJECT_NAME
     subject = f"{project_name} - New account for user {username}"
-    with open(Path(settings.EMAIL_TEMPLATES_DIR) / "new_account.html") as f:
-        template_str = f.read()
     link = settings.SERVER_HOST
     send_email(
         email_to=email_to,
-        subject_template=subject,
-        html_template=template_str,
+        subject=subject,
+        template="new_account.html",
         environment={
             "project_name": settings.PROJECT_NAME,
             "username": username,
@@ -92,15 +113,16 @@ def generate_password_reset_token(email: str) -> str:
     now = datetime.utcnow()
     expires = now + delta
     exp = expires.timestamp()
-    encoded_jwt = jwt.encode(
-        {"exp": exp, "nbf": now, "sub": email}, settings.SECRET_KEY, algorithm="HS256",
-    )
-    return encoded_jwt
+    # Typed, so the bearer check doesn't take it for an access token
+    return keyring.sign({"exp": exp, "nbf": now, "sub": email, "type": PASSWORD_RESET_TOKEN_TYPE})
 
 
 def verify_password_reset_token(token: str) -> Optional[str]:
     try:
-        decoded_token = jwt.decode(token, settings.SECRET_KEY, algorithms=["HS256"])
-        return decoded_token["email"]
+        claims = keyring.decode(token)
     except jwt.JWTError:
-        return None
\ No newline at end of file
+        return None
+    # Access tokens are signed by the same keys; only a reset token resets
+    if claims.get("type") != PASSWORD_RESET_TOKEN_TYPE:
+        return None
+    return claims.get("sub")
\ No newline at end of file
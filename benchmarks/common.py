@@ -0,0 +1,88 @@
+"""
+Shared helpers for the benchmark scripts.
+
+Benchmarks run against the database in `BENCH_DATABASE_URL` (a throwaway
+Postgres database is what production numbers should be taken from); it
+defaults to a local SQLite file so the scripts work without any setup. The
+schema and seed rows come from `tests.support`, as they do for the tests.
+"""
+import json
+import os
+import platform
+import statistics
+import subprocess
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Sequence
+
+from sqlalchemy.engine import Engine
+
+from tests import support
+from tests.support import (  # noqa: F401
+    SEED_PASSWORD,
+    SEED_PASSWORD_HASH,
+    SEED_SUPERUSER_EMAIL,
+    get_session,
+    seed_items,
+    seed_superuser,
+    seed_users,
+)
+
+BENCH_DATABASE_URL = os.getenv("BENCH_DATABASE_URL", "sqlite:///bench.db")
+
+
+def get_engine(url: str = BENCH_DATABASE_URL) -> Engine:
+    return support.get_engine(url)
+
+
+def summarize(samples: Sequence[float]) -> Dict[str, float]:
+    """
+    Percentiles of latency samples, in the unit they are given in.
+    """
+    ordered = sorted(samples)
+
+    def percentile(p: float) -> float:
+        return ordered[max(int(len(ordered) * p) - 1, 0)]
+
+    return {
+        "p50": statistics.median(ordered),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+        "max": ordered[-1],
+    }
+
+
+def timeit(fn: Callable[[], object], repeat: int = 20) -> Dict[str, float]:
+    """
+    Run `fn` `repeat` times and return latency percentiles in milliseconds.
+    """
+    samples: List[float] = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+
+def write_results(path: str, benchmark: str, results: Dict[str, Dict[str, Any]], **params: Any) -> None:
+    """
+    Save `results` ({case: metrics}) as JSON along with what they were measured
+    on, in the format `benchmarks.compare` reads.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    document = {
+        "benchmark": benchmark,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "database": BENCH_DATABASE_URL.split("://", 1)[0],
+        "params": params,
+        "results": results,
+    }
+    with open(path, "w") as f:
+        json.dump(document, f, indent=2)
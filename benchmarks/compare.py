@@ -0,0 +1,67 @@
+"""
+Regression gate between two benchmark result files.
+
+    python -m benchmarks.compare BASELINE.json CURRENT.json [--tolerance 0.1]
+
+Compares every case both files have, as written by `benchmarks.load` or
+`benchmarks.micro`: throughput (`rps`, `ops`) may not drop, and p95/p99
+latency and allocations (`alloc_bytes`) may not grow, by more than
+`--tolerance` (a fraction). Prints the changes and exits with status 1 if
+any metric regressed.
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List
+
+# Metric -> whether a higher value is better
+METRICS = {
+    "rps": True,
+    "ops": True,
+    "p95_ms": False,
+    "p99_ms": False,
+    "p95_us": False,
+    "p99_us": False,
+    "alloc_bytes": False,
+}
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def regressions(baseline: Dict[str, Any], current: Dict[str, Any], tolerance: float) -> List[str]:
+    if baseline["benchmark"] != current["benchmark"]:
+        raise SystemExit(
+            f"Can't compare {baseline['benchmark']} results with {current['benchmark']} results"
+        )
+    found = []
+    for case, before in baseline["results"].items():
+        after = current["results"].get(case)
+        if after is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            if metric not in before or metric not in after or not before[metric]:
+                continue
+            change = after[metric] / before[metric] - 1
+            regressed = -change > tolerance if higher_is_better else change > tolerance
+            line = f"{case:>20} {metric:>7}: {before[metric]:12.2f} -> {after[metric]:12.2f} ({change:+.1%})"
+            print(line + ("  REGRESSION" if regressed else ""))
+            if regressed:
+                found.append(line)
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--tolerance", type=float, default=0.1)
+    args = parser.parse_args()
+    if regressions(load(args.baseline), load(args.current), args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
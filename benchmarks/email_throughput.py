@@ -0,0 +1,83 @@
+"""
+Email render and send throughput.
+
+    python -m benchmarks.email_throughput [recipients]
+
+Rendering compares the old path (read the template file and compile it for
+every email), the template registry one email at a time, and the registry
+rendering a whole batch. Sending compares a new SMTP session per email with
+one reused session for the batch, against a local aiosmtpd server (needs the
+`aiosmtpd` package) unless BENCH_SMTP_HOST and BENCH_SMTP_PORT point
+elsewhere.
+"""
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+from jinja2 import Environment, select_autoescape
+
+from app.core.config import settings
+from app.core.mail import SMTPConnection, build_message, templates
+
+TEMPLATE = "notification.html"
+
+
+def per_second(fn: Callable[[], object], n: int) -> float:
+    start = time.perf_counter()
+    fn()
+    return n / (time.perf_counter() - start)
+
+
+def environments(n: int) -> List[Dict[str, str]]:
+    return [
+        {"project_name": "learnit", "email": f"user{i}@example.com", "title": "News", "body": "Hello"}
+        for i in range(n)
+    ]
+
+
+def render_uncached(envs: List[Dict[str, str]]) -> None:
+    environment = Environment(autoescape=select_autoescape(["html"]))
+    for env in envs:
+        source = (Path(settings.EMAIL_TEMPLATES_DIR) / TEMPLATE).read_text()
+        environment.from_string(source).render(**env)
+
+
+def send(host: str, port: int, bodies: List[str], *, reuse: bool) -> None:
+    connection = SMTPConnection(host, port)
+    for i, html in enumerate(bodies):
+        connection.send(build_message(f"user{i}@example.com", "News", html))
+        if not reuse:
+            connection.close()
+    connection.close()
+
+
+def main(recipients: int = 1_000) -> None:
+    envs = environments(recipients)
+    templates.load_all()
+    print(f"render, compile every time: {per_second(lambda: render_uncached(envs), recipients):,.0f}/s")
+    print(f"render, registry:           {per_second(lambda: [templates.render(TEMPLATE, e) for e in envs], recipients):,.0f}/s")
+    print(f"render, registry batch:     {per_second(lambda: templates.render_batch(TEMPLATE, envs), recipients):,.0f}/s")
+
+    bodies = templates.render_batch(TEMPLATE, envs)
+    controller = None
+    host = os.getenv("BENCH_SMTP_HOST")
+    port = int(os.getenv("BENCH_SMTP_PORT", "0"))
+    if not host:
+        from aiosmtpd.controller import Controller
+        from aiosmtpd.handlers import Sink
+
+        controller = Controller(Sink(), hostname="127.0.0.1", port=8025)
+        controller.start()
+        host, port = controller.hostname, controller.port
+    try:
+        print(f"send, session per email:    {per_second(lambda: send(host, port, bodies, reuse=False), recipients):,.0f}/s")
+        print(f"send, one session:          {per_second(lambda: send(host, port, bodies, reuse=True), recipients):,.0f}/s")
+    finally:
+        if controller is not None:
+            controller.stop()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,85 @@
+"""
+Access token sign and verify throughput per algorithm.
+
+    python -m benchmarks.jwt_signing [seconds]
+
+`HS256 (per call)` is the path before the key ring: python-jose parses the
+secret into a key on every call. The other cases sign and verify with key
+objects parsed once, through `KeyRing`, the way the app does now. Keys are
+generated for the run, so no key files are needed.
+"""
+import sys
+import time
+from typing import Callable, Dict
+
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from jose import jwk, jwt
+
+from app.core.keys import JWTKey, KeyRing, load_key
+
+SECRET = "benchmark-secret"
+CLAIMS = {
+    "exp": 4102444800,
+    "iat": 1700000000.0,
+    "jti": "0" * 32,
+    "type": "access",
+    "sub": "1",
+    "email": "user@example.com",
+}
+
+
+def _pem(private_key) -> bytes:
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+
+
+def keyrings() -> Dict[str, KeyRing]:
+    hmac = jwk.construct(SECRET, "HS256")
+    es256 = load_key(_pem(ec.generate_private_key(ec.SECP256R1())), "ES256", signing=True)
+    eddsa = load_key(_pem(ed25519.Ed25519PrivateKey.generate()), "EdDSA", signing=True)
+    return {
+        "HS256 (cached key)": KeyRing([JWTKey(None, "HS256", hmac, hmac)], None),
+        "ES256": KeyRing([es256], es256.kid),
+        "EdDSA": KeyRing([eddsa], eddsa.kid),
+    }
+
+
+def throughput(fn: Callable[[], object], seconds: float) -> float:
+    calls = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        fn()
+        calls += 1
+    return calls / (time.perf_counter() - start)
+
+
+def main(seconds: float = 1.0) -> None:
+    token = jwt.encode(CLAIMS, SECRET, algorithm="HS256")
+    cases = {
+        "HS256 (per call)": (
+            lambda: jwt.encode(CLAIMS, SECRET, algorithm="HS256"),
+            lambda: jwt.decode(token, SECRET, algorithms=["HS256"]),
+        )
+    }
+    for name, ring in keyrings().items():
+        signed = ring.sign(CLAIMS)
+        assert ring.decode(signed) == CLAIMS, f"{name} round trip differs"
+        cases[name] = (
+            lambda ring=ring: ring.sign(CLAIMS),
+            lambda ring=ring, signed=signed: ring.decode(signed),
+        )
+
+    print(f"{'algorithm':>20} {'sign/s':>10} {'verify/s':>10} {'token bytes':>12}")
+    for name, (sign, verify) in cases.items():
+        print(
+            f"{name:>20} {throughput(sign, seconds):>10,.0f} "
+            f"{throughput(verify, seconds):>10,.0f} {len(sign()):>12}"
+        )
+
+
+if __name__ == "__main__":
+    main(*(float(arg) for arg in sys.argv[1:]))
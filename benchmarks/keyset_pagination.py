@@ -0,0 +1,39 @@
+"""
+Offset vs keyset paging latency at increasing depth.
+
+    python -m benchmarks.keyset_pagination [rows]
+
+Offset latency grows with the page depth; keyset latency should stay flat.
+"""
+import sys
+
+from app import crud
+from app.models import User
+from benchmarks.common import get_engine, get_session, seed_users, timeit
+
+PAGE_SIZE = 100
+
+
+def main(rows: int = 1_000_000) -> None:
+    engine = get_engine()
+    db = get_session(engine)
+    seed_users(db, rows)
+
+    print(f"{'depth':>10} {'offset p50 ms':>14} {'keyset p50 ms':>14}")
+    depth = PAGE_SIZE
+    while depth < rows:
+        # Build the cursor for `depth` the way a client walking the pages would hold it
+        last = db.query(User).order_by(User.id).offset(depth - 1).first()
+        cursor = crud.user.next_cursor([last], limit=1)
+        offset = timeit(lambda: crud.user.get_multi(db, skip=depth, limit=PAGE_SIZE))
+        keyset = timeit(
+            lambda: crud.user.get_multi_keyset(db, cursor=cursor, limit=PAGE_SIZE)
+        )
+        db.expunge_all()
+        print(f"{depth:>10} {offset['p50']:>14.2f} {keyset['p50']:>14.2f}")
+        depth *= 10
+    db.close()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,197 @@
+"""
+API load test: latency percentiles and throughput per endpoint at a fixed
+concurrency.
+
+    python -m benchmarks.load [--users N] [--items N] [--concurrency C]
+                              [--requests R] [--url URL] [--out FILE]
+
+Seeds `--users` users (plus a superuser) and `--items` items into
+`BENCH_DATABASE_URL`, then sends `--requests` requests per scenario from
+`--concurrency` concurrent clients:
+
+* `login`: `POST /auth/login/access-token` as the seeded users in turn
+* `read_user_me`: `GET /users/me`
+* `read_users`: `GET /users/`, following `X-Next-Cursor` through the pages
+* `create_user`: `POST /users/` with a new email each time
+
+By default requests go to the app in-process through httpx's ASGI transport,
+with rate limiting off and sessions bound to the benchmark database. With
+`--url` they go to a running server instead, e.g.
+
+    uvicorn main:app --workers 4
+
+which must use the same database and have `RATE_LIMIT_ENABLED=false`.
+Results are written to `--out` (`load.json`) for `benchmarks.compare`.
+"""
+import argparse
+import asyncio
+import itertools
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+
+from app.core.config import settings
+from benchmarks.common import (
+    SEED_PASSWORD,
+    SEED_SUPERUSER_EMAIL,
+    get_engine,
+    get_session,
+    seed_items,
+    seed_superuser,
+    seed_users,
+    summarize,
+    write_results,
+)
+
+API = settings.API_V1_STR
+PAGE_SIZE = 100
+
+Request = Callable[[httpx.AsyncClient], Awaitable[httpx.Response]]
+
+
+def in_process_client(engine) -> httpx.AsyncClient:
+    import main
+    from app.api import deps
+
+    def get_db():
+        db = get_session(engine)
+        try:
+            yield db
+        finally:
+            db.close()
+
+    settings.RATE_LIMIT_ENABLED = False
+    main.app.dependency_overrides[deps.get_db] = get_db
+    return httpx.AsyncClient(
+        transport=httpx.ASGITransport(app=main.app), base_url="http://bench"
+    )
+
+
+async def login(client: httpx.AsyncClient, email: str) -> Dict[str, str]:
+    response = await client.post(
+        f"{API}/auth/login/access-token",
+        json={"username": email, "password": SEED_PASSWORD},
+    )
+    response.raise_for_status()
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def scenarios(headers: Dict[str, str], users: int) -> Dict[str, Request]:
+    emails = itertools.cycle(f"user{i}@example.com" for i in range(users))
+    new_emails = (f"load-{time.time_ns()}-{i}@example.com" for i in itertools.count())
+    cursor: Dict[str, Optional[str]] = {"next": None}
+
+    def login_user(client: httpx.AsyncClient) -> Awaitable[httpx.Response]:
+        return client.post(
+            f"{API}/auth/login/access-token",
+            json={"username": next(emails), "password": SEED_PASSWORD},
+        )
+
+    def read_user_me(client: httpx.AsyncClient) -> Awaitable[httpx.Response]:
+        return client.get(f"{API}/users/me", headers=headers)
+
+    async def read_users(client: httpx.AsyncClient) -> httpx.Response:
+        params: Dict[str, Any] = {"limit": PAGE_SIZE}
+        if cursor["next"]:
+            params["cursor"] = cursor["next"]
+        response = await client.get(f"{API}/users/", headers=headers, params=params)
+        # Concurrent clients share one walk through the pages, back to the
+        # first page after the last
+        cursor["next"] = response.headers.get("X-Next-Cursor")
+        return response
+
+    def create_user(client: httpx.AsyncClient) -> Awaitable[httpx.Response]:
+        return client.post(
+            f"{API}/users/",
+            headers=headers,
+            json={"email": next(new_emails), "password": SEED_PASSWORD},
+        )
+
+    return {
+        "login": login_user,
+        "read_user_me": read_user_me,
+        "read_users": read_users,
+        "create_user": create_user,
+    }
+
+
+async def run(
+    client: httpx.AsyncClient, request: Request, *, requests: int, concurrency: int
+) -> Dict[str, Any]:
+    """
+    Send `requests` requests from `concurrency` workers, each sending its
+    next request as soon as its previous one completes.
+    """
+    remaining = iter(range(requests))
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker() -> None:
+        nonlocal errors
+        for _ in remaining:
+            start = time.perf_counter()
+            response = await request(client)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        "requests": requests,
+        "errors": errors,
+        "rps": requests / elapsed,
+        **{f"{name}_ms": value for name, value in summarize(latencies).items()},
+    }
+
+
+async def main(args: argparse.Namespace) -> None:
+    engine = get_engine()
+    db = get_session(engine)
+    seed_users(db, args.users)
+    seed_superuser(db)
+    seed_items(db, args.items, owners=args.users)
+    db.close()
+
+    if args.url:
+        client = httpx.AsyncClient(base_url=args.url, timeout=60)
+    else:
+        client = in_process_client(engine)
+    async with client:
+        headers = await login(client, SEED_SUPERUSER_EMAIL)
+        results = {}
+        for name, request in scenarios(headers, args.users).items():
+            # Warm up connections, caches and the hashing pool before measuring
+            await run(client, request, requests=args.concurrency, concurrency=args.concurrency)
+            results[name] = await run(
+                client, request, requests=args.requests, concurrency=args.concurrency
+            )
+            result = results[name]
+            print(
+                f"{name:>14}: {result['rps']:>8,.0f} req/s  p50 {result['p50_ms']:7.2f} ms  "
+                f"p95 {result['p95_ms']:7.2f} ms  p99 {result['p99_ms']:7.2f} ms  "
+                f"errors {result['errors']}"
+            )
+    write_results(
+        args.out,
+        "load",
+        results,
+        target=args.url or "in-process",
+        users=args.users,
+        items=args.items,
+        concurrency=args.concurrency,
+        requests=args.requests,
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--items", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--url", help="Base URL of a running server instead of in-process")
+    parser.add_argument("--out", default="load.json")
+    asyncio.run(main(parser.parse_args()))
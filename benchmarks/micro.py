@@ -0,0 +1,77 @@
+"""
+Micro-benchmarks of the per-request hot paths.
+
+    python -m benchmarks.micro [--rows N] [--seconds S] [--out FILE]
+
+* `decode_access_token`: verifying a signed access token
+* `get_multi`: `CRUDBase.get_multi` for a page of `--rows` users
+* `serialize_default` / `serialize_fast`: a page of `--rows` users through
+  `response_model` validation and `jsonable_encoder`, and through the
+  orjson serializer
+
+Each case runs for `--seconds`; results (calls per second and per-call
+latency percentiles in microseconds) are written to `--out` (`micro.json`)
+for `benchmarks.compare`.
+"""
+import argparse
+import time
+from typing import Any, Callable, Dict, List
+
+from app import crud
+from app.core import security
+from benchmarks.common import get_engine, get_session, seed_users, summarize, write_results
+from benchmarks.serialization import default_path, fast_path
+
+
+def measure(fn: Callable[[], Any], seconds: float) -> Dict[str, float]:
+    samples: List[float] = []
+    deadline = time.perf_counter() + seconds
+    while True:
+        start = time.perf_counter()
+        fn()
+        end = time.perf_counter()
+        samples.append((end - start) * 1_000_000)
+        if end > deadline:
+            break
+    return {
+        "ops": len(samples) / (sum(samples) / 1_000_000),
+        **{f"{name}_us": value for name, value in summarize(samples).items()},
+    }
+
+
+def main(args: argparse.Namespace) -> None:
+    engine = get_engine()
+    db = get_session(engine)
+    seed_users(db, args.rows)
+
+    token = security.create_access_token(1, "user0@example.com")
+    users = crud.user.get_multi(db, limit=args.rows)
+
+    def get_multi() -> None:
+        crud.user.get_multi(db, limit=args.rows)
+        # Load fresh rows each call instead of refreshing the identity map
+        db.expunge_all()
+
+    cases = {
+        "decode_access_token": lambda: security.decode_access_token(token),
+        "get_multi": get_multi,
+        "serialize_default": lambda: default_path(users),
+        "serialize_fast": lambda: fast_path(users),
+    }
+    results = {}
+    for name, fn in cases.items():
+        results[name] = result = measure(fn, args.seconds)
+        print(
+            f"{name:>20}: {result['ops']:>10,.0f} ops/s  p50 {result['p50_us']:9.1f} us  "
+            f"p99 {result['p99_us']:9.1f} us"
+        )
+    db.close()
+    write_results(args.out, "micro", results, rows=args.rows, seconds=args.seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--rows", type=int, default=100)
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--out", default="micro.json")
+    main(parser.parse_args())
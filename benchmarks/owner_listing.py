@@ -0,0 +1,50 @@
+"""
+Query plan and latency of an owner-scoped item listing.
+
+    python -m benchmarks.owner_listing [items] [owners]
+
+Prints the plan of a keyset page of one owner's items; with the
+`ix_item_owner_id_id` index it should be an index range scan, not a
+sequential scan of `item`.
+"""
+import sys
+
+from sqlalchemy import text
+
+from app import crud
+from app.models import Item
+from benchmarks.common import get_engine, get_session, seed_items, seed_users, timeit
+
+PAGE_SIZE = 100
+
+
+def main(items: int = 1_000_000, owners: int = 1_000) -> None:
+    engine = get_engine()
+    db = get_session(engine)
+    seed_users(db, owners)
+    seed_items(db, items, owners)
+
+    owner_id = owners // 2
+    query = crud.item.keyset_query(
+        db.query(Item).filter(Item.owner_id == owner_id), cursor=None
+    ).limit(PAGE_SIZE)
+    sql = str(
+        query.statement.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True})
+    )
+    if engine.dialect.name == "postgresql":
+        db.execute(text("ANALYZE item"))
+        explain = f"EXPLAIN (ANALYZE, BUFFERS) {sql}"
+    else:
+        explain = f"EXPLAIN QUERY PLAN {sql}"
+    for row in db.execute(text(explain)):
+        print(row[-1])
+
+    first = timeit(lambda: crud.item.get_multi_by_owner_keyset(
+        db, owner_id=owner_id, limit=PAGE_SIZE
+    ))
+    print(f"first page of owner {owner_id}: p50 {first['p50']:.2f} ms, p95 {first['p95']:.2f} ms")
+    db.close()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
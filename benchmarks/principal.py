@@ -0,0 +1,104 @@
+"""
+Cost of resolving the current user in the auth dependencies.
+
+    python -m benchmarks.principal [--seconds S] [--out FILE]
+
+* `orm_user`: `get_current_user` + `get_current_active_user` as they were,
+  loading the `models.User` row into an ORM object
+* `principal`: `get_current_principal` on a token's first request, which
+  builds the principal from the cached row or a narrow column select
+* `principal_cached`: `get_current_principal` for a token it already
+  resolved, as on every later request
+
+The first two also run as `*_db`, with the row cache bypassed. Every call
+runs in a fresh session, like a request, with the token already verified.
+Results add the bytes allocated per call (peak, from `tracemalloc`, in a
+separate pass so tracing doesn't skew the timings) to the `benchmarks.micro`
+latency figures, and are written to `--out` (`principal.json`) for
+`benchmarks.compare`.
+"""
+import argparse
+import tracemalloc
+from typing import Any, Callable, Dict
+
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from app.api import deps
+from app.core import security
+from app.core.token_cache import token_cache
+from app.crud.base import CACHE_BYPASS
+from app.db.base import User
+from benchmarks.common import get_engine, get_session, seed_users, write_results
+from benchmarks.micro import measure
+
+ALLOCATION_CALLS = 200
+
+
+def allocated_bytes(fn: Callable[[], Any], calls: int = ALLOCATION_CALLS) -> float:
+    fn()
+    tracemalloc.start()
+    try:
+        total = 0
+        for _ in range(calls):
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+            fn()
+            total += tracemalloc.get_traced_memory()[1] - before
+    finally:
+        tracemalloc.stop()
+    return total / calls
+
+
+def main(args: argparse.Namespace) -> None:
+    engine = get_engine()
+    with get_session(engine) as db:
+        seed_users(db, 1)
+        user_id = db.scalar(select(User.id).where(User.email == "user0@example.com"))
+    token = security.create_access_token(user_id, "user0@example.com")
+    assert token_cache.put(token, security.decode_access_token(token)) is not None
+
+    make_session = sessionmaker(autoflush=False, expire_on_commit=False, bind=engine)
+
+    def request(
+        resolve: Callable[[Any], Any], *, keep_principal: bool = False, bypass_cache: bool = False
+    ) -> Callable[[], Any]:
+        def call() -> Any:
+            if not keep_principal:
+                token_cache.invalidate_user(user_id)
+            with make_session() as db:
+                if bypass_cache:
+                    db.info[CACHE_BYPASS] = True
+                return resolve(db)
+
+        return call
+
+    def orm_user(db: Any) -> Any:
+        return deps.get_current_active_user_model(deps.get_current_user(db, token))
+
+    def principal(db: Any) -> Any:
+        return deps.get_current_active_user(deps.get_current_principal(db, token))
+
+    cases = {
+        "orm_user": request(orm_user),
+        "orm_user_db": request(orm_user, bypass_cache=True),
+        "principal": request(principal),
+        "principal_db": request(principal, bypass_cache=True),
+        "principal_cached": request(principal, keep_principal=True),
+    }
+    results: Dict[str, Dict[str, float]] = {}
+    for name, fn in cases.items():
+        results[name] = result = measure(fn, args.seconds)
+        result["alloc_bytes"] = allocated_bytes(fn)
+        print(
+            f"{name:>20}: {result['ops']:>10,.0f} ops/s  p50 {result['p50_us']:9.1f} us  "
+            f"p99 {result['p99_us']:9.1f} us  {result['alloc_bytes']:9,.0f} B/call"
+        )
+    write_results(args.out, "principal", results, seconds=args.seconds)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--seconds", type=float, default=2.0)
+    parser.add_argument("--out", default="principal.json")
+    main(parser.parse_args())
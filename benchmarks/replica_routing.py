@@ -0,0 +1,65 @@
+"""
+How sessions spread reads over read replicas, and what happens when one fails.
+
+    BENCH_REPLICA_URLS=postgresql://...,postgresql://... python -m benchmarks.replica_routing [sessions]
+
+Without BENCH_REPLICA_URLS two SQLite files stand in for the replicas. Each
+database gets its own copy of the schema and seed users. No replication runs
+between them.
+"""
+import os
+import sys
+from collections import Counter
+
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, schemas
+from app.db.routing import ReplicaSet, RoutingSession
+from app.models import User
+from benchmarks.common import get_engine, seed_users, timeit
+
+REPLICA_URLS = os.getenv(
+    "BENCH_REPLICA_URLS", "sqlite:///bench_replica_1.db,sqlite:///bench_replica_2.db"
+).split(",")
+
+
+def route_reads(Session: sessionmaker, replicas: ReplicaSet, sessions: int) -> Counter:
+    hits: Counter = Counter()
+    for _ in range(sessions):
+        db = Session()
+        db.execute(select(User.id).limit(1))
+        hits[db.get_bind(clause=select(User)).url.render_as_string()] += 1
+        db.close()
+    return hits
+
+
+def main(sessions: int = 1_000) -> None:
+    primary = get_engine()
+    replica_engines = [get_engine(url) for url in REPLICA_URLS]
+    for engine in [primary, *replica_engines]:
+        db = sessionmaker(bind=engine)()
+        seed_users(db, 100)
+        db.close()
+
+    for strategy in ("round_robin", "least_connections"):
+        replicas = ReplicaSet(replica_engines, strategy=strategy)
+        Session = sessionmaker(class_=RoutingSession, bind=primary, replicas=replicas)
+        print(f"{strategy}: {dict(route_reads(Session, replicas, sessions))}")
+
+    replicas = ReplicaSet(replica_engines)
+    Session = sessionmaker(class_=RoutingSession, bind=primary, replicas=replicas)
+    replicas.eject(replica_engines[0])
+    print(f"{REPLICA_URLS[0]} ejected: {dict(route_reads(Session, replicas, sessions))}")
+
+    db = Session()
+    crud.user.update(db, db_obj=crud.user.get(db, 1), obj_in=schemas.UserUpdate(full_name="x"))
+    print(f"read after write: {db.get_bind(clause=select(User)).url.render_as_string()}")
+    db.close()
+
+    stats = timeit(lambda: route_reads(Session, replicas, 1))
+    print(f"routed session: p50 {stats['p50']:.2f} ms, p95 {stats['p95']:.2f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,42 @@
+"""
+Query plan and latency of ranked item search.
+
+    BENCH_DATABASE_URL=postgresql://... python -m benchmarks.search [items] [owners]
+
+Postgres only: prints the plan of a search for a common word and for a
+misspelled prefix, which should use the `ix_item_search_vector` and
+`ix_item_title_trgm` GIN indexes rather than scan `item`, then times both.
+"""
+import sys
+
+from sqlalchemy import text
+
+from app import crud
+from benchmarks.common import get_engine, get_session, seed_items, seed_users, timeit
+
+PAGE_SIZE = 20
+QUERIES = ("item 4242", "itme")
+
+
+def main(items: int = 1_000_000, owners: int = 1_000) -> None:
+    engine = get_engine()
+    if engine.dialect.name != "postgresql":
+        sys.exit("benchmarks.search needs a PostgreSQL BENCH_DATABASE_URL")
+    db = get_session(engine)
+    seed_users(db, owners)
+    seed_items(db, items, owners)
+    db.execute(text("ANALYZE item"))
+
+    for q in QUERIES:
+        stmt = crud.item.search_query(q).limit(PAGE_SIZE)
+        sql = str(stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+        print(f"-- {q!r}")
+        for row in db.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}")):
+            print(row[0])
+        stats = timeit(lambda: crud.item.search(db, q=q, limit=PAGE_SIZE))
+        print(f"search {q!r}: p50 {stats['p50']:.2f} ms, p95 {stats['p95']:.2f} ms")
+    db.close()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,132 @@
+"""
+Partition pruning of tenant-scoped item listings.
+
+    BENCH_DATABASE_URL=postgresql://... python -m benchmarks.tenant_listing [items] [tenants] [owners]
+
+Needs a PostgreSQL database migrated with `alembic upgrade head`: the item
+partitions only exist in the migrations, `create_all` builds a plain table.
+Seeds `items` rows (100M by default, server-side) over `owners` users spread
+round-robin over `tenants` tenants, then runs a keyset page of one tenant's
+items and of one owner's items through `CRUDItem` in a session scoped to the
+tenant, and the owner page again unscoped. For each it prints the plan of
+the SQL that was sent, the partitions the plan touches and the latency; the
+scoped listings should touch one partition, the unscoped one all of them.
+"""
+import re
+import sys
+from typing import Any, Callable, Set, Tuple
+
+from sqlalchemy import event, func, select, text
+from sqlalchemy.orm import Session
+
+from app import crud
+from app.db.tenancy import set_tenant
+from app.models import Item
+from benchmarks.common import get_engine, get_session, seed_users, timeit
+
+PAGE_SIZE = 100
+SEED_BATCH_SIZE = 1_000_000
+
+
+def is_partitioned(db: Session) -> bool:
+    return bool(db.scalar(text(
+        "SELECT count(*) FROM pg_partitioned_table WHERE partrelid = 'item'::regclass"
+    )))
+
+
+def seed_tenants(db: Session, tenants: int, owners: int) -> None:
+    db.execute(text(
+        "INSERT INTO tenant (id, name) SELECT g, 'Tenant ' || g FROM generate_series(1, :n) g "
+        "ON CONFLICT DO NOTHING"
+    ), {"n": tenants})
+    db.execute(text("SELECT setval('tenant_id_seq', (SELECT max(id) FROM tenant))"))
+    db.execute(text(
+        'UPDATE "user" SET tenant_id = (id - 1) % :tenants + 1 WHERE id <= :owners'
+    ), {"tenants": tenants, "owners": owners})
+    db.commit()
+
+
+def seed_tenant_items(db: Session, n: int, tenants: int, owners: int) -> None:
+    """
+    Top item up to `n` rows, like `seed_items` but generated by the database,
+    each in its owner's tenant.
+    """
+    existing = db.scalar(select(func.count()).select_from(Item))
+    for start in range(existing, n, SEED_BATCH_SIZE):
+        stop = min(start + SEED_BATCH_SIZE, n)
+        db.execute(text(
+            "INSERT INTO item (title, description, owner_id, tenant_id) "
+            "SELECT 'Item ' || i, 'Description of item ' || i, i % :owners + 1, "
+            "i % :owners % :tenants + 1 FROM generate_series(:start, :stop - 1) i"
+        ), {"owners": owners, "tenants": tenants, "start": start, "stop": stop})
+        db.commit()
+        print(f"seeded {stop:,} items", file=sys.stderr)
+    db.execute(text("ANALYZE item"))
+    db.commit()
+
+
+def last_statement(db: Session, fn: Callable[[], Any]) -> Tuple[str, Any]:
+    """
+    Run `fn` and return the last SQL it sent, with the tenant criteria the
+    session added.
+    """
+    sent = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany) -> None:
+        sent.append((statement, parameters))
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+    return sent[-1]
+
+
+def report(db: Session, name: str, fn: Callable[[], Any]) -> None:
+    statement, parameters = last_statement(db, fn)
+    plan = [
+        row[0]
+        for row in db.connection().exec_driver_sql(
+            f"EXPLAIN (ANALYZE, BUFFERS) {statement}", parameters
+        )
+    ]
+    partitions: Set[str] = set(re.findall(r"\bitem_p\d+\b", "\n".join(plan)))
+    timings = timeit(fn)
+    print(f"--- {name}: {len(partitions)} partition(s), "
+          f"p50 {timings['p50']:.2f} ms, p95 {timings['p95']:.2f} ms")
+    for line in plan:
+        print(line)
+
+
+def main(items: int = 100_000_000, tenants: int = 100, owners: int = 10_000) -> None:
+    engine = get_engine()
+    if engine.dialect.name != "postgresql":
+        raise SystemExit("Partition pruning needs PostgreSQL; set BENCH_DATABASE_URL")
+    db = get_session(engine)
+    if not is_partitioned(db):
+        raise SystemExit("item isn't partitioned; run `alembic upgrade head` on the database first")
+    seed_users(db, owners)
+    seed_tenants(db, tenants, owners)
+    seed_tenant_items(db, items, tenants, owners)
+
+    owner_id = owners // 2
+    tenant_id = (owner_id - 1) % tenants + 1
+
+    def tenant_page() -> None:
+        crud.item.get_multi_keyset(db, limit=PAGE_SIZE)
+
+    def owner_page() -> None:
+        crud.item.get_multi_by_owner_keyset(db, owner_id=owner_id, limit=PAGE_SIZE)
+
+    set_tenant(db, tenant_id)
+    report(db, f"first page of tenant {tenant_id}", tenant_page)
+    report(db, f"first page of owner {owner_id}, scoped to tenant {tenant_id}", owner_page)
+    set_tenant(db, None)
+    report(db, f"first page of owner {owner_id}, unscoped", owner_page)
+    db.close()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
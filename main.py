@@ -1,8 +1,24 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.orm.exc import StaleDataError
 from starlette.middleware.cors import CORSMiddleware
 
+from app import crud
 from app.api.routers import api_router
+from app.core.cache import cache
 from app.core.config import settings
+from app.core.hashing import HashingOverloaded, hasher
+from app.core.instrumentation import (
+    CONTENT_TYPE_LATEST,
+    instrument_routes,
+    metrics_response_body,
+)
+from app.core.keys import keyring
+from app.core.mail import mailer, templates
+from app.core.rate_limit import rate_limiter
+from app.core.revocation import revocations
+from app.db.query_guard import guard_routes
+from app.db.session import SessionLocal
 
 app = FastAPI(
     title=settings.PROJECT_NAME, openapi_url=f"{settings.API_V1_STR}/openapi.json"
@@ -16,6 +32,87 @@ if settings.BACKEND_CORS_ORIGINS:
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=["X-Next-Cursor", "ETag"],
     )
 
 app.include_router(api_router, prefix=settings.API_V1_STR)
+
+if settings.SQL_GUARD_MODE != "off":
+    guard_routes(app.routes)
+
+
+@app.get("/.well-known/jwks.json", include_in_schema=False)
+def read_jwks() -> dict:
+    """
+    Public keys that verify this service's tokens, for other services.
+    """
+    return keyring.jwks()
+
+
+if settings.PROMETHEUS_ENABLED:
+    # Only API routes are measured, so scraping doesn't show up in its own metrics
+    instrument_routes(app.routes)
+
+    @app.get("/metrics", include_in_schema=False)
+    def read_prometheus_metrics() -> Response:
+        return Response(metrics_response_body(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.exception_handler(HashingOverloaded)
+def hashing_overloaded_handler(request: Request, exc: HashingOverloaded) -> JSONResponse:
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Server is busy, please retry"},
+        headers={"Retry-After": str(settings.PASSWORD_HASH_RETRY_AFTER_SECONDS)},
+    )
+
+
+@app.exception_handler(StaleDataError)
+def stale_data_handler(request: Request, exc: StaleDataError) -> JSONResponse:
+    # The row's version changed between reading and updating it
+    return JSONResponse(
+        status_code=409,
+        content={"detail": "The resource was modified concurrently, please retry"},
+    )
+
+
+@app.on_event("startup")
+def start_cache() -> None:
+    cache.start()
+
+
+@app.on_event("startup")
+def start_revocations() -> None:
+    revocations.start(crud.revoked_token.loader(SessionLocal))
+
+
+@app.on_event("startup")
+def start_mailer() -> None:
+    if settings.EMAILS_ENABLED:
+        templates.load_all()
+        mailer.start()
+
+
+@app.on_event("shutdown")
+def stop_mailer() -> None:
+    mailer.stop()
+
+
+@app.on_event("shutdown")
+def stop_revocations() -> None:
+    revocations.stop()
+
+
+@app.on_event("shutdown")
+def shutdown_hasher() -> None:
+    hasher.shutdown()
+
+
+@app.on_event("shutdown")
+def close_cache() -> None:
+    cache.close()
+
+
+@app.on_event("shutdown")
+async def close_rate_limiter() -> None:
+    await rate_limiter.close()
@@ -0,0 +1,92 @@
+import pytest
+
+from app import crud, schemas
+from app.api.conditional import etag_matches
+from app.core.config import settings
+
+
+@pytest.fixture
+def item(db, superuser):
+    return crud.item.create_with_owner(
+        db, obj_in=schemas.ItemCreate(title="Title"), owner_id=superuser.id
+    )
+
+
+@pytest.fixture
+def headers(superuser, auth_headers):
+    return auth_headers(superuser)
+
+
+@pytest.mark.parametrize(
+    "if_none_match, matches",
+    [
+        (None, False),
+        ('W/"item-1-1"', True),
+        ('"item-1-1"', True),
+        ('W/"item-1-2"', False),
+        ('W/"item-1-2", W/"item-1-1"', True),
+        ("*", True),
+    ],
+)
+def test_etag_matches(if_none_match, matches):
+    assert etag_matches(if_none_match, 'W/"item-1-1"') is matches
+
+
+def test_item_etag_and_304(client, headers, item):
+    response = client.get(f"/api/v1/items/{item.id}", headers=headers)
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'W/"item-{item.id}-1"'
+    assert response.headers["Cache-Control"] == "private, no-cache"
+    response = client.get(
+        f"/api/v1/items/{item.id}",
+        headers={**headers, "If-None-Match": response.headers["ETag"]},
+    )
+    assert response.status_code == 304
+    assert response.headers["ETag"] == f'W/"item-{item.id}-1"'
+    assert response.content == b""
+
+
+def test_update_changes_etag(client, headers, item):
+    old = client.get(f"/api/v1/items/{item.id}", headers=headers).headers["ETag"]
+    client.put(f"/api/v1/items/{item.id}", headers=headers, json={"title": "Renamed"})
+    response = client.get(
+        f"/api/v1/items/{item.id}", headers={**headers, "If-None-Match": old}
+    )
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'W/"item-{item.id}-2"'
+    assert response.json()["title"] == "Renamed"
+
+
+def test_user_me_etag(client, headers, superuser):
+    response = client.get("/api/v1/users/me", headers=headers)
+    tag = response.headers["ETag"]
+    assert tag == f'W/"user-{superuser.id}-1"'
+    assert client.get(
+        "/api/v1/users/me", headers={**headers, "If-None-Match": tag}
+    ).status_code == 304
+    client.put("/api/v1/users/me", headers=headers, json={"full_name": "Renamed"})
+    response = client.get("/api/v1/users/me", headers={**headers, "If-None-Match": tag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == f'W/"user-{superuser.id}-2"'
+    assert response.json()["full_name"] == "Renamed"
+
+
+def test_cache_control_per_route(client, headers, item, monkeypatch):
+    monkeypatch.setitem(settings.CACHE_CONTROL, "read_item", "private, max-age=60")
+    response = client.get(f"/api/v1/items/{item.id}", headers=headers)
+    assert response.headers["Cache-Control"] == "private, max-age=60"
+
+
+def test_response_cache(client, headers, item, isolated_cache, monkeypatch):
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_ENABLED", True)
+    path = f"/api/v1/items/{item.id}"
+    first = client.get(path, headers=headers)
+    hits = isolated_cache.stats.snapshot()["hits"]
+    second = client.get(path, headers=headers)
+    assert isolated_cache.stats.snapshot()["hits"] == hits + 1
+    assert second.json() == first.json() and second.headers["ETag"] == first.headers["ETag"]
+    # The update bumps the version, so the cached body is no longer served
+    client.put(path, headers=headers, json={"title": "Renamed"})
+    response = client.get(path, headers=headers)
+    assert response.json()["title"] == "Renamed"
+    assert response.headers["ETag"] == f'W/"item-{item.id}-2"'
@@ -0,0 +1,46 @@
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import crud
+from app.api import deps
+from app.core import security
+from app.db.tenancy import TENANT_ID
+from app.models.tenant import Tenant
+from app.models.user import User
+
+
+@pytest.fixture
+def tenant_user(db) -> User:
+    db.add(Tenant(id=2, name="other"))
+    user = User(email="user@other.example.com", hashed_password="x", tenant_id=2)
+    db.add(user)
+    db.commit()
+    return user
+
+
+def test_cached_snapshot_scopes_the_session(session_factory, tenant_user):
+    token = security.create_access_token(tenant_user.id, tenant_user.email)
+    # A session per request; the second request gets the snapshot from the token cache
+    for _ in range(2):
+        with session_factory() as db:
+            snapshot = deps.get_current_active_user_cached(db, token)
+            assert db.info[TENANT_ID] == snapshot.tenant_id == 2
+
+
+@pytest.mark.anyio
+async def test_async_cached_snapshot_scopes_the_session(async_engine, tenant_user):
+    token = security.create_access_token(tenant_user.id, tenant_user.email)
+    for _ in range(2):
+        async with AsyncSession(async_engine) as db:
+            snapshot = await deps.get_current_active_user_cached_async(db, token)
+            assert db.info[TENANT_ID] == snapshot.tenant_id == 2
+
+
+@pytest.mark.anyio
+async def test_async_principal_reads_the_row_cache(db, async_db, tenant_user, isolated_cache):
+    # Caches the row
+    crud.user.get(db, tenant_user.id)
+    hits = isolated_cache.stats.snapshot()["hits"]
+    principal = await crud.async_user.get_principal(async_db, id=tenant_user.id)
+    assert isolated_cache.stats.snapshot()["hits"] == hits + 1
+    assert (principal.id, principal.tenant_id) == (tenant_user.id, 2)
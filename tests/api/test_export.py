@@ -0,0 +1,78 @@
+import csv
+import io
+import json
+
+import pytest
+from sqlalchemy import func, select
+
+from app import schemas
+from app.core.config import settings
+from app.models import Item, User
+from tests.support import seed_items, seed_users
+
+
+@pytest.fixture(params=["sync", "async"])
+def export_client(request, client, async_client, db, superuser, monkeypatch):
+    seed_users(db, 6)
+    seed_items(db, 12, owners=3)
+    # Small batches, so the export spans several
+    monkeypatch.setattr(settings, "EXPORT_BATCH_SIZE", 2)
+    return client if request.param == "sync" else async_client
+
+
+@pytest.fixture
+def member(db, export_client) -> User:
+    return db.scalars(select(User).where(User.is_superuser.is_(False)).order_by(User.id)).first()
+
+
+def test_users_ndjson(export_client, db, superuser, auth_headers):
+    response = export_client.get("/api/v1/users/export", headers=auth_headers(superuser))
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    assert response.headers["content-disposition"] == "attachment; filename=users.ndjson"
+    rows = [json.loads(line) for line in response.text.splitlines()]
+    assert len(rows) == db.scalar(select(func.count()).select_from(User))
+    assert [row["id"] for row in rows] == sorted(row["id"] for row in rows)
+    assert list(rows[0]) == list(schemas.User.__fields__)
+    assert rows[0]["email"] == superuser.email
+
+
+def test_users_csv(export_client, db, superuser, auth_headers):
+    response = export_client.get(
+        "/api/v1/users/export?format=csv", headers=auth_headers(superuser)
+    )
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.reader(io.StringIO(response.text)))
+    assert rows[0] == list(schemas.User.__fields__)
+    assert len(rows) - 1 == db.scalar(select(func.count()).select_from(User))
+
+
+def test_users_export_needs_superuser(export_client, member, auth_headers):
+    response = export_client.get("/api/v1/users/export", headers=auth_headers(member))
+    assert response.status_code == 400
+
+
+def test_users_export_rejects_unknown_format(export_client, superuser, auth_headers):
+    response = export_client.get(
+        "/api/v1/users/export?format=xml", headers=auth_headers(superuser)
+    )
+    assert response.status_code == 422
+
+
+def test_user_items(export_client, db, member, auth_headers):
+    owner = member
+    response = export_client.get(
+        f"/api/v1/users/{owner.id}/items/export?format=csv", headers=auth_headers(owner)
+    )
+    assert response.headers["content-disposition"] == "attachment; filename=items.csv"
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    owned = db.scalars(select(Item.id).where(Item.owner_id == owner.id).order_by(Item.id))
+    assert rows and [int(row["id"]) for row in rows] == list(owned)
+    assert {row["owner_id"] for row in rows} == {str(owner.id)}
+
+
+def test_user_items_of_another_user(export_client, member, auth_headers):
+    response = export_client.get(
+        f"/api/v1/users/{member.id + 1}/items/export", headers=auth_headers(member)
+    )
+    assert response.status_code == 400
@@ -0,0 +1,93 @@
+import pytest
+from sqlalchemy import select, text
+
+from app.models import Item, User
+from tests.support import seed_items, seed_users
+
+
+@pytest.fixture(params=["sync", "async"])
+def items_client(request, client, async_client, db, superuser):
+    seed_users(db, 4)
+    seed_items(db, 30, owners=4)
+    return client if request.param == "sync" else async_client
+
+
+@pytest.fixture
+def member(db, items_client) -> User:
+    return db.scalars(select(User).where(User.is_superuser.is_(False)).order_by(User.id)).first()
+
+
+def test_item_crud(items_client, member, auth_headers):
+    headers = auth_headers(member)
+    created = items_client.post(
+        "/api/v1/items/", headers=headers, json={"title": "New", "description": "D"}
+    ).json()
+    assert created["owner_id"] == member.id
+    path = f"/api/v1/items/{created['id']}"
+    assert items_client.get(path, headers=headers).json() == created
+    updated = items_client.put(path, headers=headers, json={"title": "Renamed"}).json()
+    assert (updated["title"], updated["description"]) == ("Renamed", "D")
+    assert items_client.delete(path, headers=headers).status_code == 200
+    assert items_client.get(path, headers=headers).status_code == 404
+
+
+def test_other_users_items(items_client, db, member, auth_headers):
+    headers = auth_headers(member)
+    other = db.scalar(select(Item.id).where(Item.owner_id != member.id))
+    path = f"/api/v1/items/{other}"
+    assert items_client.get(path, headers=headers).status_code == 400
+    assert items_client.put(path, headers=headers, json={"title": "x"}).status_code == 400
+    assert items_client.delete(path, headers=headers).status_code == 400
+    assert items_client.get("/api/v1/items/100000", headers=headers).status_code == 404
+
+
+def pages(items_client, headers, path):
+    ids, cursor = [], None
+    while True:
+        params = {"limit": 4, **({"cursor": cursor} if cursor else {})}
+        response = items_client.get(path, headers=headers, params=params)
+        ids += [item["id"] for item in response.json()]
+        cursor = response.headers.get("X-Next-Cursor")
+        if cursor is None:
+            return ids
+
+
+def test_users_list_their_own_items(items_client, db, member, auth_headers):
+    owned = list(db.scalars(select(Item.id).where(Item.owner_id == member.id).order_by(Item.id)))
+    # owner_id is ignored for users who aren't superusers
+    path = f"/api/v1/items/?owner_id={member.id + 1}"
+    assert pages(items_client, auth_headers(member), path) == owned
+
+
+def test_superusers_list_every_item(items_client, db, superuser, member, auth_headers):
+    headers = auth_headers(superuser)
+    assert pages(items_client, headers, "/api/v1/items/") == list(
+        db.scalars(select(Item.id).order_by(Item.id))
+    )
+    assert pages(items_client, headers, f"/api/v1/items/?owner_id={member.id}") == list(
+        db.scalars(select(Item.id).where(Item.owner_id == member.id).order_by(Item.id))
+    )
+
+
+def test_offset_paging(items_client, db, member, auth_headers):
+    owned = list(db.scalars(select(Item.id).where(Item.owner_id == member.id).order_by(Item.id)))
+    response = items_client.get(
+        "/api/v1/items/", headers=auth_headers(member), params={"skip": 2, "limit": 3}
+    )
+    assert [item["id"] for item in response.json()] == owned[2:5]
+
+
+def test_invalid_cursor(items_client, member, auth_headers):
+    response = items_client.get(
+        "/api/v1/items/", headers=auth_headers(member), params={"cursor": "garbage"}
+    )
+    assert response.status_code == 400
+
+
+def test_owner_listing_uses_composite_index(db):
+    plan = db.execute(
+        text("EXPLAIN QUERY PLAN SELECT * FROM item WHERE owner_id = 1 AND id > 5 ORDER BY id")
+    ).all()
+    details = " ".join(row[-1] for row in plan)
+    assert "ix_item_owner_id_id" in details
+    assert "TEMP B-TREE" not in details
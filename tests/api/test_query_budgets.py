@@ -0,0 +1,93 @@
+"""
+Every listed route has a budget of SQL statements per request; a request
+going over it, or running a statement once per row (N+1), fails its test.
+"""
+import pytest
+from sqlalchemy.exc import InvalidRequestError
+
+from app import crud
+from app.core.config import settings
+from app.db import query_guard
+from app.db.query_guard import GuardedRoute, QueryBudgetExceeded, track_queries
+from tests.support import seed_items, seed_users
+
+# Statements per request, counting the one that loads the caller on the
+# first request of a token
+BUDGETS = {
+    "/api/v1/users/": 2,
+    "/api/v1/users/batch": 2,
+    "/api/v1/users/me": 1,
+    "/api/v1/items/": 2,
+}
+
+
+@pytest.fixture
+def guarded(client, engine, monkeypatch):
+    import main
+
+    monkeypatch.setattr(settings, "SQL_GUARD_MODE", "raise")
+    monkeypatch.setattr(settings, "SQL_QUERY_BUDGETS", dict(BUDGETS))
+    query_guard.install(engine)
+    routes = [route for route in main.app.routes if hasattr(route, "methods")]
+    apps = [route.app for route in routes]
+    query_guard.guard_routes(routes)
+    yield client
+    for route, app in zip(routes, apps):
+        route.app = app
+
+
+@pytest.fixture
+def seeded(db):
+    seed_users(db, 10)
+    seed_items(db, 50, owners=10)
+
+
+@pytest.mark.parametrize(
+    "path",
+    [
+        "/api/v1/users/",
+        "/api/v1/users/?skip=5",
+        "/api/v1/users/batch?ids=1&ids=2&ids=3",
+        "/api/v1/users/me",
+        "/api/v1/items/",
+        "/api/v1/items/?skip=5",
+        "/api/v1/items/?owner_id=2",
+    ],
+)
+def test_routes_stay_within_budget(guarded, seeded, superuser, auth_headers, path):
+    assert guarded.get(path, headers=auth_headers(superuser)).status_code == 200
+
+
+def test_route_over_budget_fails(guarded, seeded, superuser, auth_headers, monkeypatch):
+    monkeypatch.setitem(settings.SQL_QUERY_BUDGETS, "/api/v1/items/", 0)
+    with pytest.raises(QueryBudgetExceeded, match="over its budget of 0"):
+        guarded.get("/api/v1/items/", headers=auth_headers(superuser))
+
+
+def test_routes_are_guarded(guarded):
+    import main
+
+    paths = {route.path for route in main.app.routes if isinstance(route.app, GuardedRoute)}
+    assert set(BUDGETS) <= paths
+
+
+def test_lazy_load_per_row_is_caught(db, seeded, monkeypatch):
+    monkeypatch.setattr(settings, "SQL_GUARD_MODE", "raise")
+    query_guard.install(db.get_bind())
+    with pytest.raises(QueryBudgetExceeded, match="N\\+1"):
+        with track_queries("owners"):
+            for item in crud.item.get_multi(db, load={"owner": "lazy"}):
+                item.owner
+    db.expunge_all()
+    with track_queries("owners", budget=2):
+        owners = {item.owner.id for item in crud.item.get_multi(db, load={"owner": "selectin"})}
+    assert len(owners) == 10
+
+
+def test_list_loaders_forbid_relationship_loads(db, seeded):
+    (item,) = crud.item.get_multi(db, limit=1)
+    with pytest.raises(InvalidRequestError):
+        item.owner
+    (user,) = crud.user.get_multi(db, limit=1)
+    with pytest.raises(InvalidRequestError):
+        user.items
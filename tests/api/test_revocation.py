@@ -0,0 +1,99 @@
+"""
+Refresh tokens work once, logging out revokes both tokens, and revocations
+made by one worker reach the others when they sync.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+from uuid import uuid4
+
+import pytest
+
+from app import crud
+from app.core import security
+from app.core.revocation import RevocationList, revocations
+from tests.support import SEED_PASSWORD, SEED_SUPERUSER_EMAIL
+
+
+@pytest.fixture
+def tokens(client, superuser):
+    response = client.post(
+        "/api/v1/auth/login/access-token",
+        json={"username": SEED_SUPERUSER_EMAIL, "password": SEED_PASSWORD},
+    )
+    return response.json()
+
+
+def refresh(client, refresh_token):
+    return client.post(
+        "/api/v1/auth/login/refresh-token", json={"refresh_token": refresh_token}
+    )
+
+
+def bearer(tokens):
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+def test_refresh_token_works_once(client, tokens):
+    response = refresh(client, tokens["refresh_token"])
+    assert response.status_code == 200
+    renewed = response.json()
+    assert client.get("/api/v1/users/me", headers=bearer(renewed)).status_code == 200
+    assert refresh(client, tokens["refresh_token"]).status_code == 403
+    # The renewed refresh token is a different one, good for its own single use
+    assert refresh(client, renewed["refresh_token"]).status_code == 200
+
+
+def test_reuse_is_caught_by_another_worker(client, db, superuser, tokens):
+    claims = security.decode_refresh_token(tokens["refresh_token"])
+    expires_at = datetime.fromtimestamp(claims["exp"], timezone.utc)
+    crud.revoked_token.revoke(db, jti=claims["jti"], user_id=superuser.id, expires_at=expires_at)
+    # As if another worker used it: this worker's list hasn't synced yet, the table has it
+    revocations.clear()
+    assert refresh(client, tokens["refresh_token"]).status_code == 403
+
+
+def test_logout_revokes_both_tokens(client, tokens):
+    assert client.get("/api/v1/users/me", headers=bearer(tokens)).status_code == 200
+    assert client.post("/api/v1/auth/logout", headers=bearer(tokens)).status_code == 200
+    assert client.get("/api/v1/users/me", headers=bearer(tokens)).status_code == 403
+    assert refresh(client, tokens["refresh_token"]).status_code == 403
+
+
+@pytest.fixture
+def other_worker(session_factory):
+    """
+    Another worker's revocation list, reading the test database.
+    """
+    revocations = RevocationList(sync_seconds=3600)
+    revocations.start(crud.revoked_token.loader(session_factory))
+    yield revocations
+    revocations.stop()
+
+
+def test_revocation_reaches_other_worker_on_sync(db, superuser, other_worker):
+    claims = {"jti": uuid4().hex, "sub": str(superuser.id), "iat": time.time()}
+    expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
+    crud.revoked_token.revoke(db, jti=claims["jti"], user_id=superuser.id, expires_at=expires_at)
+    assert not other_worker.is_revoked(claims)
+    other_worker.sync()
+    assert other_worker.is_revoked(claims)
+
+    earlier = {"jti": uuid4().hex, "sub": str(superuser.id), "iat": time.time()}
+    crud.revoked_token.revoke_user(db, user_id=superuser.id)
+    assert not other_worker.is_revoked(earlier)
+    other_worker.sync()
+    assert other_worker.is_revoked(earlier)
+    later = {"jti": uuid4().hex, "sub": str(superuser.id), "iat": time.time()}
+    assert not other_worker.is_revoked(later)
+
+
+def test_start_loads_existing_revocations(db, superuser, session_factory):
+    jti = uuid4().hex
+    expires_at = datetime.now(timezone.utc) + timedelta(hours=1)
+    crud.revoked_token.revoke(db, jti=jti, user_id=superuser.id, expires_at=expires_at)
+    late_starter = RevocationList(sync_seconds=3600)
+    late_starter.start(crud.revoked_token.loader(session_factory))
+    try:
+        assert late_starter.is_revoked({"jti": jti})
+    finally:
+        late_starter.stop()
@@ -0,0 +1,102 @@
+"""
+Tokens cache their user, so a change to the user must reach the cached
+token: on the worker that made it, and on the others through the cache's
+invalidation bus.
+"""
+import time
+
+import fakeredis
+import pytest
+from sqlalchemy import update
+
+from app import crud, schemas
+from app.core.cache import RedisCacheBackend
+from app.core.token_cache import token_cache
+from app.crud.crud_user import CRUDUser, _drop_token_snapshots
+from app.models import User
+
+
+@pytest.fixture
+def user(db) -> User:
+    return crud.user.create(
+        db, obj_in=schemas.UserCreate(email="user@example.com", password="password")
+    )
+
+
+def cached_get(client, path, headers):
+    # The first request caches the token's user, which the assertions then exercise
+    assert client.get(path, headers=headers).status_code in (200, 400)
+    return client.get(path, headers=headers)
+
+
+@pytest.mark.parametrize(
+    "change", [{"password": "changed"}, {"is_active": False}], ids=["password", "is_active"]
+)
+def test_update_cuts_off_cached_token(client, db, user, auth_headers, change):
+    headers = auth_headers(user)
+    assert cached_get(client, "/api/v1/users/me", headers).status_code == 200
+    crud.user.update(db, db_obj=user, obj_in=change)
+    assert client.get("/api/v1/users/me", headers=headers).status_code == 403
+
+
+def test_update_reaches_cached_flags(client, db, user, auth_headers):
+    headers = auth_headers(user)
+    assert cached_get(client, "/api/v1/users/", headers).status_code == 400
+    assert cached_get(client, "/api/v1/users/me", headers).json()["is_superuser"] is False
+    crud.user.update(db, db_obj=user, obj_in={"is_superuser": True})
+    assert client.get("/api/v1/users/", headers=headers).status_code == 200
+    assert client.get("/api/v1/users/me", headers=headers).json()["is_superuser"] is True
+
+
+@pytest.fixture
+def workers(monkeypatch):
+    """
+    This worker's cache and another worker's CRUD object, sharing one server.
+    """
+    server = fakeredis.FakeServer()
+    local = RedisCacheBackend(client=fakeredis.FakeRedis(server=server))
+    local.subscribe(_drop_token_snapshots)
+    local.start()
+    monkeypatch.setattr(crud.user, "cache", local)
+    other = CRUDUser(User, cache=RedisCacheBackend(client=fakeredis.FakeRedis(server=server)))
+    yield other
+    local.close()
+
+
+def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+
+@pytest.mark.parametrize(
+    "path, change, status",
+    [
+        ("/api/v1/users/me", {"is_active": False}, 400),
+        ("/api/v1/items/", {"is_active": False}, 400),
+        ("/api/v1/users/", {"is_superuser": True}, 200),
+    ],
+)
+def test_update_on_other_worker_reaches_cached_token(
+    client, db, user, auth_headers, workers, path, change, status
+):
+    headers = auth_headers(user)
+    cached_get(client, path, headers)
+    # The other worker's write, which only reaches this one through the bus
+    db.execute(update(User).where(User.id == user.id).values(**change))
+    db.commit()
+    workers.invalidate(db, user)
+    assert wait_for(lambda: client.get(path, headers=headers).status_code == status)
+
+
+def test_bus_messages_of_other_tables_keep_snapshots(client, user, auth_headers):
+    headers = auth_headers(user)
+    cached_get(client, "/api/v1/users/me", headers)
+    entry = token_cache.get(headers["Authorization"].split()[1])
+    _drop_token_snapshots({"table": "item", "id": user.id})
+    assert entry.user is not None
+    _drop_token_snapshots({"table": "user", "id": user.id})
+    assert entry.user is None
@@ -0,0 +1,60 @@
+"""
+Emails are unique across tenants, while a tenant's session only sees its own
+users: creating a user whose email another tenant has is a 400, not a 500.
+"""
+import pytest
+
+from app import crud
+from app.core.security import get_password_hash
+from app.db.tenancy import set_tenant
+from app.models.tenant import Tenant
+from app.models.user import User
+
+TAKEN = "taken@example.com"
+
+
+@pytest.fixture
+def other_tenant_admin(db):
+    db.add(Tenant(id=2, name="other"))
+    db.add(User(email=TAKEN, hashed_password="x", tenant_id=1))
+    admin = User(
+        email="admin@other.example.com",
+        hashed_password=get_password_hash("x"),
+        is_superuser=True,
+        tenant_id=2,
+    )
+    db.add(admin)
+    db.commit()
+    return admin
+
+
+def test_email_taken_in_other_tenant(client, auth_headers, other_tenant_admin):
+    response = client.post(
+        "/api/v1/users/",
+        headers=auth_headers(other_tenant_admin),
+        json={"email": TAKEN, "password": "x"},
+    )
+    assert response.status_code == 400
+
+
+def test_email_taken_since_the_check(client, auth_headers, other_tenant_admin, monkeypatch):
+    monkeypatch.setattr(type(crud.user), "email_exists", lambda self, db, *, email: False)
+    response = client.post(
+        "/api/v1/users/",
+        headers=auth_headers(other_tenant_admin),
+        json={"email": TAKEN, "password": "x"},
+    )
+    assert response.status_code == 400
+
+
+def test_email_exists_ignores_tenant_scope(db, other_tenant_admin):
+    set_tenant(db, 2)
+    assert crud.user.get_by_email(db, email=TAKEN) is None
+    assert crud.user.email_exists(db, email=TAKEN)
+
+
+@pytest.mark.anyio
+async def test_async_email_exists_ignores_tenant_scope(db, async_db, other_tenant_admin):
+    set_tenant(async_db.sync_session, 2)
+    assert await crud.async_user.email_exists(async_db, email=TAKEN)
+    assert not await crud.async_user.email_exists(async_db, email="free@example.com")
@@ -0,0 +1,68 @@
+import json
+
+import pytest
+
+from app import crud
+from app.core.config import settings
+
+NDJSON = "\n".join(
+    [
+        '{"email": "new1@example.com", "password": "x"}',
+        '{"email": "new1@example.com", "password": "x"}',
+        '{"email": "admin@example.com", "password": "x"}',
+        "{not json",
+        '{"email": "not-an-email", "password": "x"}',
+        "",
+        '{"email": "new2@example.com", "password": "x", "full_name": "New Two"}',
+    ]
+)
+CSV = "email,password,full_name,is_superuser\nc1@example.com,pw,C One,false\nc2@example.com,pw,,true\n"
+
+
+@pytest.fixture(params=["sync", "async"])
+def bulk_client(request, client, async_client, monkeypatch):
+    # Small batches, so the rows span several; repeats are only caught as
+    # duplicates within a batch, later ones as existing users
+    monkeypatch.setattr(settings, "BULK_IMPORT_BATCH_SIZE", 2)
+    return client if request.param == "sync" else async_client
+
+
+def post_bulk(client, headers, body, content_type):
+    return client.post(
+        "/api/v1/users/bulk",
+        headers={**headers, "content-type": content_type},
+        content=body,
+    )
+
+
+def test_ndjson_results(bulk_client, db, superuser, auth_headers):
+    response = post_bulk(bulk_client, auth_headers(superuser), NDJSON, "application/x-ndjson")
+    assert response.status_code == 200
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [(r["row"], r["status"]) for r in results] == [
+        (1, "created"),
+        (2, "duplicate"),
+        (3, "exists"),
+        (4, "invalid"),
+        (5, "invalid"),
+        (7, "created"),
+    ]
+    assert results[4]["email"] == "not-an-email"
+    created = crud.user.get_by_email(db, email="new2@example.com")
+    assert created.id == results[5]["id"] and created.full_name == "New Two"
+
+
+def test_csv_results(bulk_client, db, superuser, auth_headers):
+    response = post_bulk(bulk_client, auth_headers(superuser), CSV, "text/csv")
+    results = [json.loads(line) for line in response.text.splitlines()]
+    assert [r["status"] for r in results] == ["created", "created"]
+    # Empty cells are left out, so they take the schema's defaults
+    assert crud.user.get_by_email(db, email="c2@example.com").full_name is None
+    assert crud.user.get_by_email(db, email="c2@example.com").is_superuser
+
+
+def test_malformed_encoding_is_rejected(bulk_client, db, superuser, auth_headers):
+    body = '{"email": "new1@example.com", "password": "x"}\n'.encode() + b'{"email": "\xff"}\n'
+    response = post_bulk(bulk_client, auth_headers(superuser), body, "application/x-ndjson")
+    assert response.status_code == 400
+    assert crud.user.get_by_email(db, email="new1@example.com") is None
@@ -0,0 +1,195 @@
+import os
+
+# Settings read these when the app is imported; no database server is needed,
+# the tests run against SQLite files
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("POSTGRES_USER", "test")
+os.environ.setdefault("POSTGRES_PASSWORD", "test")
+os.environ.setdefault("POSTGRES_DB", "test")
+# Hash passwords inline rather than in worker processes
+os.environ.setdefault("PASSWORD_HASH_POOL_SIZE", "0")
+
+from typing import Callable, Dict  # noqa: E402
+
+import pytest  # noqa: E402
+from fastapi import APIRouter, FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import event, select  # noqa: E402
+from sqlalchemy.engine import Engine  # noqa: E402
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine  # noqa: E402
+from sqlalchemy.orm import Session, sessionmaker  # noqa: E402
+from sqlalchemy.pool import NullPool  # noqa: E402
+
+from app import crud, models  # noqa: E402
+from app.api import conditional, deps  # noqa: E402
+from app.api.auth import async_routes as async_auth_routes  # noqa: E402
+from app.api.items import async_routes as async_item_routes  # noqa: E402
+from app.api.users import async_routes as async_user_routes  # noqa: E402
+from app.core import security  # noqa: E402
+from app.core.cache import MemoryCacheBackend  # noqa: E402
+from app.core.config import settings  # noqa: E402
+from app.core.revocation import revocations  # noqa: E402
+from app.core.token_cache import token_cache  # noqa: E402
+from app.db.base import Base  # noqa: E402
+from app.db.routing import RoutingSession  # noqa: E402
+from tests.support import (  # noqa: E402
+    SEED_SUPERUSER_EMAIL,
+    add_sqlite_functions,
+    get_engine,
+    get_session,
+    seed_superuser,
+)
+
+
+@pytest.fixture
+def anyio_backend() -> str:
+    return "asyncio"
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(monkeypatch) -> MemoryCacheBackend:
+    """
+    A cache of its own for every test, so rows cached by one never reach the next.
+    """
+    cache = MemoryCacheBackend()
+    monkeypatch.setattr(crud.user, "cache", cache)
+    monkeypatch.setattr(crud.async_user, "cache", cache)
+    # Cached responses too, which are keyed on ids every test database reuses
+    monkeypatch.setattr(conditional, "cache", cache)
+    return cache
+
+
+@pytest.fixture(autouse=True)
+def isolated_token_cache() -> None:
+    """
+    Tokens of one test's users must not be served from the cache in the next,
+    whose database reuses their ids.
+    """
+    token_cache.clear()
+    yield
+    token_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def isolated_revocations() -> None:
+    """
+    Likewise for revocations, which name users by id.
+    """
+    revocations.clear()
+    yield
+    revocations.clear()
+
+
+@pytest.fixture
+def engine(tmp_path) -> Engine:
+    engine = get_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture
+def db(engine: Engine) -> Session:
+    session = get_session(engine)
+    yield session
+    session.close()
+
+
+@pytest.fixture
+async def async_engine(engine: Engine) -> AsyncEngine:
+    """
+    An aiosqlite engine on the database of `engine`, which created the schema.
+    """
+    async_engine = create_async_engine(str(engine.url).replace("sqlite:", "sqlite+aiosqlite:", 1))
+    event.listen(async_engine.sync_engine, "connect", add_sqlite_functions)
+    yield async_engine
+    await async_engine.dispose()
+
+
+@pytest.fixture
+async def async_db(async_engine: AsyncEngine) -> AsyncSession:
+    async with AsyncSession(async_engine, autoflush=False, expire_on_commit=False) as session:
+        yield session
+
+
+@pytest.fixture
+def pg_db() -> Session:
+    """
+    A session on the Postgres database in TEST_DATABASE_URL, for tests marked
+    `postgres`; the tables are dropped afterwards.
+    """
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        pytest.skip("TEST_DATABASE_URL is not set")
+    engine = get_engine(url)
+    session = get_session(engine)
+    yield session
+    session.close()
+    Base.metadata.drop_all(bind=engine)
+    engine.dispose()
+
+
+@pytest.fixture
+def session_factory(engine: Engine) -> sessionmaker:
+    """
+    Sessions configured like `SessionLocal`, on the test database.
+    """
+    return sessionmaker(
+        class_=RoutingSession, autoflush=False, expire_on_commit=False, bind=engine
+    )
+
+
+@pytest.fixture
+def client(session_factory: sessionmaker) -> TestClient:
+    import main
+
+    def get_db():
+        with session_factory() as db:
+            yield db
+
+    main.app.dependency_overrides[deps.get_db] = get_db
+    yield TestClient(main.app)
+    main.app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def async_client(engine: Engine) -> TestClient:
+    """
+    The async routes, which the app only mounts in DB_ASYNC_MODE, on the test
+    database. The client runs its own event loop, so connections aren't pooled.
+    """
+    async_engine = create_async_engine(
+        str(engine.url).replace("sqlite:", "sqlite+aiosqlite:", 1), poolclass=NullPool
+    )
+    event.listen(async_engine.sync_engine, "connect", add_sqlite_functions)
+    router = APIRouter()
+    router.include_router(async_user_routes.router, prefix="/users")
+    router.include_router(async_auth_routes.router, prefix="/auth")
+    router.include_router(async_item_routes.router, prefix="/items")
+    app = FastAPI()
+    app.include_router(router, prefix=settings.API_V1_STR)
+
+    async def get_async_db():
+        async with AsyncSession(async_engine, autoflush=False, expire_on_commit=False) as db:
+            yield db
+
+    app.dependency_overrides[deps.get_async_db] = get_async_db
+    yield TestClient(app)
+
+
+@pytest.fixture
+def auth_headers() -> Callable[[models.User], Dict[str, str]]:
+    """
+    Headers authenticating requests as a user, without going through login.
+    """
+
+    def headers(user: models.User) -> Dict[str, str]:
+        token = security.create_access_token(user.id, user.email)
+        return {"Authorization": f"Bearer {token}"}
+
+    return headers
+
+
+@pytest.fixture
+def superuser(db: Session) -> models.User:
+    seed_superuser(db)
+    return db.scalar(select(models.User).where(models.User.email == SEED_SUPERUSER_EMAIL))
@@ -0,0 +1,59 @@
+import time
+
+import fakeredis
+import pytest
+
+from app.core.cache import CacheBackend, MemoryCacheBackend, RedisCacheBackend
+
+
+@pytest.fixture
+def server() -> fakeredis.FakeServer:
+    return fakeredis.FakeServer()
+
+
+def redis_backend(server: fakeredis.FakeServer) -> RedisCacheBackend:
+    return RedisCacheBackend(client=fakeredis.FakeRedis(server=server))
+
+
+def test_incomplete_backend_fails_on_creation():
+    class Incomplete(CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+@pytest.mark.parametrize("make_backend", [lambda server: MemoryCacheBackend(), redis_backend])
+def test_get_set_delete(server, make_backend):
+    cache = make_backend(server)
+    assert cache.get("key") is None
+    cache.set("key", "value", 60)
+    cache.set("other", "value", 60)
+    assert cache.get("key") == "value"
+    cache.delete("key", "other")
+    assert cache.get("key") is None and cache.get("other") is None
+    assert cache.stats.snapshot() == {"hits": 1, "misses": 3, "invalidations": 0}
+
+
+def test_redis_values_expire(server):
+    cache = redis_backend(server)
+    cache.set("key", "value", 60)
+    assert 0 < cache.client.ttl("key") <= 60
+
+
+def test_redis_invalidations_reach_other_workers(server):
+    publisher, subscriber = redis_backend(server), redis_backend(server)
+    received = []
+    subscriber.subscribe(received.append)
+    subscriber.start()
+    try:
+        # The listener thread subscribes asynchronously
+        deadline = time.monotonic() + 5
+        while not received and time.monotonic() < deadline:
+            publisher.publish({"table": "user", "id": 1})
+            time.sleep(0.05)
+    finally:
+        subscriber.close()
+    assert received and received[0] == {"table": "user", "id": 1}
+    assert publisher.stats.snapshot()["invalidations"] >= 1
@@ -0,0 +1,76 @@
+"""
+The hashing pool refuses work once its workers and queue are taken, which
+the API answers with 503 and Retry-After instead of queueing without bound.
+"""
+import time
+
+import pytest
+
+from app.core import security
+from app.core.config import settings
+from app.core.hashing import HashingOverloaded, PasswordHasher
+from tests.support import SEED_PASSWORD, SEED_SUPERUSER_EMAIL
+
+
+@pytest.fixture
+def pool():
+    hasher = PasswordHasher(pool_size=1, queue_depth=1)
+    yield hasher
+    hasher.shutdown()
+
+
+def test_inline_pool():
+    hasher = PasswordHasher(pool_size=0, queue_depth=0)
+    hashed = hasher.hash("secret")
+    assert hasher.verify("secret", hashed)
+    assert hasher.hash_many(["a", "b"])[1] != hashed
+    metrics = hasher.metrics.snapshot()
+    assert metrics["submitted"] == metrics["completed"] == 4
+    assert metrics["in_flight"] == metrics["rejected"] == 0
+    assert metrics["queue_wait_seconds_max"] == 0.0
+    assert metrics["hash_seconds_total"] > 0
+
+
+def test_saturated_pool_refuses_work(pool):
+    # One call runs on the only worker and one waits in the queue
+    running = pool.submit(time.sleep, 0.5)
+    queued = pool.submit(time.sleep, 0.5)
+    with pytest.raises(HashingOverloaded):
+        pool.submit(time.sleep, 0)
+    assert pool.metrics.snapshot()["in_flight"] == 2
+    running.result()
+    queued.result()
+    metrics = pool.metrics.snapshot()
+    assert (metrics["submitted"], metrics["completed"], metrics["rejected"]) == (2, 2, 1)
+    assert metrics["in_flight"] == 0
+    # The queued call waited for the running one to finish
+    assert metrics["queue_wait_seconds_max"] >= 0.4
+    assert metrics["hash_seconds_max"] >= 0.5
+    # Slots are released as calls finish
+    assert pool.verify("secret", pool.hash("secret"))
+
+
+def test_blocking_submit_waits_for_a_slot(pool):
+    pool.submit(time.sleep, 0.3)
+    pool.submit(time.sleep, 0.3)
+    assert pool.submit(time.sleep, 0, block=True).result() is None
+    assert pool.metrics.snapshot()["rejected"] == 0
+
+
+def test_hash_many_waits_for_slots(pool):
+    assert len(pool.hash_many(["a", "b", "c"])) == 3
+    assert pool.metrics.snapshot()["rejected"] == 0
+
+
+def test_overloaded_login_is_503(client, superuser, pool, monkeypatch):
+    monkeypatch.setattr(security, "hasher", pool)
+    busy = [pool.submit(time.sleep, 1), pool.submit(time.sleep, 1)]
+    response = client.post(
+        "/api/v1/auth/login/access-token",
+        json={"username": SEED_SUPERUSER_EMAIL, "password": SEED_PASSWORD},
+    )
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(settings.PASSWORD_HASH_RETRY_AFTER_SECONDS)
+    assert pool.metrics.snapshot()["rejected"] == 1
+    for future in busy:
+        future.result()
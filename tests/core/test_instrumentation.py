@@ -0,0 +1,54 @@
+from typing import Optional
+
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.core.instrumentation import instrument_routes
+
+
+class Busy(Exception):
+    pass
+
+
+def requests_total(path: str, status: int) -> Optional[float]:
+    return REGISTRY.get_sample_value(
+        "http_requests_total", {"method": "GET", "route": path, "status": str(status)}
+    )
+
+
+def make_client() -> TestClient:
+    app = FastAPI()
+
+    @app.exception_handler(Busy)
+    def busy_handler(request: Request, exc: Busy) -> JSONResponse:
+        return JSONResponse(status_code=503, content={"detail": "busy"})
+
+    @app.get("/test-instrumentation/busy")
+    def busy() -> None:
+        raise Busy()
+
+    @app.get("/test-instrumentation/missing/{id}")
+    async def missing(id: int) -> None:
+        raise HTTPException(status_code=404)
+
+    @app.get("/test-instrumentation/broken")
+    def broken() -> None:
+        raise RuntimeError()
+
+    instrument_routes(app.routes)
+    return TestClient(app, raise_server_exceptions=False)
+
+
+def test_status_of_handled_exceptions_is_recorded():
+    client = make_client()
+    assert client.get("/test-instrumentation/busy").status_code == 503
+    assert client.get("/test-instrumentation/missing/1").status_code == 404
+    assert client.get("/test-instrumentation/missing/x").status_code == 422
+    assert client.get("/test-instrumentation/broken").status_code == 500
+    assert requests_total("/test-instrumentation/busy", 503) == 1
+    assert requests_total("/test-instrumentation/busy", 500) is None
+    assert requests_total("/test-instrumentation/missing/{id}", 404) == 1
+    assert requests_total("/test-instrumentation/missing/{id}", 422) == 1
+    assert requests_total("/test-instrumentation/broken", 500) == 1
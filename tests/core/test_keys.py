@@ -0,0 +1,108 @@
+"""
+Key rotation: tokens name their key by `kid`, so a key can be accepted before
+it signs, and tokens of the previous key verify until it is dropped.
+"""
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from jose import jwk
+from jose.exceptions import JWTError
+
+from app.core.keys import JWTKey, KeyRing, load_key
+
+
+def pem(private_key) -> bytes:
+    return private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+
+
+def public_pem(private_key) -> bytes:
+    return private_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    )
+
+
+@pytest.fixture
+def old_private_key() -> ec.EllipticCurvePrivateKey:
+    return ec.generate_private_key(ec.SECP256R1())
+
+
+@pytest.fixture
+def old_key(old_private_key) -> JWTKey:
+    return load_key(pem(old_private_key), "ES256", signing=True)
+
+
+@pytest.fixture
+def new_private_key() -> Ed25519PrivateKey:
+    return Ed25519PrivateKey.generate()
+
+
+def test_rotation(old_private_key, old_key, new_private_key):
+    new_public = load_key(public_pem(new_private_key), "EdDSA", signing=False)
+    new_key = load_key(pem(new_private_key), "EdDSA", signing=True)
+    # The same key file gives the same kid whether it is loaded to sign or verify
+    assert new_public.kid == new_key.kid != old_key.kid
+
+    before = KeyRing([old_key], old_key.kid)
+    # Step 1: every worker accepts the new key, still signing with the old one
+    accepting = KeyRing([old_key, new_public], old_key.kid)
+    # Step 2: the new key signs, tokens of the old one still verify
+    old_public = load_key(public_pem(old_private_key), "ES256", signing=False)
+    rotated = KeyRing([new_key, old_public], new_key.kid)
+    # Step 3: the old key is dropped once its tokens have expired
+    after = KeyRing([new_key], new_key.kid)
+
+    old_token = before.sign({"sub": "1"})
+    new_token = rotated.sign({"sub": "1"})
+    assert accepting.decode(new_token) == {"sub": "1"}
+    assert rotated.decode(old_token) == {"sub": "1"}
+    assert after.decode(new_token) == {"sub": "1"}
+    with pytest.raises(JWTError, match="Unknown signing key"):
+        after.decode(old_token)
+    with pytest.raises(JWTError, match="Unknown signing key"):
+        before.decode(new_token)
+
+
+def test_hs256_tokens_without_kid():
+    hmac = jwk.construct("secret", "HS256")
+    legacy = KeyRing([JWTKey(None, "HS256", hmac, hmac)], None)
+    token = legacy.sign({"sub": "1"})
+    assert legacy.decode(token) == {"sub": "1"}
+
+
+def test_tampered_token_is_rejected(old_key):
+    keyring = KeyRing([old_key], old_key.kid)
+    header, _, signature = keyring.sign({"sub": "1"}).split(".")
+    forged = keyring.sign({"sub": "2"}).split(".")[1]
+    with pytest.raises(JWTError):
+        keyring.decode(".".join([header, forged, signature]))
+
+
+def test_jwks_lists_public_asymmetric_keys(old_key, new_private_key):
+    new_public = load_key(public_pem(new_private_key), "EdDSA", signing=False)
+    hmac = jwk.construct("secret", "HS256")
+    keyring = KeyRing([JWTKey(None, "HS256", hmac, hmac), old_key, new_public], old_key.kid)
+    keys = {key["kid"]: key for key in keyring.jwks()["keys"]}
+    assert set(keys) == {old_key.kid, new_public.kid}
+    assert keys[old_key.kid]["kty"] == "EC" and keys[old_key.kid]["use"] == "sig"
+    assert keys[new_public.kid] == {
+        "kty": "OKP",
+        "crv": "Ed25519",
+        "alg": "EdDSA",
+        "x": keys[new_public.kid]["x"],
+        "kid": new_public.kid,
+        "use": "sig",
+    }
+    # No private parts, and the HS256 secret is never published
+    assert all("d" not in key and key["kty"] != "oct" for key in keyring.jwks()["keys"])
+    # A service that only has the JWKS verifies the ring's tokens
+    token = keyring.sign({"sub": "1"})
+    published = [
+        JWTKey(kid, key["alg"], None, jwk.construct(key, key["alg"]))
+        for kid, key in keys.items()
+    ]
+    assert KeyRing(published, old_key.kid).decode(token) == {"sub": "1"}
@@ -0,0 +1,122 @@
+import socket
+import time
+from collections import Counter
+from typing import Callable, Iterator, List, Set, Tuple
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from app.core.config import settings
+from app.core.mail import EmailBatchJob, EmailDispatcher, EmailJob, SMTPConnection
+
+TEMPLATE = "test_email.html"
+
+
+class Handler:
+    """
+    Accepts mail, except that `greylisted@` is refused with a 4xx the first
+    time, `busy@` gets a 4xx to its first DATA, and `unknown@` and
+    `rejected@` are refused with a 5xx.
+    """
+
+    def __init__(self) -> None:
+        self.delivered: List[str] = []
+        self.sessions: Set[Tuple[str, int]] = set()
+        self.attempts: Counter = Counter()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        self.attempts[address] += 1
+        if address.startswith("unknown@"):
+            return "550 No such user"
+        if address.startswith("greylisted@") and self.attempts[address] == 1:
+            return "450 Greylisted, try again later"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        self.sessions.add(session.peer)
+        (address,) = envelope.rcpt_tos
+        if address.startswith("busy@") and self.attempts[address] == 1:
+            return "451 Try again later"
+        if address.startswith("rejected@"):
+            return "554 Message rejected"
+        self.delivered.append(address)
+        return "250 Message accepted"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def smtp_server() -> Iterator[Tuple[Handler, int]]:
+    handler = Handler()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    yield handler, controller.port
+    controller.stop()
+
+
+@pytest.fixture
+def dispatcher(smtp_server, monkeypatch) -> Iterator[EmailDispatcher]:
+    monkeypatch.setattr(settings, "EMAILS_FROM_EMAIL", "noreply@example.com")
+    _, port = smtp_server
+    dispatcher = EmailDispatcher(
+        workers=1,
+        queue_size=100,
+        max_retries=2,
+        backoff=0.05,
+        connection_factory=lambda: SMTPConnection("127.0.0.1", port),
+    )
+    dispatcher.start()
+    yield dispatcher
+    dispatcher.stop()
+
+
+def job(email_to: str) -> EmailJob:
+    return EmailJob(email_to, "Test", TEMPLATE, {"email": email_to})
+
+
+def wait_for(condition: Callable[[], bool], timeout: float = 5) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_session_is_reused(smtp_server, dispatcher):
+    handler, _ = smtp_server
+    for i in range(3):
+        dispatcher.enqueue(job(f"user{i}@example.com"))
+    dispatcher.enqueue(
+        EmailBatchJob("Test", TEMPLATE, [(f"batch{i}@example.com", {}) for i in range(3)])
+    )
+    wait_for(lambda: dispatcher.metrics.snapshot()["sent"] == 6)
+    assert len(handler.delivered) == 6
+    assert len(handler.sessions) == 1
+
+
+@pytest.mark.parametrize("address", ["busy@example.com", "greylisted@example.com"])
+def test_4xx_is_retried(smtp_server, dispatcher, address):
+    handler, _ = smtp_server
+    dispatcher.enqueue(job(address))
+    wait_for(lambda: dispatcher.metrics.snapshot()["sent"] == 1)
+    metrics = dispatcher.metrics.snapshot()
+    assert (metrics["retried"], metrics["failed"]) == (1, 0)
+    assert handler.delivered == [address]
+
+
+@pytest.mark.parametrize("address", ["rejected@example.com", "unknown@example.com"])
+def test_5xx_is_dropped(smtp_server, dispatcher, address):
+    handler, _ = smtp_server
+    dispatcher.enqueue(job(address))
+    dispatcher.enqueue(job("after@example.com"))
+    wait_for(lambda: dispatcher.metrics.snapshot()["sent"] == 1)
+    metrics = dispatcher.metrics.snapshot()
+    assert (metrics["retried"], metrics["failed"]) == (0, 1)
+    assert handler.attempts[address] == 1
+    # The refusal doesn't cost the session
+    assert handler.delivered == ["after@example.com"]
+    assert len(handler.sessions) == 1
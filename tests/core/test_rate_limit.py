@@ -0,0 +1,26 @@
+import pytest
+
+from app.core.rate_limit import MemoryRateLimiter, RateLimiter, parse_limit
+
+
+def test_incomplete_limiter_fails_on_creation():
+    class Incomplete(RateLimiter):
+        pass
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_parse_limit():
+    assert parse_limit("5/minute") == (5, 60)
+    with pytest.raises(ValueError):
+        parse_limit("5/fortnight")
+
+
+@pytest.mark.anyio
+async def test_memory_limiter_rejects_over_limit():
+    limiter = MemoryRateLimiter()
+    assert [await limiter.hit("key", 3, 3600) for _ in range(3)] == [None] * 3
+    assert await limiter.hit("key", 3, 3600) > 0
+    assert await limiter.hit("other", 3, 3600) is None
+    assert limiter.stats.snapshot() == {"allowed": 4, "rejected": 1}
@@ -0,0 +1,35 @@
+from app.core.revocation import RevocationList
+
+
+def test_revoked_jti_and_sid():
+    revocations = RevocationList(sync_seconds=60)
+    revocations.add("refresh", 100.0)
+    assert revocations.is_revoked({"jti": "refresh"})
+    # Access tokens issued with a revoked refresh token are revoked with it
+    assert revocations.is_revoked({"jti": "access", "sid": "refresh"})
+    assert not revocations.is_revoked({"jti": "other", "sid": "other"})
+
+
+def test_user_revocation_covers_earlier_tokens():
+    revocations = RevocationList(sync_seconds=60)
+    revocations.add_user(1, revoked_at=50.0, expires_at=100.0)
+    assert revocations.is_revoked({"sub": "1", "iat": 49.5})
+    assert not revocations.is_revoked({"sub": "1", "iat": 50.5})
+    assert not revocations.is_revoked({"sub": "2", "iat": 0})
+
+
+def test_eviction_skips_superseded_entries():
+    revocations = RevocationList(sync_seconds=60)
+    revocations.add("jti", 100.0)
+    revocations.add("jti", 200.0)
+    revocations.add_user(1, revoked_at=10.0, expires_at=100.0)
+    revocations.add_user(1, revoked_at=20.0, expires_at=200.0)
+    revocations.add("short", 50.0)
+    revocations.evict_expired(150.0)
+    # The entries expiring at 100 were replaced by later revocations of the same keys
+    assert len(revocations) == 2
+    assert revocations.is_revoked({"jti": "jti"})
+    assert revocations.is_revoked({"sub": "1", "iat": 15.0})
+    assert not revocations.is_revoked({"jti": "short"})
+    revocations.evict_expired(250.0)
+    assert len(revocations) == 0
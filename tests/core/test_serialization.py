@@ -0,0 +1,61 @@
+import json
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import List, Optional
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+
+from app import schemas
+from app.core.serialization import serializer_for
+from app.models import User
+
+
+class UserWithLastLogin(schemas.User):
+    last_login: Optional[datetime] = None
+
+
+def default_path(schema, rows: List) -> bytes:
+    # What a route with `response_model=List[schema]` sends
+    return json.dumps(jsonable_encoder([schema.from_orm(row) for row in rows])).encode()
+
+
+def users() -> List[User]:
+    return [
+        User(id=1, email="one@example.com", full_name="One", is_active=True, is_superuser=True),
+        User(id=2, email="two@example.com", full_name=None, is_active=False, is_superuser=False),
+        User(id=3, email="three@example.com", full_name="Zoë", is_active=None, is_superuser=False),
+    ]
+
+
+def test_user_parity():
+    rows = users()
+    assert json.loads(serializer_for(schemas.User).dumps(rows)) == json.loads(
+        default_path(schemas.User, rows)
+    )
+    assert json.loads(serializer_for(schemas.User).dumps(rows[1])) == json.loads(
+        default_path(schemas.User, rows[1:2])
+    )[0]
+
+
+@pytest.mark.parametrize(
+    "last_login",
+    [
+        None,
+        datetime(2024, 1, 2, 3, 4, 5),
+        datetime(2024, 1, 2, 3, 4, 5, 678901, tzinfo=timezone.utc),
+        datetime(2024, 1, 2, 3, 4, 5, tzinfo=timezone(timedelta(hours=2))),
+    ],
+)
+def test_datetime_parity(last_login):
+    rows = [
+        SimpleNamespace(**schemas.User.from_orm(user).dict(), last_login=last_login)
+        for user in users()
+    ]
+    assert json.loads(serializer_for(UserWithLastLogin).dumps(rows)) == json.loads(
+        default_path(UserWithLastLogin, rows)
+    )
+
+
+def test_fields_follow_schema():
+    assert serializer_for(schemas.User).fields == list(schemas.User.__fields__)
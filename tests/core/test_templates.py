@@ -0,0 +1,110 @@
+"""
+Templates are compiled once and recompiled only when their file's mtime
+changes, and never more often than `check_interval` allows.
+"""
+import os
+from types import SimpleNamespace
+
+import pytest
+from jinja2 import TemplateNotFound
+
+from app.core import mail
+from app.core.config import settings
+from app.core.mail import TemplateRegistry
+
+NAME = "greeting.html"
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(mail, "time", SimpleNamespace(monotonic=clock.monotonic))
+    return clock
+
+
+@pytest.fixture
+def directory(tmp_path):
+    write(tmp_path / NAME, "Hello {{ name }}", mtime=1)
+    return tmp_path
+
+
+def write(path, source: str, *, mtime: float) -> None:
+    path.write_text(source)
+    os.utime(path, (mtime, mtime))
+
+
+def test_edit_is_picked_up_after_the_interval(directory, clock):
+    registry = TemplateRegistry(str(directory), check_interval=2)
+    assert registry.render(NAME, {"name": "a"}) == "Hello a"
+
+    write(directory / NAME, "Bye {{ name }}", mtime=2)
+    clock.now += 1
+    assert registry.render(NAME, {"name": "a"}) == "Hello a"
+
+    clock.now += 1
+    assert registry.render(NAME, {"name": "a"}) == "Bye a"
+
+
+def test_unchanged_file_is_not_recompiled(directory, clock):
+    registry = TemplateRegistry(str(directory), check_interval=2)
+    template = registry.get(NAME)
+    clock.now += 5
+    assert registry.get(NAME) is template
+
+
+def test_no_reload_when_interval_is_zero(directory, clock):
+    registry = TemplateRegistry(str(directory), check_interval=0)
+    registry.load_all()
+    write(directory / NAME, "Bye {{ name }}", mtime=2)
+    clock.now += 3600
+    assert registry.render(NAME, {"name": "a"}) == "Hello a"
+
+
+def test_deleted_file_keeps_compiled_copy(directory, clock):
+    registry = TemplateRegistry(str(directory), check_interval=2)
+    registry.load_all()
+    (directory / NAME).unlink()
+    clock.now += 5
+    assert registry.render(NAME, {"name": "a"}) == "Hello a"
+
+
+def test_missing_template(directory):
+    registry = TemplateRegistry(str(directory))
+    with pytest.raises(TemplateNotFound):
+        registry.get("missing.html")
+
+
+def test_html_is_escaped(directory):
+    registry = TemplateRegistry(str(directory))
+    assert registry.render(NAME, {"name": "<b>"}) == "Hello &lt;b&gt;"
+
+
+def test_render_batch(directory):
+    registry = TemplateRegistry(str(directory))
+    environments = [{"name": "a"}, {"name": "b"}, {"name": "c"}]
+    assert registry.render_batch(NAME, environments) == ["Hello a", "Hello b", "Hello c"]
+    assert registry.render_batch(NAME, []) == []
+
+
+def test_render_batch_looks_template_up_once(directory, monkeypatch):
+    registry = TemplateRegistry(str(directory))
+    lookups = []
+    get = registry.get
+    monkeypatch.setattr(registry, "get", lambda name: lookups.append(name) or get(name))
+    registry.render_batch(NAME, ({"name": str(i)} for i in range(10)))
+    assert lookups == [NAME]
+
+
+def test_shipped_templates_compile():
+    registry = TemplateRegistry(settings.EMAIL_TEMPLATES_DIR)
+    registry.load_all()
+    names = sorted(os.listdir(settings.EMAIL_TEMPLATES_DIR))
+    assert names and all(registry.get(name) for name in names)
@@ -0,0 +1,25 @@
+import pytest
+
+from app import crud
+from app.crud.base import encode_cursor
+
+
+def test_cursor_round_trip(db):
+    cursor = encode_cursor("email", "user1@example.com", 1)
+    assert crud.user.get_multi_keyset(db, cursor=cursor, order_by="email") == ([], None)
+
+
+@pytest.mark.parametrize(
+    "order_by,value,id",
+    [
+        ("id", None, "1"),
+        ("id", None, True),
+        ("id", None, 1.5),
+        ("email", 1, 1),
+        ("email", None, 1),
+        ("email", "user1@example.com", [1]),
+    ],
+)
+def test_cursor_of_wrong_type_is_rejected(db, order_by, value, id):
+    with pytest.raises(ValueError):
+        crud.user.get_multi_keyset(db, cursor=encode_cursor(order_by, value, id), order_by=order_by)
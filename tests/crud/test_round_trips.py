@@ -0,0 +1,71 @@
+"""
+Database round trips per CRUD write: a write is its INSERT/UPDATE/DELETE
+plus the COMMIT, with no reload afterwards, and a unit of work commits
+once for all of its writes.
+"""
+from contextlib import contextmanager
+from typing import Iterator, List
+
+import pytest
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from app import crud, schemas
+from app.models import Item
+from tests.support import seed_users
+
+ITEM_IN = schemas.ItemCreate(title="Round trip", description="Counted")
+
+
+@contextmanager
+def counting(engine: Engine) -> Iterator[List[str]]:
+    sent: List[str] = []
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        sent.append(statement.split(None, 1)[0].upper())
+
+    def on_commit(conn) -> None:
+        sent.append("COMMIT")
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    event.listen(engine, "commit", on_commit)
+    try:
+        yield sent
+    finally:
+        event.remove(engine, "before_cursor_execute", on_execute)
+        event.remove(engine, "commit", on_commit)
+
+
+@pytest.fixture
+def item(db) -> Item:
+    seed_users(db, 1)
+    return crud.item.create_with_owner(db, obj_in=ITEM_IN, owner_id=1)
+
+
+def test_create(engine, db):
+    seed_users(db, 1)
+    with counting(engine) as sent:
+        crud.item.create_with_owner(db, obj_in=ITEM_IN, owner_id=1)
+    assert sent == ["INSERT", "COMMIT"]
+
+
+def test_update(engine, db, item):
+    with counting(engine) as sent:
+        crud.item.update(db, db_obj=item, obj_in={"title": "Updated"})
+    assert sent == ["UPDATE", "COMMIT"]
+
+
+def test_remove(engine, db, item):
+    with counting(engine) as sent:
+        crud.item.remove(db, id=item.id)
+    assert sent == ["DELETE", "COMMIT"]
+
+
+def test_unit_of_work_commits_once(engine, db):
+    seed_users(db, 1)
+    with counting(engine) as sent:
+        with crud.unit_of_work(db):
+            for _ in range(3):
+                crud.item.create_with_owner(db, obj_in=ITEM_IN, owner_id=1)
+    assert sent.count("COMMIT") == 1
+    assert len(sent) <= 4
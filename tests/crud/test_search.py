@@ -0,0 +1,77 @@
+"""
+Search needs Postgres: websearch_to_tsquery, GIN indexes and pg_trgm's word
+similarity. The statements are checked everywhere; the results only when
+TEST_DATABASE_URL names a Postgres database.
+"""
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from app import crud, schemas
+from app.models import Item
+
+
+def compiled(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.dialect(paramstyle="named")))
+
+
+def test_search_query():
+    sql = compiled(crud.item.search_query("blue widget"))
+    assert "item.search_vector @@ websearch_to_tsquery(" in sql
+    assert "<% item.title" in sql
+    assert "ts_rank(item.search_vector" in sql
+    assert "word_similarity(" in sql
+
+
+def test_user_search_query_covers_its_fields():
+    sql = compiled(crud.user.search_query("ada"))
+    assert '<% "user".full_name' in sql and '<% "user".email' in sql
+
+
+@pytest.fixture
+def owner(pg_db):
+    return crud.user.create(
+        pg_db, obj_in=schemas.UserCreate(email="owner@example.com", password="x")
+    )
+
+
+@pytest.fixture
+def items(pg_db, owner):
+    titles = [
+        ("Blue widget", "A small blue widget"),
+        ("Red widget", "Large and red"),
+        ("Gadget", "Goes with the blue widget"),
+        ("Sprocket", "Unrelated"),
+    ]
+    for title, description in titles:
+        crud.item.create_with_owner(
+            pg_db,
+            obj_in=schemas.ItemCreate(title=title, description=description),
+            owner_id=owner.id,
+        )
+
+
+@pytest.mark.postgres
+def test_full_text_search_ranks_matches(pg_db, items):
+    results = crud.item.search(pg_db, q="blue widget")
+    assert [item.title for item in results][:2] == ["Blue widget", "Gadget"]
+    assert "Sprocket" not in {item.title for item in results}
+
+
+@pytest.mark.postgres
+def test_web_search_syntax(pg_db, items):
+    results = crud.item.search(pg_db, q="widget -blue")
+    # "Blue widget" still matches by title similarity, but only the text match ranks
+    assert results[0].title == "Red widget"
+    assert "Gadget" not in {item.title for item in results}
+
+
+@pytest.mark.postgres
+def test_trigram_search_finds_prefixes_and_typos(pg_db, items):
+    assert "Sprocket" in {item.title for item in crud.item.search(pg_db, q="sprock")}
+    assert "Sprocket" in {item.title for item in crud.item.search(pg_db, q="sprockte")}
+
+
+@pytest.mark.postgres
+def test_search_filters(pg_db, items, owner):
+    assert crud.item.search(pg_db, q="widget", owner_id=owner.id + 1) == []
+    assert all(isinstance(item, Item) for item in crud.item.search(pg_db, q="widget", limit=1))
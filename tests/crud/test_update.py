@@ -0,0 +1,31 @@
+import pytest
+from sqlalchemy import select
+
+from app import crud
+from app.models import Item, User
+from tests.support import seed_items, seed_users
+
+
+@pytest.fixture
+def owner(db) -> User:
+    seed_users(db, 1)
+    seed_items(db, 2, owners=1)
+    return db.scalar(select(User))
+
+
+def test_update_ignores_relationships(db, owner):
+    crud.user.update(db, db_obj=owner, obj_in={"full_name": "Renamed", "items": []})
+    db.expire_all()
+    user = db.get(User, owner.id)
+    assert user.full_name == "Renamed"
+    assert len(user.items) == 2
+
+
+@pytest.mark.anyio
+async def test_async_update_ignores_relationships(db, async_db, owner):
+    user = await crud.async_user.get(async_db, owner.id)
+    await crud.async_user.update(
+        async_db, db_obj=user, obj_in={"full_name": "Renamed", "items": []}
+    )
+    assert db.scalar(select(User.full_name)) == "Renamed"
+    assert len(db.scalars(select(Item).where(Item.owner_id == owner.id)).all()) == 2
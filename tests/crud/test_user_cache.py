@@ -0,0 +1,96 @@
+import json
+
+import fakeredis
+import pytest
+
+from app import schemas
+from app.core.cache import RedisCacheBackend
+from app.crud.base import unit_of_work
+from app.crud.crud_user import AsyncCRUDUser, CRUDUser, email_cache_key
+from app.models import User
+
+
+@pytest.fixture
+def cache() -> RedisCacheBackend:
+    return RedisCacheBackend(client=fakeredis.FakeRedis())
+
+
+@pytest.fixture
+def crud_user(cache) -> CRUDUser:
+    return CRUDUser(User, cache=cache)
+
+
+@pytest.fixture
+def user(db, crud_user) -> User:
+    user = crud_user.create(
+        db, obj_in=schemas.UserCreate(email="user@example.com", password="password")
+    )
+    db.info.clear()
+    db.expunge_all()
+    return user
+
+
+def test_get_reads_through(db, cache, crud_user, user):
+    assert crud_user.get(db, user.id).email == user.email
+    db.expunge_all()
+    assert crud_user.get(db, user.id).email == user.email
+    assert cache.stats.snapshot()["hits"] == 1
+
+
+def test_password_hash_is_not_cached(db, cache, crud_user, user):
+    crud_user.get_by_email(db, email=user.email)
+    cached = json.loads(cache.get(crud_user.cache_key(user.id)))
+    assert cached["email"] == user.email
+    assert "hashed_password" not in cached
+
+
+def test_authenticate_reads_hash_from_db(db, crud_user, user):
+    crud_user.get_by_email(db, email=user.email)
+    db.expunge_all()
+    assert crud_user.get(db, user.id) is not None
+    assert crud_user.authenticate(db, email=user.email, password="password") is not None
+    assert crud_user.authenticate(db, email=user.email, password="wrong") is None
+
+
+def test_password_update_of_cached_row_is_saved(db, crud_user, user):
+    crud_user.get(db, user.id)
+    db.expunge_all()
+    cached_user = crud_user.get(db, user.id)
+    crud_user.update(db, db_obj=cached_user, obj_in={"password": "changed"})
+    db.info.clear()
+    db.expunge_all()
+    assert crud_user.authenticate(db, email=user.email, password="changed") is not None
+
+
+def test_writes_invalidate(db, cache, crud_user, user):
+    crud_user.get_by_email(db, email=user.email)
+    pubsub = cache.client.pubsub(ignore_subscribe_messages=True)
+    pubsub.subscribe(cache.channel)
+    pubsub.get_message()
+    crud_user.update(db, db_obj=crud_user.get(db, user.id), obj_in={"full_name": "Renamed"})
+    assert cache.get(crud_user.cache_key(user.id)) is None
+    assert cache.get(email_cache_key(user.email)) is None
+    message = pubsub.get_message(timeout=1)
+    assert json.loads(message["data"]) == {"table": "user", "id": user.id}
+
+
+def test_unit_of_work_invalidates_on_commit(db, cache, crud_user, user):
+    crud_user.get(db, user.id)
+    with unit_of_work(db):
+        crud_user.update(db, db_obj=crud_user.get(db, user.id), obj_in={"full_name": "Renamed"})
+        assert cache.get(crud_user.cache_key(user.id)) is not None
+    assert cache.get(crud_user.cache_key(user.id)) is None
+
+
+@pytest.mark.anyio
+async def test_async_reads_through(async_db, cache, user):
+    async_crud_user = AsyncCRUDUser(User, cache=cache)
+    assert (await async_crud_user.get_by_email(async_db, email=user.email)).id == user.id
+    async_db.expunge_all()
+    hits = cache.stats.snapshot()["hits"]
+    assert (await async_crud_user.get_by_email(async_db, email=user.email)).id == user.id
+    assert (await async_crud_user.get(async_db, user.id)).email == user.email
+    assert cache.stats.snapshot()["hits"] == hits + 3
+    assert await async_crud_user.authenticate(
+        async_db, email=user.email, password="password"
+    ) is not None
@@ -0,0 +1,78 @@
+import pytest
+from sqlalchemy import create_engine, exc, text
+
+from app.core.config import settings
+from app.db.pool import (
+    InstrumentedAsyncQueuePool,
+    InstrumentedNullPool,
+    InstrumentedQueuePool,
+    engine_options,
+    pool_status,
+)
+
+
+@pytest.fixture
+def pool_settings(monkeypatch):
+    for name, value in {
+        "DB_POOL_SIZE": 1,
+        "DB_MAX_OVERFLOW": 0,
+        "DB_POOL_TIMEOUT": 0.1,
+        "DB_POOL_RECYCLE": 600,
+        "DB_POOL_PRE_PING": False,
+        "DB_PGBOUNCER_MODE": False,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+
+
+def test_queue_pool_options(pool_settings):
+    assert engine_options() == {
+        "pool_pre_ping": False,
+        "poolclass": InstrumentedQueuePool,
+        "pool_size": 1,
+        "max_overflow": 0,
+        "pool_timeout": 0.1,
+        "pool_recycle": 600,
+    }
+    assert engine_options(asyncio=True)["poolclass"] is InstrumentedAsyncQueuePool
+
+
+def test_pgbouncer_options(pool_settings, monkeypatch):
+    monkeypatch.setattr(settings, "DB_PGBOUNCER_MODE", True)
+    # PgBouncer does the pooling: no pool sizes, a connection per checkout
+    assert engine_options() == {"pool_pre_ping": False, "poolclass": InstrumentedNullPool}
+    connect_args = engine_options(asyncio=True)["connect_args"]
+    assert connect_args["statement_cache_size"] == 0
+    assert connect_args["prepared_statement_cache_size"] == 0
+    name = connect_args["prepared_statement_name_func"]
+    assert name() != name()
+
+
+def test_pool_metrics_count_checkouts_and_timeouts(pool_settings, tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", **engine_options())
+    with engine.connect() as connection:
+        connection.execute(text("SELECT 1"))
+        assert pool_status(engine)["in_use"] == 1
+        # The only connection is taken and there is no overflow
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+    status = pool_status(engine)
+    assert status["pool"] == "InstrumentedQueuePool"
+    assert (status["size"], status["checked_in"], status["max_overflow"]) == (1, 1, 0)
+    assert (status["checkouts"], status["timeouts"], status["in_use"]) == (1, 1, 0)
+    assert status["checkout_wait_seconds_max"] < 0.1
+    # Disposing swaps in a new pool, which keeps counting into the same metrics
+    engine.dispose()
+    with engine.connect():
+        pass
+    assert pool_status(engine)["checkouts"] == 2
+
+
+def test_null_pool_metrics(pool_settings, monkeypatch, tmp_path):
+    monkeypatch.setattr(settings, "DB_PGBOUNCER_MODE", True)
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", **engine_options())
+    with engine.connect(), engine.connect():
+        assert pool_status(engine)["in_use"] == 2
+    status = pool_status(engine)
+    assert status["pool"] == "InstrumentedNullPool"
+    assert (status["checkouts"], status["in_use"]) == (2, 0)
+    assert "size" not in status
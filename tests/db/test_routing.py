@@ -0,0 +1,120 @@
+from collections import Counter
+from typing import Dict, List
+
+import pytest
+from sqlalchemy import create_engine, event, select, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import crud, schemas
+from app.db.routing import USE_PRIMARY, ReplicaSet, RoutingSession
+from app.models import User
+from tests.support import get_engine, seed_users
+
+
+@pytest.fixture
+def replica_engines(tmp_path) -> List[Engine]:
+    engines = [get_engine(f"sqlite:///{tmp_path / f'replica_{i}.db'}") for i in range(2)]
+    yield engines
+    for engine in engines:
+        engine.dispose()
+
+
+@pytest.fixture
+def statements(engine, replica_engines) -> Dict[str, List[str]]:
+    """
+    The statements each database ran, by name: "primary", "replica_0", "replica_1".
+    """
+    sent: Dict[str, List[str]] = {}
+    names = {"primary": engine, **{f"replica_{i}": e for i, e in enumerate(replica_engines)}}
+    for name, named_engine in names.items():
+        # Every database gets the same seed rows; no replication runs between them
+        with sessionmaker(bind=named_engine)() as db:
+            seed_users(db, 3)
+        sent[name] = []
+        event.listen(
+            named_engine,
+            "before_cursor_execute",
+            lambda conn, cursor, statement, *args, name=name: sent[name].append(statement),
+        )
+    return sent
+
+
+def routed_sessionmaker(engine: Engine, replicas: ReplicaSet) -> sessionmaker:
+    return sessionmaker(
+        class_=RoutingSession, bind=engine, replicas=replicas, expire_on_commit=False
+    )
+
+
+def test_reads_are_spread_over_replicas(engine, replica_engines, statements):
+    Session = routed_sessionmaker(engine, ReplicaSet(replica_engines))
+    for _ in range(4):
+        with Session() as db:
+            db.execute(select(User.id))
+            db.execute(select(User.email))
+    assert statements["primary"] == []
+    # A session keeps to the replica it picked
+    assert len(statements["replica_0"]) == len(statements["replica_1"]) == 4
+
+
+def test_writes_pin_the_session_to_the_primary(engine, replica_engines, statements):
+    Session = routed_sessionmaker(engine, ReplicaSet(replica_engines))
+    with Session() as db:
+        user = crud.user.get(db, 1)
+        assert statements["primary"] == []
+        crud.user.update(db, db_obj=user, obj_in=schemas.UserUpdate(full_name="Renamed"))
+        assert db.info[USE_PRIMARY]
+        replica_reads = sum(len(sent) for name, sent in statements.items() if name != "primary")
+        # Read after write: the primary has the new name, the replicas don't
+        assert db.scalar(select(User.full_name).where(User.id == 1)) == "Renamed"
+    assert sum(len(sent) for name, sent in statements.items() if name != "primary") == replica_reads
+    assert any(statement.startswith("UPDATE") for statement in statements["primary"])
+
+
+def test_flush_and_locking_reads_go_to_the_primary(engine, replica_engines, statements):
+    Session = routed_sessionmaker(engine, ReplicaSet(replica_engines))
+    with Session() as db:
+        db.add(User(email="new@example.com", hashed_password="x"))
+        db.flush()
+        assert db.info[USE_PRIMARY]
+    with Session() as db:
+        db.execute(select(User.id).with_for_update())
+        assert db.info[USE_PRIMARY]
+    with Session() as db:
+        db.execute(text("SELECT 1"))
+        assert db.info[USE_PRIMARY]
+    assert all(sent == [] for name, sent in statements.items() if name != "primary")
+
+
+def test_failed_replica_is_ejected(engine, replica_engines, statements, tmp_path):
+    broken = create_engine(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    replicas = ReplicaSet([broken, replica_engines[0]], eject_seconds=60)
+    Session = routed_sessionmaker(engine, replicas)
+    with pytest.raises(OperationalError):
+        with Session() as db:
+            db.execute(select(User.id))
+    assert replicas.healthy() == [replica_engines[0]]
+    hits = Counter()
+    for _ in range(4):
+        with Session() as db:
+            db.execute(select(User.id))
+            hits[db.get_bind(clause=select(User))] += 1
+    assert hits == {replica_engines[0]: 4}
+    assert statements["primary"] == []
+
+
+def test_without_replicas_everything_goes_to_the_primary(engine, replica_engines, statements):
+    with routed_sessionmaker(engine, None)() as db:
+        db.execute(select(User.id))
+    assert len(statements["primary"]) == 1
+
+
+def test_batch_reads_stay_on_a_replica(engine, replica_engines, statements):
+    Session = routed_sessionmaker(engine, ReplicaSet(replica_engines))
+    with Session() as db:
+        users = crud.user.get_many(db, [3, 1])
+        assert [user.id for user in users] == [3, 1]
+        assert not db.info.get(USE_PRIMARY)
+    assert statements["primary"] == []
+    assert sum(len(statements[f"replica_{i}"]) for i in range(2)) == 1
@@ -0,0 +1,145 @@
+"""
+Database setup shared by the tests and the benchmark scripts.
+
+The schema is created from the models rather than the migrations, on
+SQLite as well as Postgres: the shims below stand in for the Postgres
+features SQLite lacks.
+"""
+from sqlalchemy import PrimaryKeyConstraint, create_engine, event, func, insert, select, text
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session, sessionmaker
+from sqlalchemy.schema import CreateColumn
+
+from app.db.base import Base, Item, Tenant, User
+from app.db.tenancy import DEFAULT_TENANT_ID
+
+# Seeded users all share one precomputed hash so seeding does no bcrypt work
+SEED_PASSWORD = "password"
+SEED_PASSWORD_HASH = "$2b$12$ukO4BXBSFZVMrk5F4EF3S.YvATnfEI241hek6rRzN.LMvFbxJy1mO"
+SEED_SUPERUSER_EMAIL = "admin@example.com"
+
+
+@compiles(TSVECTOR, "sqlite")
+def _compile_tsvector_sqlite(type_, compiler, **kw) -> str:
+    return "TEXT"
+
+
+def _autoincrements_composite_key(table) -> bool:
+    return table.autoincrement_column is not None and len(table.primary_key.columns) > 1
+
+
+@compiles(CreateColumn, "sqlite")
+def _compile_column_sqlite(element, compiler, **kw) -> str:
+    # SQLite only generates ids for an INTEGER PRIMARY KEY, so a table keyed by
+    # (tenant_id, id) is keyed by id alone here, and the pair is made unique
+    column = element.element
+    table = column.table
+    if column is table.autoincrement_column and _autoincrements_composite_key(table):
+        return f"{compiler.preparer.format_column(column)} INTEGER NOT NULL PRIMARY KEY"
+    return compiler.visit_create_column(element, **kw)
+
+
+@compiles(PrimaryKeyConstraint, "sqlite")
+def _compile_primary_key_sqlite(constraint, compiler, **kw) -> str:
+    if _autoincrements_composite_key(constraint.table):
+        columns = ", ".join(compiler.preparer.quote(c.name) for c in constraint.columns)
+        return f"UNIQUE ({columns})"
+    return compiler.visit_primary_key_constraint(constraint, **kw)
+
+
+def add_sqlite_functions(dbapi_connection, connection_record) -> None:
+    # Stand-in so the generated search_vector columns can be computed; full-text
+    # search itself still needs Postgres
+    dbapi_connection.create_function(
+        "to_tsvector", 2, lambda config, document: document, deterministic=True
+    )
+
+
+def get_engine(url: str) -> Engine:
+    """
+    Engine on `url` with the schema created and the default tenant seeded.
+    """
+    engine = create_engine(url)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", add_sqlite_functions)
+    else:
+        with engine.begin() as connection:
+            connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as connection:
+        # Seeded by the migrations; rows default to it
+        if connection.scalar(select(Tenant.id).where(Tenant.id == DEFAULT_TENANT_ID)) is None:
+            connection.execute(insert(Tenant).values(id=DEFAULT_TENANT_ID, name="default"))
+    return engine
+
+
+def get_session(engine: Engine) -> Session:
+    return sessionmaker(
+        autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
+    )()
+
+
+def seed_users(db: Session, n: int, batch_size: int = 10_000) -> None:
+    """
+    Top the user table up to `n` rows with executemany batches.
+    """
+    existing = db.scalar(select(func.count()).select_from(User))
+    for start in range(existing, n, batch_size):
+        stop = min(start + batch_size, n)
+        db.execute(
+            insert(User),
+            [
+                {
+                    "email": f"user{i}@example.com",
+                    "full_name": f"User {i}",
+                    "hashed_password": SEED_PASSWORD_HASH,
+                    "is_active": True,
+                    "is_superuser": False,
+                }
+                for i in range(start, stop)
+            ],
+        )
+        db.commit()
+
+
+def seed_superuser(db: Session) -> None:
+    """
+    Add the superuser the tests and benchmarks log in as, if it's missing.
+    """
+    if db.scalar(select(User.id).where(User.email == SEED_SUPERUSER_EMAIL)) is None:
+        db.execute(
+            insert(User),
+            [
+                {
+                    "email": SEED_SUPERUSER_EMAIL,
+                    "full_name": "Admin",
+                    "hashed_password": SEED_PASSWORD_HASH,
+                    "is_active": True,
+                    "is_superuser": True,
+                }
+            ],
+        )
+        db.commit()
+
+
+def seed_items(db: Session, n: int, owners: int, batch_size: int = 10_000) -> None:
+    """
+    Top the item table up to `n` rows spread round-robin over the first `owners` users.
+    """
+    existing = db.scalar(select(func.count()).select_from(Item))
+    for start in range(existing, n, batch_size):
+        stop = min(start + batch_size, n)
+        db.execute(
+            insert(Item),
+            [
+                {
+                    "title": f"Item {i}",
+                    "description": f"Description of item {i}",
+                    "owner_id": i % owners + 1,
+                }
+                for i in range(start, stop)
+            ],
+        )
+        db.commit()
@@ -0,0 +1,42 @@
+from app import crud
+from app.core import security
+from app.utils import generate_password_reset_token, verify_password_reset_token
+
+
+def test_reset_token_round_trip():
+    token = generate_password_reset_token("someone@example.com")
+    assert verify_password_reset_token(token) == "someone@example.com"
+
+
+def test_access_token_is_not_a_reset_token():
+    token = security.create_access_token(1, "someone@example.com")
+    assert verify_password_reset_token(token) is None
+    assert verify_password_reset_token(security.create_refresh_token(1)) is None
+
+
+def test_invalid_reset_token():
+    assert verify_password_reset_token("not-a-token") is None
+
+
+def test_reset_password(client, db, superuser):
+    response = client.post(
+        "/api/v1/auth/reset-password/",
+        json={
+            "token": generate_password_reset_token(superuser.email),
+            "new_password": "changed",
+        },
+    )
+    assert response.status_code == 200
+    db.expire_all()
+    assert crud.user.authenticate(db, email=superuser.email, password="changed")
+
+
+def test_reset_password_rejects_access_token(client, superuser):
+    response = client.post(
+        "/api/v1/auth/reset-password/",
+        json={
+            "token": security.create_access_token(superuser.id, superuser.email),
+            "new_password": "changed",
+        },
+    )
+    assert response.status_code == 400